@@ -7,14 +7,64 @@ from routes.claim import claim_bp
 from routes.collect import collect_bp
 from routes.box import box_bp
 from routes.users import users_bp
-from flask import send_from_directory
-from clip_utils import UPLOAD_FOLDER
-from scheduler import start_cleanup_scheduler
+from routes.admin import admin_bp
+from routes.jobs import jobs_bp
+from routes.sync import sync_bp
+from routes.telemetry import telemetry_bp
+from flask import jsonify, Response
+from clip_utils import UPLOAD_FOLDER, COLLECTOR_FOLDER, follow_active_model, get_inference_stats
+from scheduler import start_cleanup_scheduler, start_claim_expiry, start_stats_flusher
+from job_worker import start_job_workers
+from box_state import start_box_state_flusher
+from identity import preload_rfid_tags
+from snapshot import restore_snapshot, save_snapshot
+from database import init_database
+from config import Config, select_config
+import metrics
+import profiling
+import responses
+import static_files
 import atexit
 
+# Refuse to start with a settings profile that is missing required values
+# (APP_ENV=production without SECRET_KEY)
+select_config()
+
 app = Flask(__name__)
+app.config['MAX_CONTENT_LENGTH'] = Config.MAX_CONTENT_LENGTH
 CORS(app, resources={r"/*": {"origins": "http://127.0.0.1:5500"}})
 
+# Create tables and run schema migrations (idempotent)
+init_database()
+
+# Load the catalogue's embedding model if it is not CLIP_MODEL (see `db_manager.py reembed`)
+follow_active_model(force=True)
+
+# RFID taps on the /collect path are answered from memory from the first request
+preload_rfid_tags()
+
+# Warm start: reuse the search index and query cache saved by the last run.
+# Registered before the other atexit hooks so it runs after them, once
+# the job workers have finished indexing.
+if Config.SNAPSHOT_ENABLED:
+    restored = restore_snapshot()
+    if restored:
+        app.logger.info(f"Restored search snapshot: {restored}")
+    atexit.register(save_snapshot)
+
+# orjson-backed JSON (when installed) and brotli/gzip compression of large responses.
+# Before metrics.init_app, which times the provider's dumps/loads
+responses.init_app(app)
+
+# Image hand-off to the front proxy (no-op unless STATIC_OFFLOAD is set)
+static_files.init_app(app)
+
+# Per-route latency histograms (no-op unless METRICS_ENABLED)
+metrics.init_app(app)
+
+# Opt-in request profiling (no-op unless ADMIN_TOKEN or PROFILE_SAMPLE_RATE is set)
+profiling.init_app(app)
+
 # Register routes
 app.register_blueprint(upload_bp)
 app.register_blueprint(search_bp)
@@ -23,16 +73,58 @@ app.register_blueprint(claim_bp)
 app.register_blueprint(collect_bp)
 app.register_blueprint(box_bp)
 app.register_blueprint(users_bp)
+app.register_blueprint(admin_bp)
+app.register_blueprint(jobs_bp)
+app.register_blueprint(sync_bp)
+app.register_blueprint(telemetry_bp)
 
 # Start the cleanup scheduler
 start_cleanup_scheduler()
 
-# Ensure cleanup scheduler stops when the app shuts down
+# End expired claims as they expire, handing items to queued collectors
+start_claim_expiry()
+
+# Start background job workers (resumes jobs interrupted by a previous run)
+start_job_workers()
+
+# Flush coalesced box state changes to BOXES in the background
+start_box_state_flusher()
+
+# Write buffered finder/collector stat increments in the background
+start_stats_flusher()
+
+# Ensure the background threads stop (flushing what they buffer) when the app shuts down.
+# atexit runs hooks in reverse: the flushers are registered first so they stop last,
+# after the scheduler, claim expiry and job workers have queued their final changes.
+atexit.register(lambda: __import__('scheduler').stop_stats_flusher())
+atexit.register(lambda: __import__('box_state').stop_box_state_flusher())
+atexit.register(lambda: __import__('job_worker').stop_job_workers())
+atexit.register(lambda: __import__('scheduler').stop_claim_expiry())
 atexit.register(lambda: __import__('scheduler').stop_cleanup_scheduler())
 
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"error": f"Request exceeds the upload limit of {Config.MAX_FILE_SIZE} bytes"}), 413
+
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
-    return send_from_directory(UPLOAD_FOLDER, filename)
+    with metrics.timer(metrics.FILE_IO_SECONDS, 'upload_serve'):
+        return static_files.serve(UPLOAD_FOLDER, filename, 'uploads')
+
+@app.route('/collected/<filename>')
+def collected_file(filename):
+    with metrics.timer(metrics.FILE_IO_SECONDS, 'collected_serve'):
+        return static_files.serve(COLLECTOR_FOLDER, filename, 'collected')
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Timing histograms in Prometheus text format."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/inference/stats')
+def inference_stats():
+    """CLIP inference queue length, concurrency and latency for this worker."""
+    return jsonify(get_inference_stats())
 
 if __name__ == '__main__':
     app.run(debug=True)
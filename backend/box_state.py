@@ -0,0 +1,253 @@
+"""
+In-memory box state for the ESP32 polling endpoints.
+
+Boxes poll /box/<id>/status continuously.  BoxStateRegistry answers those
+reads from a dict of immutable-by-convention state dicts (replaced, never
+mutated, so readers need no lock); writers serialize on a per-box lock.
+
+Changes to status or door_status are door commands: they are written to
+BOXES before they are applied and acknowledged, so a crash never loses
+one.  Everything else (current_load, heartbeats that only bump
+last_updated) is coalesced per box and flushed in one executemany batch
+every BOX_STATE_FLUSH_INTERVAL seconds, which bounds how far BOXES can lag.
+Load added by add_load is flushed as an increment rather than the cached
+total, so drops counted by different worker processes add up.
+The same pass pulls in BOXES changes made by other worker processes from
+the change log, so their door commands reach this process's boxes within
+one interval.
+"""
+import itertools
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import database
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Changes persisted before the request that made them returns
+DURABLE_FIELDS = ('status', 'door_status')
+
+
+class BoxStateRegistry:
+    def __init__(self, flush_interval=None):
+        self.flush_interval = flush_interval or Config.BOX_STATE_FLUSH_INTERVAL
+        self._boxes = {}         # box_id -> state dict (same keys as a BOXES row)
+        self._locks = {}         # box_id -> lock serializing writers of that box
+        self._dirty = {}         # box_id -> fields changed in memory but not yet flushed
+        self._load_deltas = {}   # box_id -> load added since the last flush (written as an increment)
+        self._seq = {}           # box_id -> count of local writes, to spot races with refresh
+        self._version = 0        # change log version the cache is current with
+        self._token = uuid.uuid4().hex  # tells this registry's change counts from another's
+        self._change_counter = itertools.count(1)
+        self._changes = 0        # state changes seen by this registry (see version())
+        self._changed_at = int(time.time())
+        self._loaded = False
+        self._registry_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.running = False
+        self.thread = None
+        self._stop_event = threading.Event()
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._registry_lock:
+            if not self._loaded:
+                # Version first: changes made while loading are replayed by refresh()
+                self._version = database.get_change_log_version()
+                self._boxes = {row['id']: dict(row) for row in database.get_all_boxes()}
+                self._loaded = True
+
+    def _lock_for(self, box_id):
+        lock = self._locks.get(box_id)
+        if lock is None:
+            with self._registry_lock:
+                lock = self._locks.setdefault(box_id, threading.Lock())
+        return lock
+
+    def _fetch(self, box_id):
+        """Load a box missing from the cache, e.g. one registered by another process."""
+        row = database.get_box_status(box_id)
+        if row is None:
+            return None
+        state = self._boxes[box_id] = dict(row)
+        self._changed()
+        return state
+
+    def get(self, box_id):
+        """Current state of a box, or None if it does not exist."""
+        self._ensure_loaded()
+        state = self._boxes.get(box_id)
+        if state is None:
+            state = self._fetch(box_id)
+        return state
+
+    def all(self):
+        """State of every box, ordered by id."""
+        self._ensure_loaded()
+        boxes = self._boxes
+        return [boxes[box_id] for box_id in sorted(boxes)]
+
+    def _changed(self):
+        self._changes = next(self._change_counter)  # atomic, unlike += 1
+        self._changed_at = int(time.time())
+
+    def version(self):
+        """(version, unix time of the last change) of the states served by get() and all()."""
+        return f"{self._token}:{self._changes}", self._changed_at
+
+    def register(self, box_id, capacity=1, status='available'):
+        """Create or reset a box (written through)."""
+        self._ensure_loaded()
+        with self._lock_for(box_id):
+            with self._flush_lock:
+                database.add_box(box_id, capacity, status)
+                self._dirty.pop(box_id, None)
+                self._load_deltas.pop(box_id, None)
+                self._seq[box_id] = self._seq.get(box_id, 0) + 1
+            return self._fetch(box_id)
+
+    def update(self, box_id, status=None, door_status=None, current_load=None):
+        """Apply a state change; returns the new state, or None if the box does not exist."""
+        self._ensure_loaded()
+        with self._lock_for(box_id):
+            state = self._boxes.get(box_id) or self._fetch(box_id)
+            if state is None:
+                return None
+            changes = {field: value for field, value in
+                       (('status', status), ('door_status', door_status), ('current_load', current_load))
+                       if value is not None and state[field] != value}
+            return self._apply(box_id, state, changes)
+
+    def add_load(self, box_id, count=1):
+        """Add items to a box's load; returns the new state, or None if the box does not exist."""
+        self._ensure_loaded()
+        with self._lock_for(box_id):
+            state = self._boxes.get(box_id) or self._fetch(box_id)
+            if state is None:
+                return None
+            return self._apply(box_id, state, {'current_load': state['current_load'] + count}, load_delta=count)
+
+    def _apply(self, box_id, state, changes, load_delta=0):
+        # Called with the box's lock held
+        new_state = dict(state, **changes, last_updated=datetime.now().isoformat())
+        if any(field in DURABLE_FIELDS for field in changes):
+            with self._flush_lock:
+                # Door command: persist it (with anything still pending) before acknowledging
+                fields = set(changes) | self._dirty.pop(box_id, set())
+                if 'current_load' in fields:
+                    self._load_deltas.pop(box_id, None)  # the absolute load written includes them
+                written = database.update_box_status(box_id, **{field: new_state[field] for field in fields})
+                if not written:
+                    self._boxes.pop(box_id, None)  # deleted by another process
+                    return None
+        else:
+            with self._flush_lock:
+                fields = self._dirty.setdefault(box_id, set())
+                if load_delta and 'current_load' not in fields:
+                    self._load_deltas[box_id] = self._load_deltas.get(box_id, 0) + load_delta
+                else:
+                    # An absolute load (pending or set now) already includes any increments
+                    fields.update(changes)
+                    if 'current_load' in changes:
+                        self._load_deltas.pop(box_id, None)
+        self._boxes[box_id] = new_state
+        self._seq[box_id] = self._seq.get(box_id, 0) + 1
+        self._changed()
+        return new_state
+
+    def flush(self):
+        """Write coalesced changes to BOXES in one batch; returns the number of boxes written."""
+        with self._flush_lock:
+            if not self._dirty and not self._load_deltas:
+                return 0
+            dirty, self._dirty = self._dirty, {}
+            deltas, self._load_deltas = self._load_deltas, {}
+            updates = []
+            for box_id in set(dirty) | set(deltas):
+                state = self._boxes.get(box_id)
+                if state is not None:
+                    fields = dirty.get(box_id, ())
+                    updates.append(tuple(state[field] if field in fields else None
+                                         for field in ('status', 'door_status', 'current_load'))
+                                   + (deltas.get(box_id, 0), state['last_updated'], box_id))
+            try:
+                database.flush_box_states(updates)
+            except Exception:
+                # Keep the changes for the next pass (newer ones already queued win)
+                for box_id, fields in dirty.items():
+                    self._dirty.setdefault(box_id, set()).update(fields)
+                for box_id, delta in deltas.items():
+                    if 'current_load' not in self._dirty.get(box_id, ()):
+                        self._load_deltas[box_id] = self._load_deltas.get(box_id, 0) + delta
+                raise
+            return len(updates)
+
+    def refresh(self):
+        """Pick up BOXES changes written by other processes since the last refresh."""
+        self._ensure_loaded()
+        delta = database.changes_since(self._version, tables=['BOXES'], limit=None)
+        if delta['reset']:
+            box_ids = list(set(self._boxes) | {row['id'] for row in database.get_all_boxes()})
+        else:
+            box_ids = list({change['row_id'] for change in delta['changes']})
+        if box_ids:
+            seqs = {box_id: self._seq.get(box_id) for box_id in box_ids}
+            rows = database.get_synced_rows('BOXES', box_ids)
+            for box_id in box_ids:
+                with self._lock_for(box_id):
+                    if (self._seq.get(box_id) != seqs[box_id] or box_id in self._dirty
+                            or box_id in self._load_deltas):
+                        continue  # written here since the read; the local state is newer
+                    if box_id in rows:
+                        self._boxes[box_id] = rows[box_id]
+                    else:
+                        self._boxes.pop(box_id, None)
+                    self._changed()
+        self._version = delta['version']
+        return len(box_ids)
+
+    def start(self):
+        """Start the background flush task."""
+        if self.running:
+            return
+
+        self.running = True
+        self._stop_event.clear()
+        self.thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.thread.start()
+        logger.info("Started box state flusher")
+
+    def stop(self):
+        """Stop the background flush task and write any pending changes."""
+        self.running = False
+        self._stop_event.set()
+        if self.thread:
+            self.thread.join()
+        self.flush()
+        logger.info("Stopped box state flusher")
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing box states: {e}")
+
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing box states: {e}")
+
+# Global box state registry
+box_states = BoxStateRegistry()
+
+def start_box_state_flusher():
+    box_states.start()
+
+def stop_box_state_flusher():
+    box_states.stop()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Export the CLIP image and text encoders for CPU-optimized inference.
+
+Run from backend/ with the model selected by CLIP_MODEL:
+    python clip_export.py export --format onnx --quantize
+    python clip_export.py verify --format onnx --quantize
+    python clip_export.py bench --format onnx --quantize
+
+Then start the server with CLIP_RUNTIME=onnx CLIP_QUANTIZED=true.
+ONNX export needs `pip install onnx onnxruntime`.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from config import Config
+
+# Exports and parity checks always run against the eager model
+Config.CLIP_RUNTIME = 'torch'
+
+import torch
+import clip
+from PIL import Image
+from clip_utils import (
+    model, preprocess, exported_model_path, load_encoders,
+    UPLOAD_FOLDER, COLLECTOR_FOLDER
+)
+
+SAMPLE_QUERIES = [
+    "black leather wallet",
+    "blue water bottle",
+    "set of keys on a red lanyard",
+    "laptop charger",
+    "student ID card in a clear holder",
+]
+
+# Minimum cosine similarity of exported to eager embeddings accepted by verify
+PARITY_TOLERANCE = 0.99
+
+class ImageEncoder(torch.nn.Module):
+    def __init__(self, clip_model):
+        super().__init__()
+        self.clip_model = clip_model
+
+    def forward(self, image):
+        return self.clip_model.encode_image(image)
+
+class TextEncoder(torch.nn.Module):
+    def __init__(self, clip_model):
+        super().__init__()
+        self.clip_model = clip_model
+
+    def forward(self, tokens):
+        return self.clip_model.encode_text(tokens)
+
+def export_encoders(fmt, quantize):
+    """Write image and text encoders for fmt ('onnx' or 'torchscript')."""
+    cpu_model = model.float().cpu().eval()
+    resolution = cpu_model.visual.input_resolution
+    dummy_image = torch.randn(1, 3, resolution, resolution)
+    dummy_tokens = clip.tokenize(SAMPLE_QUERIES[:1])
+    encoders = {
+        'image': (ImageEncoder(cpu_model).eval(), dummy_image, 'image'),
+        'text': (TextEncoder(cpu_model).eval(), dummy_tokens, 'tokens'),
+    }
+    os.makedirs(Config.CLIP_EXPORT_DIR, exist_ok=True)
+
+    for kind, (encoder, dummy_input, input_name) in encoders.items():
+        if fmt == 'onnx':
+            fp32_path = exported_model_path(kind, 'onnx', quantized=False)
+            torch.onnx.export(
+                encoder, dummy_input, fp32_path,
+                input_names=[input_name], output_names=['embedding'],
+                dynamic_axes={input_name: {0: 'batch'}, 'embedding': {0: 'batch'}},
+                opset_version=17
+            )
+            print(f"Exported {kind} encoder to {fp32_path}")
+            if quantize:
+                from onnxruntime.quantization import quantize_dynamic, QuantType
+                int8_path = exported_model_path(kind, 'onnx', quantized=True)
+                quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+                print(f"Quantized {kind} encoder to {int8_path}")
+        elif fmt == 'torchscript':
+            if quantize:
+                encoder = torch.ao.quantization.quantize_dynamic(encoder, {torch.nn.Linear}, dtype=torch.qint8)
+            path = exported_model_path(kind, 'torchscript', quantized=quantize)
+            with torch.no_grad():
+                traced = torch.jit.trace(encoder, dummy_input)
+            traced.save(path)
+            print(f"Exported {kind} encoder to {path}")
+        else:
+            raise ValueError(f"Unknown export format: {fmt}")
+
+def sample_images(limit=8):
+    """Preprocessed images from the upload/collector folders, or random input if there are none."""
+    paths = []
+    for folder in (UPLOAD_FOLDER, COLLECTOR_FOLDER):
+        for name in sorted(os.listdir(folder)):
+            if name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
+                paths.append(os.path.join(folder, name))
+    paths = paths[:limit]
+    if not paths:
+        resolution = model.visual.input_resolution
+        return torch.randn(limit, 3, resolution, resolution)
+    return torch.stack([preprocess(Image.open(path).convert('RGB')) for path in paths])
+
+def parity(fmt, quantize):
+    """{'image'|'text': (min cosine similarity to the eager model, number of inputs)} for exported encoders."""
+    eager_image, eager_text = model.float().cpu().encode_image, model.encode_text
+    export_image, export_text = load_encoders(fmt, quantize)
+    images = sample_images()
+    tokens = clip.tokenize(SAMPLE_QUERIES)
+
+    results = {}
+    with torch.no_grad():
+        for kind, eager, exported, inputs in (('image', eager_image, export_image, images),
+                                              ('text', eager_text, export_text, tokens)):
+            cosine = torch.nn.functional.cosine_similarity(eager(inputs).float(), exported(inputs).float())
+            results[kind] = (float(cosine.min()), len(inputs))
+    return results
+
+def verify(fmt, quantize, tolerance):
+    """Compare exported encoders against the eager model by cosine similarity."""
+    ok = True
+    for kind, (worst, count) in parity(fmt, quantize).items():
+        passed = worst >= tolerance
+        ok = ok and passed
+        status = "PASSED" if passed else "FAILED"
+        print(f"{status} {kind}: min cosine {worst:.5f} over {count} inputs (tolerance {tolerance})")
+    return ok
+
+def _time(fn, inputs, repeats):
+    with torch.no_grad():
+        fn(inputs)  # warm-up
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn(inputs)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+def bench(fmt, quantize, repeats):
+    """Print median per-image and per-query latency, eager vs exported."""
+    eager_image, eager_text = model.float().cpu().encode_image, model.encode_text
+    export_image, export_text = load_encoders(fmt, quantize)
+    image = sample_images(limit=1)
+    tokens = clip.tokenize(SAMPLE_QUERIES[:1])
+
+    label = f"{fmt}{' int8' if quantize else ''}"
+    print(f"Threads: {torch.get_num_threads()}, repeats: {repeats}")
+    for kind, eager, exported, inputs in (('per-image', eager_image, export_image, image),
+                                          ('per-query', eager_text, export_text, tokens)):
+        eager_ms = _time(eager, inputs, repeats)
+        export_ms = _time(exported, inputs, repeats)
+        print(f"{kind}: eager {eager_ms:.1f} ms, {label} {export_ms:.1f} ms ({eager_ms / export_ms:.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description="CLIP encoder export tool")
+    subparsers = parser.add_subparsers(dest='command', help='Available commands')
+
+    for name, help_text in (('export', 'Export image and text encoders'),
+                            ('verify', 'Check exported encoders against the eager model'),
+                            ('bench', 'Compare eager and exported latency')):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('--format', choices=['onnx', 'torchscript'], default='onnx',
+                         help='Export format')
+        sub.add_argument('--quantize', action='store_true',
+                         help='Use dynamic int8 quantization of linear layers')
+        if name == 'verify':
+            sub.add_argument('--tolerance', type=float, default=PARITY_TOLERANCE,
+                             help='Minimum cosine similarity to the eager embeddings')
+        if name == 'bench':
+            sub.add_argument('--repeats', type=int, default=20, help='Timed runs per encoder')
+
+    args = parser.parse_args()
+
+    if not args.command:
+        parser.print_help()
+        return
+
+    if args.command == 'export':
+        export_encoders(args.format, args.quantize)
+    elif args.command == 'verify':
+        if not verify(args.format, args.quantize, args.tolerance):
+            sys.exit(1)
+    elif args.command == 'bench':
+        bench(args.format, args.quantize, args.repeats)
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,231 @@
 import os
+import re
+import threading
+import time
+from collections import deque
 import torch
 import clip
 from PIL import Image
 import json
+import logging
+from config import Config
+from metrics import timer, CLIP_SECONDS
+import database
+from query_cache import query_cache
+
+logger = logging.getLogger(__name__)
+
+# Every stored embedding is tagged with this name (see database.add_found_item).
+# Starts as CLIP_MODEL; follow_active_model() moves to the catalogue's model.
+MODEL_NAME = Config.CLIP_MODEL
+
+# 'torch' runs the eager model; 'onnx' and 'torchscript' run encoders exported
+# with `python clip_export.py export`
+RUNTIME = Config.CLIP_RUNTIME
+
+class InferenceExecutor:
+    """
+    Owns torch threading and runs forward passes with bounded concurrency.
+
+    Flask serves requests on many threads; letting each one run a forward pass
+    with every core oversubscribes the CPU.  The semaphore caps concurrent passes
+    so that concurrency * intra-op threads stays within the core count.
+    """
+
+    def __init__(self, concurrency, intra_op_threads, inter_op_threads, latency_window=512):
+        self.concurrency = concurrency
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self._semaphore = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+        self._completed = 0
+        self._errors = 0
+        self._latency_window = latency_window
+        self._latencies = {}  # kind -> recent forward-pass latencies (ms)
+        self._wait_times = deque(maxlen=latency_window)
+
+        torch.set_num_threads(intra_op_threads)
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError:
+            pass  # the inter-op pool can only be sized once per process
+
+    def run(self, kind, fn, *args):
+        """Run fn(*args) under inference_mode once a slot is free."""
+        queued_at = time.perf_counter()
+        with self._lock:
+            self._waiting += 1
+        with self._semaphore:
+            started_at = time.perf_counter()
+            with self._lock:
+                self._waiting -= 1
+                self._running += 1
+                self._wait_times.append((started_at - queued_at) * 1000)
+            failed = False
+            try:
+                with torch.inference_mode():
+                    return fn(*args)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                elapsed_ms = (time.perf_counter() - started_at) * 1000
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._errors += failed
+                    self._latencies.setdefault(kind, deque(maxlen=self._latency_window)).append(elapsed_ms)
+
+    @staticmethod
+    def _summary(values):
+        if not values:
+            return {"count": 0}
+        ordered = sorted(values)
+        return {
+            "count": len(ordered),
+            "mean_ms": sum(ordered) / len(ordered),
+            "p50_ms": ordered[len(ordered) // 2],
+            "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            "max_ms": ordered[-1],
+        }
+
+    def stats(self):
+        """Queue length, in-flight passes and recent latency percentiles."""
+        with self._lock:
+            return {
+                "concurrency": self.concurrency,
+                "intra_op_threads": self.intra_op_threads,
+                "inter_op_threads": self.inter_op_threads,
+                "queue_length": self._waiting,
+                "in_flight": self._running,
+                "completed": self._completed,
+                "errors": self._errors,
+                "wait": self._summary(list(self._wait_times)),
+                "latency": {kind: self._summary(list(values)) for kind, values in self._latencies.items()},
+            }
+
+INTRA_OP_THREADS = Config.INFERENCE_INTRA_OP_THREADS or max(1, (os.cpu_count() or 1) // Config.INFERENCE_CONCURRENCY)
+
+# Created before the model loads so the thread settings apply to it
+executor = InferenceExecutor(Config.INFERENCE_CONCURRENCY, INTRA_OP_THREADS, Config.INFERENCE_INTER_OP_THREADS)
 
 device = "cuda" if torch.cuda.is_available() else "cpu"
-model, preprocess = clip.load("ViT-L/14@336px", device=device)
+model, preprocess = clip.load(MODEL_NAME, device=device)
+EMBEDDING_DIM = model.visual.output_dim
 
-UPLOAD_FOLDER = 'uploads'
+# Defined with the upload helpers so tools can use them without loading CLIP
+from upload_utils import UPLOAD_FOLDER, COLLECTOR_FOLDER
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-COLLECTOR_FOLDER = 'collectors'
 os.makedirs(COLLECTOR_FOLDER, exist_ok=True)
 
-def get_image_embedding(image_path):
-    image = preprocess(Image.open(image_path)).unsqueeze(0).to(device)
-    with torch.no_grad():
-        emb = model.encode_image(image)
-    return emb / emb.norm(dim=-1, keepdim=True)
+def exported_model_path(kind, runtime=RUNTIME, quantized=Config.CLIP_QUANTIZED, model_name=None):
+    """Path of an exported 'image' or 'text' encoder, e.g. models/ViT-B-32.image.int8.onnx."""
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', model_name or MODEL_NAME).strip('-')
+    suffix = '.int8' if quantized else ''
+    ext = 'onnx' if runtime == 'onnx' else 'pt'
+    return os.path.join(Config.CLIP_EXPORT_DIR, f"{slug}.{kind}{suffix}.{ext}")
+
+def load_encoders(runtime=RUNTIME, quantized=Config.CLIP_QUANTIZED, clip_model=None, model_name=None):
+    """Return (encode_image, encode_text) callables for a runtime; both take and return torch tensors."""
+    if runtime == 'torch':
+        clip_model = clip_model or model
+        return clip_model.encode_image, clip_model.encode_text
+
+    if runtime == 'torchscript':
+        image_module = torch.jit.load(exported_model_path('image', runtime, quantized, model_name), map_location='cpu')
+        text_module = torch.jit.load(exported_model_path('text', runtime, quantized, model_name), map_location='cpu')
+        return (lambda images: image_module(images.cpu()),
+                lambda tokens: text_module(tokens.cpu()))
+
+    if runtime == 'onnx':
+        import onnxruntime as ort
+        providers = ['CPUExecutionProvider']
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = executor.intra_op_threads
+        options.inter_op_num_threads = executor.inter_op_threads
+        image_session = ort.InferenceSession(exported_model_path('image', runtime, quantized, model_name),
+                                             sess_options=options, providers=providers)
+        text_session = ort.InferenceSession(exported_model_path('text', runtime, quantized, model_name),
+                                            sess_options=options, providers=providers)
+
+        def encode_image(images):
+            outputs = image_session.run(None, {'image': images.cpu().float().numpy()})
+            return torch.from_numpy(outputs[0])
+
+        def encode_text(tokens):
+            outputs = text_session.run(None, {'tokens': tokens.cpu().numpy()})
+            return torch.from_numpy(outputs[0])
+
+        return encode_image, encode_text
+
+    raise ValueError(f"Unknown CLIP runtime: {runtime}")
+
+encode_image, encode_text = load_encoders()
+
+# What the embedding functions use, replaced as a whole by use_model so a
+# request never pairs one model's preprocessing with another's encoder
+_active = (preprocess, encode_image, encode_text)
+
+_model_lock = threading.Lock()
+_model_checked_at = 0.0
+
+def use_model(model_name):
+    """Load model_name in place of the current model and drop state computed with the old one."""
+    global MODEL_NAME, model, preprocess, EMBEDDING_DIM, encode_image, encode_text, _active
+    new_model, new_preprocess = clip.load(model_name, device=device)
+    new_encode_image, new_encode_text = load_encoders(clip_model=new_model, model_name=model_name)
+
+    model, preprocess, EMBEDDING_DIM = new_model, new_preprocess, new_model.visual.output_dim
+    encode_image, encode_text = new_encode_image, new_encode_text
+    _active = (new_preprocess, new_encode_image, new_encode_text)
+    MODEL_NAME = Config.CLIP_MODEL = model_name
+
+    # Vectors from different models are not comparable
+    database.reset_search_index()
+    query_cache.clear()
+
+def follow_active_model(force=False):
+    """
+    Switch to the catalogue's embedding model if `db_manager.py reembed` has
+    moved it since this process loaded its model.  Checked at most every
+    CLIP_MODEL_CHECK_SECONDS unless force.  Returns the model in use.
+    """
+    global _model_checked_at
+    now = time.monotonic()
+    if not force and now - _model_checked_at < Config.CLIP_MODEL_CHECK_SECONDS:
+        return MODEL_NAME
+    _model_checked_at = now
+
+    active = database.get_active_embedding_model()
+    if active and active != MODEL_NAME:
+        with _model_lock:
+            if active != MODEL_NAME:
+                logger.warning(f"Catalogue is embedded with {active}; loading it in place of {MODEL_NAME}")
+                use_model(active)
+    return MODEL_NAME
+
+def _normalized(kind, encode, inputs):
+    with timer(CLIP_SECONDS, f'encode_{kind}'):
+        emb = encode(inputs)
+        return emb / emb.norm(dim=-1, keepdim=True)
+
+def get_image_embedding(image):
+    """Embed an image given as a path or a binary file object (e.g. BytesIO of an upload)."""
+    image_preprocess, image_encoder, _ = _active
+    with timer(CLIP_SECONDS, 'preprocess_image'):
+        image = image_preprocess(Image.open(image)).unsqueeze(0).to(device)
+    return executor.run('image', _normalized, 'image', image_encoder, image)
 
 def get_text_embedding(text):
-    text_tokens = clip.tokenize([text]).to(device)
-    with torch.no_grad():
-        emb = model.encode_text(text_tokens)
-    return emb / emb.norm(dim=-1, keepdim=True)
+    text_encoder = _active[2]
+    with timer(CLIP_SECONDS, 'tokenize_text'):
+        text_tokens = clip.tokenize([text]).to(device)
+    return executor.run('text', _normalized, 'text', text_encoder, text_tokens)
+
+def get_inference_stats():
+    """Inference queue and latency metrics for this process."""
+    stats = executor.stats()
+    stats.update({"model": MODEL_NAME, "runtime": RUNTIME, "device": device})
+    return stats
@@ -10,9 +10,49 @@ class Config:
     # File uploads
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
     MAX_FILE_SIZE = int(os.getenv('MAX_FILE_SIZE', 16 * 1024 * 1024))  # 16MB
+    # Whole request body limit enforced by Flask (the image plus room for form fields)
+    MAX_CONTENT_LENGTH = MAX_FILE_SIZE + 64 * 1024
     
-    # CLIP model
+    # CLIP model (any name accepted by clip.load, e.g. 'ViT-B/32' for faster CPU inference).
+    # Embeddings are tagged with the model, so changing it requires `db_manager.py reembed`,
+    # which records the new model in the database; servers load that model instead of
+    # CLIP_MODEL, checking for a switch at most every CLIP_MODEL_CHECK_SECONDS.
     CLIP_MODEL = os.getenv('CLIP_MODEL', 'ViT-L/14@336px')
+    CLIP_MODEL_CHECK_SECONDS = float(os.getenv('CLIP_MODEL_CHECK_SECONDS', 2.0))
+    # Inference runtime: 'torch' (eager), 'onnx' or 'torchscript' (see clip_export.py)
+    CLIP_RUNTIME = os.getenv('CLIP_RUNTIME', 'torch')
+    CLIP_EXPORT_DIR = os.getenv('CLIP_EXPORT_DIR', 'models')
+    CLIP_QUANTIZED = os.getenv('CLIP_QUANTIZED', 'False').lower() == 'true'
+    # CPU inference tuning: at most INFERENCE_CONCURRENCY forward passes run at
+    # once, each using INFERENCE_INTRA_OP_THREADS threads (0 = cores / concurrency)
+    INFERENCE_CONCURRENCY = int(os.getenv('INFERENCE_CONCURRENCY', max(1, (os.cpu_count() or 1) // 4)))
+    INFERENCE_INTRA_OP_THREADS = int(os.getenv('INFERENCE_INTRA_OP_THREADS', 0))
+    INFERENCE_INTER_OP_THREADS = int(os.getenv('INFERENCE_INTER_OP_THREADS', 1))
+    
+    # Background jobs (post-upload embedding): worker threads per process, idle
+    # poll interval, attempts before a job is marked failed, exponential retry
+    # backoff, and how long a running job may go unfinished before it is requeued
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 1.0))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 5))
+    JOB_RETRY_BASE_SECONDS = float(os.getenv('JOB_RETRY_BASE_SECONDS', 2))
+    JOB_RETRY_MAX_SECONDS = float(os.getenv('JOB_RETRY_MAX_SECONDS', 300))
+    JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 600))
+    # Uploaded image bytes kept in memory for the embedding job of the same
+    # process, so it decodes them without reading the file back
+    UPLOAD_HANDOFF_MAX_BYTES = int(os.getenv('UPLOAD_HANDOFF_MAX_BYTES', 64 * 1024 * 1024))
+    
+    # Instrumentation: per-route, DB, CLIP, JSON and file I/O timings on /metrics
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False').lower() == 'true'
+    
+    # Profiling: requests carrying `X-Profile-Token: <ADMIN_TOKEN>`, plus a random
+    # PROFILE_SAMPLE_RATE fraction, are stack-sampled into PROFILE_DIR
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+    PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 50))
+    PROFILE_SLOWEST_N = int(os.getenv('PROFILE_SLOWEST_N', 10))
+    PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 2))
     
     # Flask
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -22,10 +62,90 @@ class Config:
     ALLOWED_ORIGINS = os.getenv('ALLOWED_ORIGINS', 'http://127.0.0.1:5500').split(',')
     
     # Claims
-    CLAIM_DURATION_HOURS = int(os.getenv('CLAIM_DURATION_HOURS', 1))
+    CLAIM_DURATION_HOURS = float(os.getenv('CLAIM_DURATION_HOURS', 1))
+    # Collectors waiting for a claimed item (POST /claim with "wait": true)
+    CLAIM_QUEUE_MAX_LENGTH = int(os.getenv('CLAIM_QUEUE_MAX_LENGTH', 50))
+    # Longest the expiry scheduler sleeps between sweeps (it wakes earlier for
+    # the next known expiry; claims made by other processes may expire sooner)
+    CLAIM_EXPIRY_POLL_SECONDS = float(os.getenv('CLAIM_EXPIRY_POLL_SECONDS', 5.0))
+    # Claims take the write lock with BEGIN IMMEDIATE; while the database is
+    # locked they wait CLAIM_BUSY_TIMEOUT_MS, then retry with jittered backoff
+    CLAIM_BUSY_TIMEOUT_MS = int(os.getenv('CLAIM_BUSY_TIMEOUT_MS', 100))
+    CLAIM_MAX_RETRIES = int(os.getenv('CLAIM_MAX_RETRIES', 8))
+    CLAIM_RETRY_BASE_MS = int(os.getenv('CLAIM_RETRY_BASE_MS', 5))
+    CLAIM_RETRY_MAX_MS = int(os.getenv('CLAIM_RETRY_MAX_MS', 250))
     
     # Search
     DEFAULT_SEARCH_THRESHOLD = float(os.getenv('DEFAULT_SEARCH_THRESHOLD', 0.2))
+    # 'exact' keeps float32 vectors in memory, 'int8' keeps quantized codes
+    # and re-ranks candidates at full precision, 'mmap' scores the shared
+    # on-disk embedding store in place (best with several worker processes)
+    SEARCH_INDEX_MODE = os.getenv('SEARCH_INDEX_MODE', 'exact')
+    # Text-query embeddings kept in an LRU cache (0 disables it)
+    QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', 1024))
+    # Warm-start snapshot of the search index and query cache, written at shutdown
+    # and every scheduler pass, loaded at startup (see snapshot.py)
+    SNAPSHOT_ENABLED = os.getenv('SNAPSHOT_ENABLED', 'True').lower() == 'true'
+    # Compact the embedding store once this fraction of its rows is tombstoned
+    EMBEDDING_STORE_COMPACT_RATIO = float(os.getenv('EMBEDDING_STORE_COMPACT_RATIO', 0.25))
+    
+    # Identity lookups (RFID, email, student id) cached per process;
+    # registration invalidates the new user's credentials
+    IDENTITY_CACHE_SIZE = int(os.getenv('IDENTITY_CACHE_SIZE', 10000))
+    IDENTITY_CACHE_TTL = float(os.getenv('IDENTITY_CACHE_TTL', 300))
+    # Unknown RFID tags are remembered briefly so repeated bad taps skip the database
+    IDENTITY_NEGATIVE_CACHE_SIZE = int(os.getenv('IDENTITY_NEGATIVE_CACHE_SIZE', 1000))
+    IDENTITY_NEGATIVE_TTL = float(os.getenv('IDENTITY_NEGATIVE_TTL', 10))
+    
+    # Finder/collector stat increments are merged in memory and written every
+    # this many seconds (0 writes each one immediately); reads of user stats
+    # flush first unless USER_STATS_FLUSH_ON_READ is off
+    USER_STATS_FLUSH_INTERVAL = float(os.getenv('USER_STATS_FLUSH_INTERVAL', 5.0))
+    USER_STATS_FLUSH_ON_READ = os.getenv('USER_STATS_FLUSH_ON_READ', 'True').lower() == 'true'
+    
+    # Box state: load/heartbeat changes reach BOXES at most this many seconds
+    # late (door commands are written immediately)
+    BOX_STATE_FLUSH_INTERVAL = float(os.getenv('BOX_STATE_FLUSH_INTERVAL', 1.0))
+    
+    # Box telemetry: raw readings are kept in daily tables for this many days,
+    # minute and hour rollups for longer
+    TELEMETRY_MAX_BATCH = int(os.getenv('TELEMETRY_MAX_BATCH', 1000))
+    TELEMETRY_RAW_RETENTION_DAYS = int(os.getenv('TELEMETRY_RAW_RETENTION_DAYS', 2))
+    TELEMETRY_MINUTE_RETENTION_DAYS = int(os.getenv('TELEMETRY_MINUTE_RETENTION_DAYS', 14))
+    TELEMETRY_HOUR_RETENTION_DAYS = int(os.getenv('TELEMETRY_HOUR_RETENTION_DAYS', 365))
+    
+    # Sync: change log entries older than this are pruned; /sync clients that
+    # fall further behind are told to reload in full
+    CHANGE_LOG_RETENTION_HOURS = int(os.getenv('CHANGE_LOG_RETENTION_HOURS', 24 * 7))
+    
+    # Responses: JSON encoder (auto uses orjson when installed; orjson or
+    # default force one), and brotli/gzip compression of JSON and text
+    # responses of at least COMPRESS_MIN_BYTES (0 disables compression)
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'auto').lower()
+    COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+    GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 5))
+    BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 4))
+    # Base of the absolute image URLs in /search and /items results
+    PUBLIC_BASE_URL = os.getenv('PUBLIC_BASE_URL', 'http://127.0.0.1:5000')
+
+    # Response cache for polled read endpoints (/items, /boxes, /finders, ...),
+    # keyed on per-table data versions; bounded per worker process
+    HTTP_CACHE_ENABLED = os.getenv('HTTP_CACHE_ENABLED', 'True').lower() == 'true'
+    HTTP_CACHE_MAX_ENTRIES = int(os.getenv('HTTP_CACHE_MAX_ENTRIES', 256))
+    HTTP_CACHE_MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+
+    # Image serving (/uploads, /collected): STATIC_OFFLOAD hands files to the
+    # front proxy (x-accel for nginx, with an internal location at
+    # STATIC_ACCEL_PREFIX; x-sendfile for Apache/lighttpd) instead of the
+    # Python worker.  Content-versioned URLs are cached for STATIC_MAX_AGE
+    STATIC_OFFLOAD = os.getenv('STATIC_OFFLOAD', '').lower()
+    STATIC_ACCEL_PREFIX = os.getenv('STATIC_ACCEL_PREFIX', '/protected').rstrip('/')
+    STATIC_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', 365 * 24 * 3600))
+    STATIC_HASH_CACHE_SIZE = int(os.getenv('STATIC_HASH_CACHE_SIZE', 10000))
+
+    @classmethod
+    def validate(cls):
+        """Raise ValueError if a setting this profile requires is missing."""
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -34,9 +154,11 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     DEBUG = False
     SECRET_KEY = os.getenv('SECRET_KEY')  # Must be set in production
-    
-    if not SECRET_KEY:
-        raise ValueError("SECRET_KEY must be set in production")
+
+    @classmethod
+    def validate(cls):
+        if not cls.SECRET_KEY:
+            raise ValueError("SECRET_KEY must be set in production")
 
 # Config selection
 config = {
@@ -44,3 +166,11 @@ config = {
     'production': ProductionConfig,
     'default': DevelopmentConfig
 }
+
+def select_config():
+    """Settings profile named by APP_ENV (default: development), validated for startup."""
+    name = os.getenv('APP_ENV', 'default')
+    if name not in config:
+        raise RuntimeError(f"Unknown APP_ENV: {name}; use {', '.join(config)}")
+    config[name].validate()
+    return config[name]
@@ -1,12 +1,33 @@
 import sqlite3
 import json
 import os
+import random
+import re
+import time
 from datetime import datetime, timedelta
+import threading
 from contextlib import contextmanager
 import logging
+from config import Config
+from search_index import EmbeddingIndex
+from embedding_store import EmbeddingStore
+from metrics import timer, instrument_functions, DB_SECONDS, JSON_SECONDS, SEARCH_SECONDS
 
 DATABASE_PATH = 'lost_and_found.db'
 
+# Model that produced every embedding stored before embeddings were tagged
+LEGACY_CLIP_MODEL = 'ViT-L/14@336px'
+
+logger = logging.getLogger(__name__)
+
+# Process-wide embedding index for search_items, built lazily on first search
+_search_index = None
+_search_index_lock = threading.Lock()
+
+# Memory-mapped embedding files shared by every worker, kept next to the database
+_embedding_store = None
+_embedding_store_lock = threading.Lock()
+
 def init_database():
     """Initialize the database with the required tables."""
     with sqlite3.connect(DATABASE_PATH) as conn:
@@ -15,6 +36,8 @@ def init_database():
         # Initialize user tables first (FINDERS and COLLECTORS)
         init_users_table()
         init_boxes_table()
+        init_jobs_table()
+        init_telemetry_tables()
         
         # Create FOUND_ITEMS table for found items (renamed from CASE to avoid SQL reserved word)
         cursor.execute('''
@@ -30,6 +53,10 @@ def init_database():
                 finder_id INTEGER,   -- References FINDERS.finder_id 
                 uploaded_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 expires_at DATETIME,
+                embedding_model TEXT,  -- CLIP model that produced the embeddings
+                embedding_dim INTEGER,
+                image_sha256 TEXT,     -- SHA-256 of the image file, versions its URL
+                job_id INTEGER,        -- embed_upload job that inserted the row (References JOBS.id)
                 FOREIGN KEY (claimed_by) REFERENCES COLLECTORS (collector_id),
                 FOREIGN KEY (finder_id) REFERENCES FINDERS (finder_id)
             )
@@ -48,10 +75,33 @@ def init_database():
             )
         ''')
         
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_collected_items_box ON COLLECTED_ITEMS (box_id, uploaded_at)')
+        
         # Add migration for existing columns if needed
         migrate_user_references()
+        migrate_embedding_metadata()
+        migrate_image_hashes()
+        migrate_upload_job_ids()
+        
+        # Covering index for the item listings: their columns are stored after the
+        # embeddings in each row, so reading them from the table walks every
+        # embedding's overflow pages.  Rebuilt when the listing columns change.
+        cursor.execute("PRAGMA index_info(idx_found_items_listing)")
+        indexed = [row[2] for row in cursor.fetchall()]
+        if indexed and indexed != [name.strip() for name in LISTING_INDEX_COLUMNS.split(',')]:
+            cursor.execute('DROP INDEX idx_found_items_listing')
+            print("Rebuilding idx_found_items_listing")
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_found_items_listing ON FOUND_ITEMS ({LISTING_INDEX_COLUMNS})')
         
         conn.commit()
+    
+    # The active embedding model defaults to the one FOUND_ITEMS already uses
+    init_settings()
+    
+    # Change log triggers need FOUND_ITEMS and COLLECTED_ITEMS to exist
+    init_change_log()
+    init_claim_queue()
+    init_data_versions()
 
 def migrate_user_references():
     """Migrate existing user references to new separated table structure."""
@@ -102,178 +152,714 @@ def migrate_user_references():
         
         conn.commit()
 
+def migrate_embedding_metadata():
+    """Add model tags and re-embedding staging columns to FOUND_ITEMS."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA table_info(FOUND_ITEMS)")
+        columns = {col[1] for col in cursor.fetchall()}
+        
+        new_columns = {
+            'embedding_model': 'TEXT',
+            'embedding_dim': 'INTEGER',
+            # Filled by `db_manager.py reembed` before switching models
+            'next_embedding_model': 'TEXT',
+            'next_image_embedding': 'TEXT',
+            'next_description_embedding': 'TEXT',
+        }
+        for name, col_type in new_columns.items():
+            if name not in columns:
+                cursor.execute(f'ALTER TABLE FOUND_ITEMS ADD COLUMN {name} {col_type}')
+                print(f"Added {name} column to FOUND_ITEMS")
+        
+        # Untagged rows were all produced by the model clip_utils used to hard-code
+        cursor.execute('''
+            UPDATE FOUND_ITEMS SET embedding_model = ?, embedding_dim = 768
+            WHERE embedding_model IS NULL
+        ''', (LEGACY_CLIP_MODEL,))
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_found_items_model ON FOUND_ITEMS (embedding_model)')
+        
+        conn.commit()
+
+def migrate_image_hashes():
+    """Add the image content hash used to version image URLs to FOUND_ITEMS."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA table_info(FOUND_ITEMS)")
+        columns = {col[1] for col in cursor.fetchall()}
+        
+        # Filled on upload; `db_manager.py hash-images` backfills older rows
+        if 'image_sha256' not in columns:
+            cursor.execute('ALTER TABLE FOUND_ITEMS ADD COLUMN image_sha256 TEXT')
+            print("Added image_sha256 column to FOUND_ITEMS")
+        
+        conn.commit()
+
+def migrate_upload_job_ids():
+    """Record which upload job inserted each item, so a retried job finds its own row."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA table_info(FOUND_ITEMS)")
+        columns = {col[1] for col in cursor.fetchall()}
+        
+        if 'job_id' not in columns:
+            cursor.execute('ALTER TABLE FOUND_ITEMS ADD COLUMN job_id INTEGER')
+            print("Added job_id column to FOUND_ITEMS")
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_found_items_job ON FOUND_ITEMS (job_id) '
+                       'WHERE job_id IS NOT NULL')
+        
+        conn.commit()
+
+def init_settings():
+    """Create SETTINGS, values shared by every process, and record the active embedding model."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS SETTINGS (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        ''')
+        # Existing catalogues keep the model most of their items use; a new one starts with CLIP_MODEL
+        cursor.execute('''
+            INSERT OR IGNORE INTO SETTINGS (key, value)
+            VALUES ('embedding_model', COALESCE(
+                (SELECT embedding_model FROM FOUND_ITEMS WHERE embedding_model IS NOT NULL
+                 GROUP BY embedding_model ORDER BY COUNT(*) DESC LIMIT 1), ?))
+        ''', (Config.CLIP_MODEL,))
+        conn.commit()
+
+def get_active_embedding_model():
+    """The CLIP model the catalogue is embedded with (switched by `db_manager.py reembed`)."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM SETTINGS WHERE key = 'embedding_model'")
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+class EmbeddingModelChanged(RuntimeError):
+    """An item embedded with a model the catalogue has since switched away from."""
+
+# Seconds a connection waits for a lock before raising "database is locked"
+BUSY_TIMEOUT = 5.0
+
 @contextmanager
-def get_db_connection():
-    """Context manager for database connections."""
-    conn = sqlite3.connect(DATABASE_PATH)
+def get_db_connection(timeout=BUSY_TIMEOUT):
+    """Context manager for database connections (timeout: seconds to wait on a locked database)."""
+    conn = sqlite3.connect(DATABASE_PATH, timeout=timeout)
     conn.row_factory = sqlite3.Row  # This enables column access by name
     try:
         yield conn
     finally:
         conn.close()
 
-def add_found_item(filename, image_embedding, description="", description_embedding=None):
-    """Add a found item to the FOUND_ITEMS table."""
+def add_found_item(filename, image_embedding, description="", description_embedding=None, embedding_model=None,
+                   image_sha256=None, job_id=None):
+    """
+    Add a found item to the FOUND_ITEMS table, tagged with the model that embedded it.
+
+    Raises EmbeddingModelChanged if that is no longer the active model, since
+    search would never compare the item.
+    """
+    embedding_model = embedding_model or Config.CLIP_MODEL
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
         # Convert embeddings to JSON strings for storage
-        img_emb_json = json.dumps(image_embedding)
-        desc_emb_json = json.dumps(description_embedding) if description_embedding else None
+        with timer(JSON_SECONDS, 'embedding_encode'):
+            img_emb_json = json.dumps(image_embedding)
+            desc_emb_json = json.dumps(description_embedding) if description_embedding else None
         
         cursor.execute('''
-            INSERT INTO FOUND_ITEMS (filename, description, image_embedding, description_embedding)
-            VALUES (?, ?, ?, ?)
-        ''', (filename, description, img_emb_json, desc_emb_json))
+            INSERT INTO FOUND_ITEMS (filename, description, image_embedding, description_embedding,
+                                     embedding_model, embedding_dim, image_sha256, job_id)
+            SELECT ?, ?, ?, ?, ?, ?, ?, ?
+            WHERE EXISTS (SELECT 1 FROM SETTINGS WHERE key = 'embedding_model' AND value = ?)
+        ''', (filename, description, img_emb_json, desc_emb_json,
+              embedding_model, len(image_embedding), image_sha256, job_id, embedding_model))
+        if cursor.rowcount == 0:
+            raise EmbeddingModelChanged(f"{embedding_model} is no longer the active embedding model")
         
         conn.commit()
-        return cursor.lastrowid
+        item_id = cursor.lastrowid
+
+    # The store and index only ever hold vectors from the active model
+    if embedding_model == Config.CLIP_MODEL:
+        _update_embedding_store(lambda store: store.add(item_id, image_embedding, description_embedding))
+        if _search_index is not None:
+            _search_index.add(item_id, image_embedding, description_embedding)
+    return item_id
+
+def _iter_json_embeddings(embedding_model):
+    """Yield (id, image_embedding, description_embedding) parsed from FOUND_ITEMS for one model."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, image_embedding, description_embedding FROM FOUND_ITEMS
+            WHERE embedding_model = ? ORDER BY id
+        ''', (embedding_model,))
+        for row in cursor:
+            desc_emb = json.loads(row['description_embedding']) if row['description_embedding'] else None
+            yield row['id'], json.loads(row['image_embedding']), desc_emb
+
+def embedding_store_path(embedding_model):
+    """Base path of the embedding store for a model, e.g. lost_and_found.ViT-B-32."""
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', embedding_model).strip('-')
+    return f"{os.path.splitext(DATABASE_PATH)[0]}.{slug}"
+
+def get_embedding_store():
+    """Return the shared embedding store, backfilling it from FOUND_ITEMS if it does not exist yet."""
+    global _embedding_store
+    with _embedding_store_lock:
+        if _embedding_store is None:
+            store = EmbeddingStore(embedding_store_path(Config.CLIP_MODEL))
+            if not store.exists():
+                rows = list(_iter_json_embeddings(Config.CLIP_MODEL))
+                if rows:
+                    store.rebuild(rows, len(rows[0][1]))
+            _embedding_store = store
+        return _embedding_store
+
+def _update_embedding_store(update):
+    """Apply a write to the embedding store; SQLite stays the source of truth if it fails."""
+    try:
+        update(get_embedding_store())
+    except Exception as e:
+        logger.error(f"Failed to update embedding store: {e}")
+
+def compact_embedding_store(min_dead_ratio=0.0):
+    """Drop tombstoned rows from the embedding store once enough have accumulated."""
+    store = get_embedding_store()
+    store.refresh()
+    if store.exists() and store.dead_ratio() > min_dead_ratio:
+        return store.compact()
+    return None
+
+def get_search_index(build=True):
+    """Return the embedding index used by search_items, building it on first use (or None if build=False)."""
+    global _search_index
+    if Config.SEARCH_INDEX_MODE == 'mmap':
+        return get_embedding_store()
+    with _search_index_lock:
+        if _search_index is None and build:
+            index = EmbeddingIndex(Config.SEARCH_INDEX_MODE)
+            for item_id, img_emb, desc_emb in get_embedding_store().items():
+                index.add(item_id, img_emb, desc_emb)
+            _search_index = index
+        return _search_index
+
+def reset_search_index():
+    """Drop the index and embedding store so the next search loads those of Config.CLIP_MODEL."""
+    global _search_index, _embedding_store
+    with _search_index_lock:
+        _search_index = None
+    with _embedding_store_lock:
+        _embedding_store = None
+
+def set_search_index(index):
+    """Install a prebuilt index (e.g. restored from a snapshot) for search_items."""
+    global _search_index
+    with _search_index_lock:
+        _search_index = index
+
+def get_found_item_ids(embedding_model, item_ids=None):
+    """Ids of items embedded by a model (optionally only among item_ids), and the highest FOUND_ITEMS id."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        if item_ids is None:
+            cursor.execute('SELECT id FROM FOUND_ITEMS WHERE embedding_model = ?', (embedding_model,))
+            ids = [row['id'] for row in cursor.fetchall()]
+        else:
+            ids = []
+            for start in range(0, len(item_ids), 500):
+                chunk = item_ids[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(f'''
+                    SELECT id FROM FOUND_ITEMS WHERE embedding_model = ? AND id IN ({placeholders})
+                ''', (embedding_model, *chunk))
+                ids.extend(row['id'] for row in cursor.fetchall())
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM FOUND_ITEMS')
+        return ids, cursor.fetchone()[0]
+
+def load_item_embeddings(item_ids, chunk_size=500):
+    """Load full-precision embeddings as {id: (image_embedding, description_embedding)}."""
+    embeddings = get_embedding_store().get(item_ids)
+    item_ids = [item_id for item_id in item_ids if item_id not in embeddings]
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        for start in range(0, len(item_ids), chunk_size):
+            chunk = item_ids[start:start + chunk_size]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(f'''
+                SELECT id, image_embedding, description_embedding FROM FOUND_ITEMS
+                WHERE id IN ({placeholders})
+            ''', chunk)
+            with timer(JSON_SECONDS, 'embedding_decode'):
+                for row in cursor:
+                    desc_emb = json.loads(row['description_embedding']) if row['description_embedding'] else None
+                    embeddings[row['id']] = (json.loads(row['image_embedding']), desc_emb)
+    return embeddings
+
+# FOUND_ITEMS columns returned by the item queries: everything but the embeddings,
+# which are several kilobytes of JSON per row and are read through
+# load_item_embeddings / the search index instead
+ITEM_COLUMNS = ('id, filename, description, status, claimed_at, claimed_by, finder_id, '
+                'uploaded_at, expires_at, embedding_model, embedding_dim, image_sha256')
+LISTING_INDEX_COLUMNS = ('status, expires_at, id, filename, description, claimed_at, claimed_by, '
+                         'finder_id, uploaded_at, embedding_model, embedding_dim, image_sha256')
 
 def get_available_items():
     """Get all available (unclaimed) items."""
     with get_db_connection() as conn:
         cursor = conn.cursor()
         current_time = datetime.now().isoformat()
-        cursor.execute('''
-            SELECT * FROM FOUND_ITEMS 
-            WHERE status = 'available' OR (status = 'claimed' AND datetime(expires_at) < datetime(?))
+        cursor.execute(f'''
+            SELECT {ITEM_COLUMNS} FROM FOUND_ITEMS 
+            WHERE status = 'available' OR (status = 'claimed' AND expires_at < ?)
         ''', (current_time,))
         return cursor.fetchall()
 
 def get_all_items():
-    """Get all items from the FOUND_ITEMS table."""
+    """Get all items from the FOUND_ITEMS table (without embeddings)."""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM FOUND_ITEMS')
-        return cursor.fetchall()
+        # Read from the listing index (ORDER BY id would make SQLite scan the table)
+        cursor.execute(f'SELECT {ITEM_COLUMNS} FROM FOUND_ITEMS')
+        return sorted(cursor.fetchall(), key=lambda item: item['id'])
 
-def claim_item(item_id, claimed_by_collector_id):
-    """Claim an item for 1 hour by collector ID."""
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        # Check if item is available
-        cursor.execute('''
-            SELECT status, expires_at FROM FOUND_ITEMS 
-            WHERE id = ?
-        ''', (item_id,))
-        
-        result = cursor.fetchone()
-        if not result:
-            return False, "Item not found"
-        
-        status, expires_at = result
-        
-        # Check if item is available or claim has expired
-        if status == 'claimed' and expires_at:
-            expires_datetime = datetime.fromisoformat(expires_at)
-            if datetime.now() < expires_datetime:
-                return False, "Item is currently claimed"
-        
-        # Claim the item
-        claimed_at = datetime.now()
-        expires_at = claimed_at + timedelta(minutes=1)
+def _is_locked_error(error):
+    return isinstance(error, sqlite3.OperationalError) and 'locked' in str(error)
+
+def run_immediate_transaction(work, busy_timeout_ms=None, max_retries=None):
+    """
+    Run work(cursor) inside BEGIN IMMEDIATE and return its result.
+
+    The write lock is taken up front, so work's reads and writes cannot
+    interleave with another writer.  While the database is locked the
+    transaction is retried up to max_retries times with exponential
+    backoff and full jitter, so a burst of writers spreads out instead of
+    waking in lockstep.
+    """
+    busy_timeout_ms = Config.CLAIM_BUSY_TIMEOUT_MS if busy_timeout_ms is None else busy_timeout_ms
+    max_retries = Config.CLAIM_MAX_RETRIES if max_retries is None else max_retries
+    attempt = 0
+    while True:
+        try:
+            with get_db_connection(timeout=busy_timeout_ms / 1000) as conn:
+                conn.isolation_level = None
+                cursor = conn.cursor()
+                cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    result = work(cursor)
+                    cursor.execute('COMMIT')
+                    return result
+                except Exception:
+                    cursor.execute('ROLLBACK')
+                    raise
+        except sqlite3.OperationalError as e:
+            if not _is_locked_error(e) or attempt >= max_retries:
+                raise
+            delay = min(Config.CLAIM_RETRY_MAX_MS, Config.CLAIM_RETRY_BASE_MS * 2 ** attempt) / 1000
+            time.sleep(random.uniform(0, delay))
+            attempt += 1
+
+def claim_duration():
+    return timedelta(hours=Config.CLAIM_DURATION_HOURS)
+
+def _end_claims(cursor, where, params, now):
+    """
+    End the claims on the claimed FOUND_ITEMS rows matching where, inside the
+    caller's transaction.  Each item goes to the first collector in its
+    CLAIM_QUEUE, or back to 'available' when nobody is waiting.  Returns
+    (released_count, [(item_id, collector_id) handed off]).
+    """
+    cursor.execute(f'''
+        SELECT id, (SELECT collector_id FROM CLAIM_QUEUE q
+                    WHERE q.item_id = FOUND_ITEMS.id ORDER BY q.id LIMIT 1) AS next_collector
+        FROM FOUND_ITEMS
+        WHERE status = 'claimed' AND {where}
+    ''', params)
+    rows = cursor.fetchall()
+    handed_off = [(row['id'], row['next_collector']) for row in rows if row['next_collector'] is not None]
+    released = [(row['id'],) for row in rows if row['next_collector'] is None]
+    
+    expires_at = now + claim_duration()
+    cursor.executemany('''
+        UPDATE FOUND_ITEMS SET claimed_by = ?, claimed_at = ?, expires_at = ? WHERE id = ?
+    ''', [(collector_id, now.isoformat(), expires_at.isoformat(), item_id) for item_id, collector_id in handed_off])
+    cursor.executemany('DELETE FROM CLAIM_QUEUE WHERE item_id = ? AND collector_id = ?', handed_off)
+    cursor.executemany('''
+        UPDATE FOUND_ITEMS 
+        SET status = 'available', claimed_at = NULL, claimed_by = NULL, expires_at = NULL
+        WHERE id = ?
+    ''', released)
+    return len(released), handed_off
+
+def _record_claims(handed_off):
+    # Buffered, written by flush_user_stats after the claims have committed
+    for _, collector_id in handed_off:
+        queue_collector_stats(collector_id, items_claimed_increment=1)
+
+def claim_item(item_id, claimed_by_collector_id, wait=False):
+    """
+    Claim an item for CLAIM_DURATION_HOURS if it is available or its claim has expired.
+
+    With wait, a collector who finds the item claimed joins its CLAIM_QUEUE in
+    the same transaction and is given the item when the current claim ends.
+    """
+    now = datetime.now()
+    expires_at = now + claim_duration()
+    
+    def claim(cursor):
+        # An expired claim on this item goes to the head of its queue first
+        _, handed_off = _end_claims(cursor, 'id = ? AND expires_at < ?', (item_id, now.isoformat()), now)
         
+        # Check and claim in one statement: only one concurrent claimer can match
         cursor.execute('''
             UPDATE FOUND_ITEMS 
             SET status = 'claimed', claimed_at = ?, claimed_by = ?, expires_at = ?
-            WHERE id = ?
-        ''', (claimed_at.isoformat(), claimed_by_collector_id, expires_at.isoformat(), item_id))
+            WHERE id = ? AND status = 'available'
+        ''', (now.isoformat(), claimed_by_collector_id, expires_at.isoformat(), item_id))
+        if cursor.rowcount == 1:
+            return (True, "Item claimed successfully"), handed_off + [(item_id, claimed_by_collector_id)]
         
-        # Update collector's last active timestamp and stats
-        update_collector_stats(claimed_by_collector_id, items_claimed_increment=1)
+        cursor.execute('SELECT status, claimed_by FROM FOUND_ITEMS WHERE id = ?', (item_id,))
+        row = cursor.fetchone()
+        if not row:
+            return (False, "Item not found"), handed_off
+        if row['status'] != 'claimed':
+            return (False, f"Item is not available ({row['status']})"), handed_off
+        if str(row['claimed_by']) == str(claimed_by_collector_id):
+            if handed_off:
+                return (True, "Item claimed successfully"), handed_off  # was first in the queue
+            return (False, "Item is already claimed by you"), handed_off
+        if not wait:
+            return (False, "Item is currently claimed"), handed_off
         
-        conn.commit()
-        return True, "Item claimed successfully"
+        cursor.execute('SELECT COUNT(*) FROM CLAIM_QUEUE WHERE item_id = ?', (item_id,))
+        if cursor.fetchone()[0] >= Config.CLAIM_QUEUE_MAX_LENGTH:
+            return (False, "Item is currently claimed and its queue is full"), handed_off
+        cursor.execute('''
+            INSERT OR IGNORE INTO CLAIM_QUEUE (item_id, collector_id, queued_at) VALUES (?, ?, ?)
+        ''', (item_id, claimed_by_collector_id, now.isoformat()))
+        return (False, "Item is currently claimed; queued for it"), handed_off
+    
+    result, handed_off = run_immediate_transaction(claim)
+    _record_claims(handed_off)
+    return result
+
+def release_claim(item_id, collector_id):
+    """Give up a claim early; the item goes straight to the next collector in its queue."""
+    now = datetime.now()
+    
+    def release(cursor):
+        released, handed_off = _end_claims(cursor, 'id = ? AND claimed_by = ?', (item_id, collector_id), now)
+        if released or handed_off:
+            return (True, "Claim released"), handed_off
+        cursor.execute('SELECT status FROM FOUND_ITEMS WHERE id = ?', (item_id,))
+        if not cursor.fetchone():
+            return (False, "Item not found"), handed_off
+        return (False, "Item is not claimed by this collector"), handed_off
+    
+    # Not raced like claims: wait as long as any other write would
+    result, handed_off = run_immediate_transaction(release, busy_timeout_ms=BUSY_TIMEOUT * 1000)
+    _record_claims(handed_off)
+    return result
 
 def release_expired_claims():
-    """Release claims that have expired (older than 1 hour)."""
+    """End expired claims, handing each item to its next queued collector; returns how many ended."""
+    # Use Python's current time instead of SQLite's UTC time for consistency
+    now = datetime.now()
+    
+    def release(cursor):
+        return _end_claims(cursor, 'expires_at < ?', (now.isoformat(),), now)
+    
+    # A sweep can wait behind long readers as long as any other write would
+    released, handed_off = run_immediate_transaction(release, busy_timeout_ms=BUSY_TIMEOUT * 1000)
+    _record_claims(handed_off)
+    return released + len(handed_off)
+
+def next_claim_expiry():
+    """Earliest expires_at of a current claim (as a datetime), or None."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MIN(expires_at) FROM FOUND_ITEMS WHERE status = 'claimed'")
+        expires_at = cursor.fetchone()[0]
+        return datetime.fromisoformat(expires_at) if expires_at else None
+
+def release_overdue_claims():
+    """release_expired_claims() for request paths: only a read unless a claim is overdue."""
+    expires_at = next_claim_expiry()
+    if expires_at is not None and expires_at <= datetime.now():
+        return release_expired_claims()
+    return 0
+
+def leave_claim_queue(item_id, collector_id):
+    """Remove a collector from an item's queue; returns whether they were in it."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM CLAIM_QUEUE WHERE item_id = ? AND collector_id = ?', (item_id, collector_id))
+        conn.commit()
+        return cursor.rowcount > 0
+
+def get_claim_queue(item_id):
+    """Collectors waiting for an item, first in line first."""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        
-        # Use Python's current time instead of SQLite's UTC time for consistency
-        current_time = datetime.now().isoformat()
-        
         cursor.execute('''
-            UPDATE FOUND_ITEMS 
-            SET status = 'available', claimed_at = NULL, claimed_by = NULL, expires_at = NULL
-            WHERE status = 'claimed' AND datetime(expires_at) < datetime(?)
-        ''', (current_time,))
-        
+            SELECT collector_id, queued_at FROM CLAIM_QUEUE WHERE item_id = ? ORDER BY id
+        ''', (item_id,))
+        return cursor.fetchall()
+
+def get_claim_queue_position(item_id, collector_id):
+    """1-based position of a collector in an item's queue, or None if not queued."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COUNT(*) FROM CLAIM_QUEUE
+            WHERE item_id = ? AND id <= (SELECT id FROM CLAIM_QUEUE WHERE item_id = ? AND collector_id = ?)
+        ''', (item_id, item_id, collector_id))
+        return cursor.fetchone()[0] or None
+
+def init_claim_queue():
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS CLAIM_QUEUE (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,  -- FIFO order
+                item_id INTEGER NOT NULL,
+                collector_id INTEGER NOT NULL,
+                queued_at DATETIME,
+                UNIQUE (item_id, collector_id),
+                FOREIGN KEY (item_id) REFERENCES FOUND_ITEMS (id),
+                FOREIGN KEY (collector_id) REFERENCES COLLECTORS (collector_id)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_claim_queue_item ON CLAIM_QUEUE (item_id, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_found_items_claim_expiry ON FOUND_ITEMS (status, expires_at)')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_claim_queue_item_deleted AFTER DELETE ON FOUND_ITEMS
+            BEGIN
+                DELETE FROM CLAIM_QUEUE WHERE item_id = OLD.id;
+            END
+        ''')
         conn.commit()
-        return cursor.rowcount
 
 def delete_item(filename):
     """Delete an item from the FOUND_ITEMS table."""
     with get_db_connection() as conn:
         cursor = conn.cursor()
+        cursor.execute('SELECT id FROM FOUND_ITEMS WHERE filename = ?', (filename,))
+        row = cursor.fetchone()
         cursor.execute('DELETE FROM FOUND_ITEMS WHERE filename = ?', (filename,))
         conn.commit()
-        return cursor.rowcount > 0
+        deleted = cursor.rowcount > 0
+
+    if deleted and row:
+        _update_embedding_store(lambda store: store.remove(row['id']))
+        if _search_index is not None:
+            _search_index.remove(row['id'])
+    return deleted
 
 def get_item_by_filename(filename):
-    """Get an item by filename."""
+    """Get an item by filename (without embeddings)."""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM FOUND_ITEMS WHERE filename = ?', (filename,))
+        cursor.execute(f'SELECT {ITEM_COLUMNS} FROM FOUND_ITEMS WHERE filename = ?', (filename,))
         return cursor.fetchone()
 
+def get_item_by_job(job_id):
+    """Get the item inserted by an upload job (without embeddings)."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT {ITEM_COLUMNS} FROM FOUND_ITEMS WHERE job_id = ?', (job_id,))
+        return cursor.fetchone()
+
+def item_exists(filename):
+    """Whether an item with this filename exists (answered from the filename index)."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT 1 FROM FOUND_ITEMS WHERE filename = ?', (filename,))
+        return cursor.fetchone() is not None
+
 def search_items(query_embedding, threshold=0.4):
-    """Search for items based on embedding similarity."""
+    """Search for items based on embedding similarity.
+
+    Only items embedded by the configured CLIP model are compared, since
+    vectors from different models are not comparable.
+    """
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
-        # Get all available items
+        # Get all available items (embeddings are served by the search index)
         current_time = datetime.now().isoformat()
         cursor.execute('''
-            SELECT * FROM FOUND_ITEMS 
-            WHERE status = 'available' OR (status = 'claimed' AND datetime(expires_at) < datetime(?))
-        ''', (current_time,))
+            SELECT id, filename, description, status, claimed_by, expires_at, uploaded_at, image_sha256
+            FROM FOUND_ITEMS 
+            WHERE (status = 'available' OR (status = 'claimed' AND expires_at < ?))
+              AND embedding_model = ?
+        ''', (current_time, Config.CLIP_MODEL))
         
-        items = cursor.fetchall()
-        results = []
-        
-        import numpy as np
-        query_emb = np.array(query_embedding, dtype=np.float32)
+        items = {item['id']: item for item in cursor.fetchall()}
+
+    index = get_search_index()
+
+    # Pick up rows inserted by other processes since the index was built
+    missing = [item_id for item_id in items if item_id not in index]
+    if missing:
+        for item_id, (img_emb, desc_emb) in load_item_embeddings(missing).items():
+            index.add(item_id, img_emb, desc_emb)
+
+    results = []
+    with timer(SEARCH_SECONDS):
+        matches = index.search(query_embedding, threshold, item_ids=list(items), loader=load_item_embeddings)
+
+    overdue = False
+    for item_id, final_score in matches:
+        item = items[item_id]
+
+        # Update status if claim expired
+        if item['status'] == 'claimed' and item['expires_at']:
+            expires_datetime = datetime.fromisoformat(item['expires_at'])
+            if datetime.now() > expires_datetime:
+                overdue = True
+                status = 'available'
+            else:
+                status = item['status']
+        else:
+            status = item['status']
         
-        for item in items:
-            # Parse image embedding
-            img_emb = np.array(json.loads(item['image_embedding']), dtype=np.float32)
-            img_score = float(np.dot(query_emb, img_emb) / (np.linalg.norm(query_emb) * np.linalg.norm(img_emb)))
-            
-            # Parse description embedding if available
-            desc_score = 0.0
-            if item['description_embedding']:
-                desc_emb = np.array(json.loads(item['description_embedding']), dtype=np.float32)
-                desc_score = float(np.dot(query_emb, desc_emb) / (np.linalg.norm(query_emb) * np.linalg.norm(desc_emb)))
-            
-            # Combine scores
-            final_score = (img_score + desc_score) / 2 if desc_score != 0 else img_score
+        results.append({
+            'id': item['id'],
+            'filename': item['filename'],
+            'description': item['description'],
+            'score': final_score,
+            'status': status,
+            'claimed_by': item['claimed_by'],
+            'expires_at': item['expires_at'],
+            'uploaded_at': item['uploaded_at'],
+            'image_sha256': item['image_sha256']
+        })
+
+    # One sweep for all expired matches, and none when no match was overdue
+    if overdue:
+        release_expired_claims()
+    
+    return results
+
+
+def get_items_missing_image_hash(batch_size=500, after_id=0):
+    """Next batch of (id, filename) rows above after_id without an image hash."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, filename FROM FOUND_ITEMS
+            WHERE image_sha256 IS NULL AND id > ?
+            ORDER BY id LIMIT ?
+        ''', (after_id, batch_size))
+        return cursor.fetchall()
+
+def set_image_hashes(hashes):
+    """Store image hashes given as (sha256, item_id) pairs."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('UPDATE FOUND_ITEMS SET image_sha256 = ? WHERE id = ?', hashes)
+        conn.commit()
+        return cursor.rowcount
+
+
+# RE-EMBEDDING - move the catalogue to a different CLIP model in resumable batches
+def get_items_pending_reembed(embedding_model, batch_size=32):
+    """Get the next batch of items that have not been re-embedded with embedding_model yet."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, filename, description FROM FOUND_ITEMS
+            WHERE embedding_model != ?
+              AND (next_embedding_model IS NULL OR next_embedding_model != ?)
+            ORDER BY id LIMIT ?
+        ''', (embedding_model, embedding_model, batch_size))
+        return cursor.fetchall()
+
+def count_pending_reembed(embedding_model):
+    """Count items still waiting to be re-embedded with embedding_model."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COUNT(*) FROM FOUND_ITEMS
+            WHERE embedding_model != ?
+              AND (next_embedding_model IS NULL OR next_embedding_model != ?)
+        ''', (embedding_model, embedding_model))
+        return cursor.fetchone()[0]
+
+def stage_reembedded_items(embedding_model, embeddings):
+    """
+    Store new embeddings next to the live ones.
+
+    embeddings is a list of (item_id, image_embedding, description_embedding);
+    an image_embedding of None marks an item that could not be re-embedded, so
+    it keeps its old model tag after the switch.
+    """
+    rows = [
+        (embedding_model,
+         json.dumps(img_emb) if img_emb is not None else None,
+         json.dumps(desc_emb) if desc_emb else None,
+         item_id)
+        for item_id, img_emb, desc_emb in embeddings
+    ]
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            UPDATE FOUND_ITEMS
+            SET next_embedding_model = ?, next_image_embedding = ?, next_description_embedding = ?
+            WHERE id = ?
+        ''', rows)
+        conn.commit()
+
+def switch_embedding_model(embedding_model):
+    """
+    Atomically promote the staged embeddings for embedding_model.
+
+    Returns the number of items switched, or None if items are still pending.
+    """
+    with get_db_connection() as conn:
+        conn.isolation_level = None
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute('''
+                SELECT COUNT(*) FROM FOUND_ITEMS
+                WHERE embedding_model != ?
+                  AND (next_embedding_model IS NULL OR next_embedding_model != ?)
+            ''', (embedding_model, embedding_model))
+            if cursor.fetchone()[0]:
+                cursor.execute('ROLLBACK')
+                return None
             
-            if final_score > threshold:
-                # Update status if claim expired
-                if item['status'] == 'claimed' and item['expires_at']:
-                    expires_datetime = datetime.fromisoformat(item['expires_at'])
-                    if datetime.now() > expires_datetime:
-                        release_expired_claims()  # Clean up expired claims
-                        status = 'available'
-                    else:
-                        status = item['status']
-                else:
-                    status = item['status']
-                
-                results.append({
-                    'id': item['id'],
-                    'filename': item['filename'],
-                    'description': item['description'],
-                    'score': final_score,
-                    'status': status,
-                    'claimed_by': item['claimed_by'],
-                    'expires_at': item['expires_at'],
-                    'uploaded_at': item['uploaded_at']
-                })
-        
-        return results
+            cursor.execute('''
+                UPDATE FOUND_ITEMS
+                SET image_embedding = next_image_embedding,
+                    description_embedding = next_description_embedding,
+                    embedding_model = next_embedding_model,
+                    embedding_dim = json_array_length(next_image_embedding)
+                WHERE next_embedding_model = ? AND next_image_embedding IS NOT NULL
+            ''', (embedding_model,))
+            switched = cursor.rowcount
+            cursor.execute('''
+                UPDATE FOUND_ITEMS
+                SET next_embedding_model = NULL, next_image_embedding = NULL, next_description_embedding = NULL
+                WHERE next_embedding_model IS NOT NULL
+            ''')
+            # Running servers follow this row (see clip_utils.follow_active_model)
+            cursor.execute('''
+                INSERT INTO SETTINGS (key, value) VALUES ('embedding_model', ?)
+                ON CONFLICT (key) DO UPDATE SET value = excluded.value
+            ''', (embedding_model,))
+            cursor.execute('COMMIT')
+            return switched
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
 
 
 # COLLECT
@@ -286,18 +872,22 @@ def collect_found_item(filename, imgtaken_timestamp, box_id, finder_id=None):
             VALUES (?, ?, ?, ?)
         ''', (filename, imgtaken_timestamp, box_id, finder_id))
         
-        # Update finder stats if provided
-        if finder_id:
-            update_finder_stats(finder_id, items_found_increment=1, reputation_increment=1)
-            
         conn.commit()
-        return cursor.lastrowid
+        item_id = cursor.lastrowid
+    
+    # Update finder stats if provided (buffered, written by flush_user_stats)
+    if finder_id:
+        queue_finder_stats(finder_id, items_found_increment=1, reputation_increment=1)
+    return item_id
 
-def get_collected_items():
-    """Get all collected items."""
+def get_collected_items(box_id=None):
+    """Get all collected items, or those of one box."""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM COLLECTED_ITEMS ORDER BY uploaded_at DESC')
+        if box_id is None:
+            cursor.execute('SELECT * FROM COLLECTED_ITEMS ORDER BY uploaded_at DESC')
+        else:
+            cursor.execute('SELECT * FROM COLLECTED_ITEMS WHERE box_id = ? ORDER BY uploaded_at DESC', (box_id,))
         return cursor.fetchall()
 
 def clear_all_items():
@@ -306,7 +896,12 @@ def clear_all_items():
         cursor = conn.cursor()
         cursor.execute('DELETE FROM FOUND_ITEMS')
         conn.commit()
-        return cursor.rowcount
+        deleted_count = cursor.rowcount
+
+    _update_embedding_store(lambda store: store.clear())
+    if _search_index is not None:
+        _search_index.clear()
+    return deleted_count
 
 # USER MANAGEMENT - Separated into FINDERS and COLLECTORS tables
 def init_finders_table():
@@ -357,6 +952,7 @@ def init_users_table():
     
     # Migrate existing USERS table if it exists
     migrate_users_to_separated_tables()
+    init_user_stats()
 
 def migrate_users_to_separated_tables():
     """Migrate existing USERS table data to FINDERS and COLLECTORS tables."""
@@ -398,6 +994,119 @@ def migrate_users_to_separated_tables():
             
         conn.commit()
 
+# USER_STATS - single-row counters for /users/stats, maintained by triggers on FINDERS and COLLECTORS
+USER_STATS_TRIGGERS = {
+    'trg_finders_stats_insert': '''
+        AFTER INSERT ON FINDERS BEGIN
+            UPDATE USER_STATS SET total_finders = total_finders + 1,
+                                  active_finders = active_finders + IFNULL(NEW.items_found > 0, 0);
+        END''',
+    'trg_finders_stats_delete': '''
+        AFTER DELETE ON FINDERS BEGIN
+            UPDATE USER_STATS SET total_finders = total_finders - 1,
+                                  active_finders = active_finders - IFNULL(OLD.items_found > 0, 0);
+        END''',
+    'trg_finders_stats_update': '''
+        AFTER UPDATE OF items_found ON FINDERS
+        WHEN IFNULL(NEW.items_found > 0, 0) != IFNULL(OLD.items_found > 0, 0) BEGIN
+            UPDATE USER_STATS SET active_finders = active_finders + IFNULL(NEW.items_found > 0, 0)
+                                                                  - IFNULL(OLD.items_found > 0, 0);
+        END''',
+    'trg_collectors_stats_insert': '''
+        AFTER INSERT ON COLLECTORS BEGIN
+            UPDATE USER_STATS SET total_collectors = total_collectors + 1,
+                                  active_collectors = active_collectors + IFNULL(NEW.items_claimed > 0, 0),
+                                  verified_collectors = verified_collectors
+                                                        + IFNULL(NEW.verification_status = 'verified', 0);
+        END''',
+    'trg_collectors_stats_delete': '''
+        AFTER DELETE ON COLLECTORS BEGIN
+            UPDATE USER_STATS SET total_collectors = total_collectors - 1,
+                                  active_collectors = active_collectors - IFNULL(OLD.items_claimed > 0, 0),
+                                  verified_collectors = verified_collectors
+                                                        - IFNULL(OLD.verification_status = 'verified', 0);
+        END''',
+    'trg_collectors_stats_update': '''
+        AFTER UPDATE OF items_claimed, verification_status ON COLLECTORS
+        WHEN IFNULL(NEW.items_claimed > 0, 0) != IFNULL(OLD.items_claimed > 0, 0)
+          OR IFNULL(NEW.verification_status = 'verified', 0) != IFNULL(OLD.verification_status = 'verified', 0) BEGIN
+            UPDATE USER_STATS SET
+                active_collectors = active_collectors + IFNULL(NEW.items_claimed > 0, 0)
+                                                      - IFNULL(OLD.items_claimed > 0, 0),
+                verified_collectors = verified_collectors + IFNULL(NEW.verification_status = 'verified', 0)
+                                                          - IFNULL(OLD.verification_status = 'verified', 0);
+        END''',
+}
+
+# Aggregate counts, used to seed USER_STATS and to check it
+USER_STATS_QUERY = '''
+    SELECT f.total_finders, c.total_collectors, f.active_finders, c.active_collectors, c.verified_collectors
+    FROM (SELECT COUNT(*) AS total_finders,
+                 COUNT(*) FILTER (WHERE items_found > 0) AS active_finders
+          FROM FINDERS) AS f,
+         (SELECT COUNT(*) AS total_collectors,
+                 COUNT(*) FILTER (WHERE items_claimed > 0) AS active_collectors,
+                 COUNT(*) FILTER (WHERE verification_status = 'verified') AS verified_collectors
+          FROM COLLECTORS) AS c
+'''
+
+def init_user_stats():
+    with get_db_connection() as conn:
+        conn.isolation_level = None
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS USER_STATS (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    total_finders INTEGER NOT NULL,
+                    total_collectors INTEGER NOT NULL,
+                    active_finders INTEGER NOT NULL,      -- items_found > 0
+                    active_collectors INTEGER NOT NULL,   -- items_claimed > 0
+                    verified_collectors INTEGER NOT NULL
+                )
+            ''')
+            # Recreated so databases pick up changed trigger bodies (same transaction: no change is missed)
+            for name, body in USER_STATS_TRIGGERS.items():
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+                cursor.execute(f'CREATE TRIGGER {name} {body}')
+            # Seeded once, in the same transaction as the triggers so no change is missed
+            cursor.execute(f'''
+                INSERT OR IGNORE INTO USER_STATS
+                    (id, total_finders, total_collectors, active_finders, active_collectors, verified_collectors)
+                SELECT 1, * FROM ({USER_STATS_QUERY})
+            ''')
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+
+def get_user_stat_counts():
+    """Finder and collector counts from the USER_STATS counters (one row read)."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT total_finders, total_collectors, active_finders, active_collectors, verified_collectors
+            FROM USER_STATS WHERE id = 1
+        ''')
+        row = cursor.fetchone()
+        if row is None:  # table not initialized in this database yet
+            cursor.execute(USER_STATS_QUERY)
+            row = cursor.fetchone()
+        return dict(row)
+
+def recount_user_stats():
+    """Recompute USER_STATS from FINDERS and COLLECTORS; returns the corrected counts."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO USER_STATS
+                (id, total_finders, total_collectors, active_finders, active_collectors, verified_collectors)
+            SELECT 1, * FROM ({USER_STATS_QUERY})
+        ''')
+        conn.commit()
+    return get_user_stat_counts()
+
 # FINDER management functions
 def add_finder(name, email=None, phone=None, rfid_tag=None):
     """Add a new finder to the system."""
@@ -447,6 +1156,73 @@ def update_finder_stats(finder_id, items_found_increment=0, reputation_increment
         conn.commit()
         return cursor.rowcount > 0
 
+# Buffered stat increments: merged per user in memory and written in one
+# transaction by flush_user_stats (every USER_STATS_FLUSH_INTERVAL seconds,
+# at shutdown, and before reads that must be exact)
+_pending_finder_stats = {}     # finder_id -> [items_found, reputation, last_active]
+_pending_collector_stats = {}  # collector_id -> [items_claimed, last_active]
+_pending_stats_lock = threading.Lock()
+
+def queue_finder_stats(finder_id, items_found_increment=0, reputation_increment=0):
+    """Buffer a finder stats update (written immediately if buffering is disabled)."""
+    with _pending_stats_lock:
+        pending = _pending_finder_stats.setdefault(finder_id, [0, 0, None])
+        pending[0] += items_found_increment
+        pending[1] += reputation_increment
+        pending[2] = datetime.now().isoformat()
+    if Config.USER_STATS_FLUSH_INTERVAL <= 0:
+        flush_user_stats()
+
+def queue_collector_stats(collector_id, items_claimed_increment=0):
+    """Buffer a collector stats update (written immediately if buffering is disabled)."""
+    with _pending_stats_lock:
+        pending = _pending_collector_stats.setdefault(collector_id, [0, None])
+        pending[0] += items_claimed_increment
+        pending[1] = datetime.now().isoformat()
+    if Config.USER_STATS_FLUSH_INTERVAL <= 0:
+        flush_user_stats()
+
+def flush_user_stats():
+    """Write buffered finder/collector stat increments; returns the number of users updated."""
+    global _pending_finder_stats, _pending_collector_stats
+    with _pending_stats_lock:
+        if not _pending_finder_stats and not _pending_collector_stats:
+            return 0
+        finders, _pending_finder_stats = _pending_finder_stats, {}
+        collectors, _pending_collector_stats = _pending_collector_stats, {}
+    
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                UPDATE FINDERS
+                SET items_found = items_found + ?,
+                    reputation_score = reputation_score + ?,
+                    last_active = MAX(COALESCE(last_active, ''), ?)
+                WHERE finder_id = ?
+            ''', [(found, reputation, last_active, finder_id)
+                  for finder_id, (found, reputation, last_active) in finders.items()])
+            cursor.executemany('''
+                UPDATE COLLECTORS
+                SET items_claimed = items_claimed + ?,
+                    last_active = MAX(COALESCE(last_active, ''), ?)
+                WHERE collector_id = ?
+            ''', [(claimed, last_active, collector_id)
+                  for collector_id, (claimed, last_active) in collectors.items()])
+            conn.commit()
+    except Exception:
+        # Put the increments back (merged with any queued meanwhile) for the next flush
+        with _pending_stats_lock:
+            for finder_id, (found, reputation, last_active) in finders.items():
+                pending = _pending_finder_stats.setdefault(finder_id, [0, 0, last_active])
+                pending[0] += found
+                pending[1] += reputation
+            for collector_id, (claimed, last_active) in collectors.items():
+                pending = _pending_collector_stats.setdefault(collector_id, [0, last_active])
+                pending[0] += claimed
+        raise
+    return len(finders) + len(collectors)
+
 # COLLECTOR management functions  
 def add_collector(name, email=None, phone=None, student_id=None, id_number=None):
     """Add a new collector (item claimer) to the system."""
@@ -504,6 +1280,34 @@ def update_collector_stats(collector_id, items_claimed_increment=0, verification
         conn.commit()
         return cursor.rowcount > 0
 
+# Identity lookups: the users a credential belongs to, each query served by a unique index
+_FINDER_IDENTITY = "SELECT 'finder' AS user_type, finder_id AS user_id, name, email, rfid_tag, NULL AS student_id FROM FINDERS"
+_COLLECTOR_IDENTITY = "SELECT 'collector' AS user_type, collector_id AS user_id, name, email, NULL AS rfid_tag, student_id FROM COLLECTORS"
+IDENTITY_QUERIES = {
+    'email': f"{_FINDER_IDENTITY} WHERE email = :value UNION ALL {_COLLECTOR_IDENTITY} WHERE email = :value",
+    'rfid': f"{_FINDER_IDENTITY} WHERE rfid_tag = :value",
+    'finder_id': f"{_FINDER_IDENTITY} WHERE finder_id = :value",
+    'student_id': f"{_COLLECTOR_IDENTITY} WHERE student_id = :value",
+    'collector_id': f"{_COLLECTOR_IDENTITY} WHERE collector_id = :value",
+}
+
+def find_identities(kind, value):
+    """Finders, then collectors, matching an email, rfid, student_id, finder_id or collector_id."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(IDENTITY_QUERIES[kind], {"value": value})
+        return cursor.fetchall()
+
+def get_rfid_identities(limit):
+    """Identities of the most recently active finders that have an RFID tag."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            {_FINDER_IDENTITY} WHERE rfid_tag IS NOT NULL
+            ORDER BY last_active DESC LIMIT ?
+        ''', (limit,))
+        return cursor.fetchall()
+
 # Get all functions for admin/reporting
 def get_all_finders():
     """Get all finders in the system."""
@@ -590,6 +1394,27 @@ def update_box_status(box_id, status=None, door_status=None, current_load=None):
         return cursor.rowcount > 0
 
 
+def flush_box_states(updates):
+    """
+    Write coalesced box state changes in one transaction.  Each update is
+    (status, door_status, current_load, load_delta, last_updated, box_id);
+    None leaves a column as it is, and load_delta is added to the load (so
+    increments from several processes are not lost).
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            UPDATE BOXES
+            SET status = COALESCE(?, status),
+                door_status = COALESCE(?, door_status),
+                current_load = COALESCE(?, current_load) + ?,
+                last_updated = ?
+            WHERE id = ?
+        ''', updates)
+        conn.commit()
+        return cursor.rowcount
+
+
 def get_box_status(box_id):
     with get_db_connection() as conn:
         cursor = conn.cursor()
@@ -605,4 +1430,476 @@ def get_all_boxes():
 
 
 
+# JOBS - durable background work queue (see job_worker.py)
+def init_jobs_table():
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS JOBS (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,           -- JSON arguments for the handler
+                status TEXT DEFAULT 'queued',    -- queued, running, done, failed
+                attempts INTEGER DEFAULT 0,
+                max_attempts INTEGER DEFAULT 5,
+                run_after DATETIME,              -- not picked up before this time (retry backoff)
+                locked_by TEXT,                  -- host:pid of the worker running it
+                locked_at DATETIME,
+                result TEXT,                     -- JSON result once done
+                error TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after ON JOBS (status, run_after)')
+        conn.commit()
+
+def enqueue_job(kind, payload, max_attempts=None):
+    """Queue a job for the worker pool and return its id."""
+    max_attempts = max_attempts or Config.JOB_MAX_ATTEMPTS
+    now = datetime.now().isoformat()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO JOBS (kind, payload, max_attempts, run_after, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (kind, json.dumps(payload), max_attempts, now, now, now))
+        conn.commit()
+        return cursor.lastrowid
+
+def claim_next_job(worker_id, kinds):
+    """Atomically mark the oldest due job of the given kinds as running and return it, or None."""
+    if not kinds:
+        return None
+    now = datetime.now().isoformat()
+    placeholders = ", ".join("?" * len(kinds))
+    with get_db_connection() as conn:
+        conn.isolation_level = None
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute(f'''
+                SELECT * FROM JOBS
+                WHERE status = 'queued' AND run_after <= ? AND kind IN ({placeholders})
+                ORDER BY run_after, id LIMIT 1
+            ''', (now, *kinds))
+            job = cursor.fetchone()
+            if job:
+                cursor.execute('''
+                    UPDATE JOBS SET status = 'running', attempts = attempts + 1,
+                                    locked_by = ?, locked_at = ?, updated_at = ?
+                    WHERE id = ?
+                ''', (worker_id, now, now, job['id']))
+                cursor.execute('SELECT * FROM JOBS WHERE id = ?', (job['id'],))
+                job = cursor.fetchone()
+            cursor.execute('COMMIT')
+            return job
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+
+def complete_job(job_id, result):
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE JOBS SET status = 'done', result = ?, error = NULL,
+                            locked_by = NULL, locked_at = NULL, updated_at = ?
+            WHERE id = ?
+        ''', (json.dumps(result), datetime.now().isoformat(), job_id))
+        conn.commit()
+
+def fail_job(job_id, error, retry_delay_seconds=None):
+    """Record a failed attempt; requeue after retry_delay_seconds, or mark failed if None."""
+    now = datetime.now()
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        if retry_delay_seconds is None:
+            cursor.execute('''
+                UPDATE JOBS SET status = 'failed', error = ?, locked_by = NULL, locked_at = NULL, updated_at = ?
+                WHERE id = ?
+            ''', (error, now.isoformat(), job_id))
+        else:
+            cursor.execute('''
+                UPDATE JOBS SET status = 'queued', error = ?, run_after = ?,
+                                locked_by = NULL, locked_at = NULL, updated_at = ?
+                WHERE id = ?
+            ''', (error, (now + timedelta(seconds=retry_delay_seconds)).isoformat(), now.isoformat(), job_id))
+        conn.commit()
+
+def get_job(job_id):
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM JOBS WHERE id = ?', (job_id,))
+        return cursor.fetchone()
+
+def get_running_jobs():
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, kind, locked_by, locked_at FROM JOBS WHERE status = 'running'")
+        return cursor.fetchall()
+
+def requeue_jobs(job_ids):
+    """Put interrupted running jobs back in the queue (their attempt still counts)."""
+    if not job_ids:
+        return 0
+    now = datetime.now().isoformat()
+    placeholders = ", ".join("?" * len(job_ids))
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            UPDATE JOBS SET status = 'queued', run_after = ?, locked_by = NULL, locked_at = NULL, updated_at = ?
+            WHERE status = 'running' AND id IN ({placeholders})
+        ''', (now, now, *job_ids))
+        conn.commit()
+        return cursor.rowcount
+
+
+# TELEMETRY - box heartbeats in one raw table per day, rolled up per minute and per hour
+TELEMETRY_PARTITION_PREFIX = 'BOX_TELEMETRY_'
+TELEMETRY_RESOLUTIONS = {'minute': 60, 'hour': 3600}
+_telemetry_partitions = set()  # (database path, partition) known to exist in this process
+
+def init_telemetry_tables():
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS BOX_TELEMETRY_ROLLUPS (
+                box_id TEXT NOT NULL,
+                resolution TEXT NOT NULL,        -- minute, hour
+                bucket_start INTEGER NOT NULL,   -- unix time
+                samples INTEGER NOT NULL,
+                door_open_samples INTEGER NOT NULL,
+                load_sum INTEGER,
+                load_samples INTEGER NOT NULL,
+                load_min INTEGER,
+                load_max INTEGER,
+                rssi_sum INTEGER,
+                rssi_samples INTEGER NOT NULL,
+                rssi_min INTEGER,
+                rssi_max INTEGER,
+                uptime_max INTEGER,
+                last_reading_at REAL,
+                PRIMARY KEY (box_id, resolution, bucket_start)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_box_telemetry_rollups_bucket
+            ON BOX_TELEMETRY_ROLLUPS (resolution, bucket_start)
+        ''')
+        # How far each raw partition has been rolled up
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS BOX_TELEMETRY_ROLLUP_STATE (
+                partition TEXT PRIMARY KEY,
+                last_rowid INTEGER NOT NULL
+            )
+        ''')
+        conn.commit()
+
+def telemetry_partition(day):
+    """Name of the raw telemetry table holding readings received on a date."""
+    return f"{TELEMETRY_PARTITION_PREFIX}{day.strftime('%Y%m%d')}"
+
+def _ensure_telemetry_partition(cursor, partition):
+    if (DATABASE_PATH, partition) in _telemetry_partitions:
+        return
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {partition} (
+            box_id TEXT NOT NULL,
+            ts REAL NOT NULL,                -- unix time of the reading
+            door_status TEXT,
+            current_load INTEGER,
+            uptime INTEGER,                  -- seconds since the box booted
+            rssi INTEGER                     -- WiFi signal strength (dBm)
+        )
+    ''')
+    _telemetry_partitions.add((DATABASE_PATH, partition))
+
+def _telemetry_partitions_in_db(cursor):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ?",
+                   (TELEMETRY_PARTITION_PREFIX + '[0-9]*',))
+    return sorted(row[0] for row in cursor.fetchall())
+
+def insert_telemetry(readings):
+    """
+    Append readings, each (box_id, ts, door_status, current_load, uptime, rssi),
+    to today's partition in one transaction.  Returns the number stored.
+    """
+    partition = telemetry_partition(datetime.now())
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        _ensure_telemetry_partition(cursor, partition)
+        cursor.executemany(f'''
+            INSERT INTO {partition} (box_id, ts, door_status, current_load, uptime, rssi)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', readings)
+        conn.commit()
+        return len(readings)
+
+def _telemetry_rollup_state(cursor, partition):
+    """(readings not yet rolled up, rollup watermark, latest rowid) of a raw partition."""
+    cursor.execute('SELECT last_rowid FROM BOX_TELEMETRY_ROLLUP_STATE WHERE partition = ?', (partition,))
+    row = cursor.fetchone()
+    last_rowid = row[0] if row else 0
+    cursor.execute(f'SELECT COALESCE(MAX(rowid), 0) FROM {partition}')
+    max_rowid = cursor.fetchone()[0]
+    return max_rowid - last_rowid, last_rowid, max_rowid
+
+def rollup_telemetry():
+    """
+    Fold raw readings not yet rolled up into the per-box minute and hour
+    aggregates.  Incremental (by rowid) and safe to run from several
+    processes; late readings are added to the bucket of their own timestamp.
+    Returns the number of raw readings processed.
+    """
+    processed = 0
+    with get_db_connection() as conn:
+        conn.isolation_level = None
+        cursor = conn.cursor()
+        for partition in _telemetry_partitions_in_db(cursor):
+            # Check without the write lock first: readers call this on every request
+            if _telemetry_rollup_state(cursor, partition)[0] <= 0:
+                continue
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                behind, last_rowid, max_rowid = _telemetry_rollup_state(cursor, partition)
+                if behind <= 0:
+                    cursor.execute('COMMIT')
+                    continue
+                
+                for resolution, seconds in TELEMETRY_RESOLUTIONS.items():
+                    cursor.execute(f'''
+                        INSERT INTO BOX_TELEMETRY_ROLLUPS (
+                            box_id, resolution, bucket_start, samples, door_open_samples,
+                            load_sum, load_samples, load_min, load_max, rssi_sum, rssi_samples, rssi_min, rssi_max,
+                            uptime_max, last_reading_at
+                        )
+                        SELECT box_id, ?, CAST(ts / ? AS INTEGER) * ? AS bucket, COUNT(*),
+                               COALESCE(SUM(door_status = 'open'), 0), SUM(current_load), COUNT(current_load),
+                               MIN(current_load), MAX(current_load),
+                               SUM(rssi), COUNT(rssi), MIN(rssi), MAX(rssi), MAX(uptime), MAX(ts)
+                        FROM {partition}
+                        WHERE rowid > ? AND rowid <= ?
+                        GROUP BY box_id, bucket
+                        ON CONFLICT (box_id, resolution, bucket_start) DO UPDATE SET
+                            samples = samples + excluded.samples,
+                            door_open_samples = door_open_samples + excluded.door_open_samples,
+                            load_sum = COALESCE(load_sum + excluded.load_sum, load_sum, excluded.load_sum),
+                            load_samples = load_samples + excluded.load_samples,
+                            load_min = COALESCE(MIN(load_min, excluded.load_min), load_min, excluded.load_min),
+                            load_max = COALESCE(MAX(load_max, excluded.load_max), load_max, excluded.load_max),
+                            rssi_sum = COALESCE(rssi_sum + excluded.rssi_sum, rssi_sum, excluded.rssi_sum),
+                            rssi_samples = rssi_samples + excluded.rssi_samples,
+                            rssi_min = COALESCE(MIN(rssi_min, excluded.rssi_min), rssi_min, excluded.rssi_min),
+                            rssi_max = COALESCE(MAX(rssi_max, excluded.rssi_max), rssi_max, excluded.rssi_max),
+                            uptime_max = COALESCE(MAX(uptime_max, excluded.uptime_max), uptime_max, excluded.uptime_max),
+                            last_reading_at = MAX(last_reading_at, excluded.last_reading_at)
+                    ''', (resolution, seconds, seconds, last_rowid, max_rowid))
+                
+                cursor.execute('''
+                    INSERT INTO BOX_TELEMETRY_ROLLUP_STATE (partition, last_rowid) VALUES (?, ?)
+                    ON CONFLICT (partition) DO UPDATE SET last_rowid = excluded.last_rowid
+                ''', (partition, max_rowid))
+                cursor.execute('COMMIT')
+                processed += max_rowid - last_rowid
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+    return processed
+
+def prune_telemetry(raw_days, minute_days, hour_days):
+    """
+    Drop raw partitions older than raw_days (once rolled up) and rollups past
+    their retention.  Returns (partitions dropped, rollup rows deleted).
+    """
+    oldest_raw = telemetry_partition(datetime.now() - timedelta(days=raw_days))
+    now = datetime.now().timestamp()
+    dropped = 0
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        for partition in _telemetry_partitions_in_db(cursor):
+            if partition >= oldest_raw:
+                continue
+            cursor.execute('SELECT last_rowid FROM BOX_TELEMETRY_ROLLUP_STATE WHERE partition = ?', (partition,))
+            row = cursor.fetchone()
+            cursor.execute(f'SELECT COALESCE(MAX(rowid), 0) FROM {partition}')
+            if (row[0] if row else 0) < cursor.fetchone()[0]:
+                continue  # not rolled up yet
+            cursor.execute(f'DROP TABLE {partition}')
+            cursor.execute('DELETE FROM BOX_TELEMETRY_ROLLUP_STATE WHERE partition = ?', (partition,))
+            _telemetry_partitions.discard((DATABASE_PATH, partition))
+            dropped += 1
+        
+        cursor.execute('''
+            DELETE FROM BOX_TELEMETRY_ROLLUPS
+            WHERE (resolution = 'minute' AND bucket_start < ?) OR (resolution = 'hour' AND bucket_start < ?)
+        ''', (now - minute_days * 86400, now - hour_days * 86400))
+        deleted = cursor.rowcount
+        conn.commit()
+        return dropped, deleted
+
+def get_telemetry_rollups(box_id, resolution, since, until):
+    """Rollup buckets of one resolution for a box with since <= bucket_start < until, oldest first."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM BOX_TELEMETRY_ROLLUPS
+            WHERE box_id = ? AND resolution = ? AND bucket_start >= ? AND bucket_start < ?
+            ORDER BY bucket_start
+        ''', (box_id, resolution, since, until))
+        return cursor.fetchall()
+
+
+# CHANGE LOG - every insert/update/delete on synced tables gets a monotonically increasing version
+SYNCED_TABLES = {
+    # table -> columns returned by /sync (embeddings are never sent)
+    'FOUND_ITEMS': 'id, filename, description, status, claimed_at, claimed_by, finder_id, uploaded_at, expires_at',
+    'COLLECTED_ITEMS': 'id, filename, box_id, finder_id, imgtaken_timestamp, uploaded_at',
+    'BOXES': 'id, status, door_status, capacity, current_load, last_updated',
+}
+
+# FOUND_ITEMS updates are logged only when a synced column or the embeddings change,
+# so re-embedding staging (next_* columns) does not flood the log
+FOUND_ITEMS_LOGGED_COLUMNS = ('filename, description, status, claimed_at, claimed_by, finder_id, expires_at, '
+                              'image_embedding, description_embedding, embedding_model')
+
+def init_change_log():
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS CHANGE_LOG (
+                version INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id NOT NULL,                 -- no affinity: integer ids stay integers, box ids text
+                operation TEXT NOT NULL,         -- insert, update, delete
+                changed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_change_log_changed_at ON CHANGE_LOG (changed_at)')
+        
+        for table in SYNCED_TABLES:
+            update_of = f" OF {FOUND_ITEMS_LOGGED_COLUMNS}" if table == 'FOUND_ITEMS' else ""
+            for operation, event, ref in (('insert', 'INSERT', 'NEW'), ('update', f'UPDATE{update_of}', 'NEW'),
+                                          ('delete', 'DELETE', 'OLD')):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_{operation}
+                    AFTER {event} ON {table}
+                    BEGIN
+                        INSERT INTO CHANGE_LOG (table_name, row_id, operation)
+                        VALUES ('{table}', {ref}.id, '{operation}');
+                    END
+                ''')
+        conn.commit()
+
+def _change_log_version(cursor):
+    # sqlite_sequence keeps the last version even after old entries are pruned
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'CHANGE_LOG'")
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+def get_change_log_version():
+    """Version of the most recent change to FOUND_ITEMS, COLLECTED_ITEMS or BOXES."""
+    with get_db_connection() as conn:
+        return _change_log_version(conn.cursor())
+
+def changes_since(version, tables=None, limit=1000):
+    """
+    Rows changed after version, one entry per row with its latest operation.
+
+    Returns {"version", "changes", "has_more", "reset"}.  Pass the returned
+    version as the next `version`.  reset is True when the log no longer
+    reaches back to `version` (pruned), so the caller must reload in full.
+    """
+    tables = [t for t in (tables or SYNCED_TABLES) if t in SYNCED_TABLES]
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        current = _change_log_version(cursor)
+        cursor.execute('SELECT MIN(version) FROM CHANGE_LOG')
+        oldest = cursor.fetchone()[0]
+        if version < (oldest - 1 if oldest is not None else current):
+            return {"version": current, "changes": [], "has_more": False, "reset": True}
+        
+        placeholders = ", ".join("?" * len(tables))
+        limit_clause = "LIMIT ?" if limit else ""
+        cursor.execute(f'''
+            SELECT MAX(version) AS version, table_name, row_id, operation FROM CHANGE_LOG
+            WHERE version > ? AND table_name IN ({placeholders})
+            GROUP BY table_name, row_id
+            ORDER BY version {limit_clause}
+        ''', (version, *tables, *([limit] if limit else [])))
+        changes = [dict(row) for row in cursor.fetchall()]
+    
+    has_more = bool(limit) and len(changes) == limit
+    return {
+        "version": changes[-1]['version'] if has_more else current,
+        "changes": changes,
+        "has_more": has_more,
+        "reset": False
+    }
+
+def get_synced_rows(table, row_ids, chunk_size=500):
+    """Current values of the synced columns for rows of a synced table, keyed by id."""
+    rows = {}
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        for start in range(0, len(row_ids), chunk_size):
+            chunk = row_ids[start:start + chunk_size]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(f'SELECT {SYNCED_TABLES[table]} FROM {table} WHERE id IN ({placeholders})', chunk)
+            for row in cursor.fetchall():
+                rows[row['id']] = dict(row)
+    return rows
+
+def prune_change_log(max_age_hours):
+    """Delete change log entries older than max_age_hours; clients further behind get reset=True."""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM CHANGE_LOG WHERE changed_at < datetime('now', ?)",
+                       (f'-{max_age_hours} hours',))
+        conn.commit()
+        return cursor.rowcount
+
+
+# DATA VERSIONS - per-table write counters, keys of the HTTP response cache
+VERSIONED_TABLES = ('FOUND_ITEMS', 'COLLECTED_ITEMS', 'BOXES', 'FINDERS', 'COLLECTORS', 'USER_STATS')
+
+def init_data_versions():
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS DATA_VERSIONS (
+                table_name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0,  -- bumped by every insert, update and delete
+                changed_at INTEGER                   -- unix time of the last bump
+            )
+        ''')
+        for table in VERSIONED_TABLES:
+            cursor.execute("INSERT OR IGNORE INTO DATA_VERSIONS (table_name, changed_at) VALUES (?, strftime('%s', 'now'))",
+                           (table,))
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_data_version_{table.lower()}_{event.lower()}
+                    AFTER {event} ON {table} BEGIN
+                        UPDATE DATA_VERSIONS SET version = version + 1, changed_at = strftime('%s', 'now')
+                        WHERE table_name = '{table}';
+                    END
+                ''')
+        conn.commit()
+
+def get_data_versions(tables):
+    """([version of each table], unix time of the latest change among them) for VERSIONED_TABLES."""
+    placeholders = ", ".join("?" * len(tables))
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT table_name, version, changed_at FROM DATA_VERSIONS WHERE table_name IN ({placeholders})
+        ''', tables)
+        rows = {row['table_name']: row for row in cursor.fetchall()}
+    versions = [rows[table]['version'] if table in rows else None for table in tables]
+    changed_at = max((int(row['changed_at']) for row in rows.values() if row['changed_at']), default=None)
+    return versions, changed_at
+
+
 # Database is initialized when needed - removed automatic initialization
+
+# Per-function timing for /metrics (leaves functions untouched unless METRICS_ENABLED)
+instrument_functions(globals(), DB_SECONDS)
@@ -5,11 +5,18 @@ Database management CLI tool for the Lost & Found system.
 
 import argparse
 import json
+import os
 from datetime import datetime
+from config import Config
 from database import (
     get_all_items, get_available_items, claim_item, 
-    release_expired_claims, delete_item, init_database, clear_all_items
+    release_expired_claims, delete_item, init_database, clear_all_items,
+    compact_embedding_store, get_items_pending_reembed, count_pending_reembed,
+    stage_reembedded_items, switch_embedding_model, recount_user_stats, flush_user_stats,
+    get_items_missing_image_hash, set_image_hashes
 )
+from static_files import file_sha256
+from upload_utils import UPLOAD_FOLDER
 
 def list_items(available_only=False):
     """List all items or only available items."""
@@ -42,6 +49,7 @@ def list_items(available_only=False):
 def claim_item_cli(item_id, claimed_by):
     """Claim an item via CLI."""
     success, message = claim_item(item_id, claimed_by)
+    flush_user_stats()  # no background flusher in the CLI
     print(f"Claim result: {message}")
     return success
 
@@ -67,6 +75,81 @@ def clear_all_items_cli():
     else:
         print("Operation cancelled.")
 
+def compact_embeddings_cli():
+    """Rewrite the embedding store without tombstoned rows."""
+    count = compact_embedding_store()
+    if count is None:
+        print("Embedding store has nothing to compact.")
+    else:
+        print(f"Compacted embedding store to {count} items.")
+
+def recount_user_stats_cli():
+    """Rebuild the /users/stats counters from FINDERS and COLLECTORS."""
+    stats = recount_user_stats()
+    print("User stats recounted: " + ", ".join(f"{name}={value}" for name, value in stats.items()))
+
+def hash_images_cli(batch_size):
+    """Record the content hash of items uploaded before hashes were stored, versioning their URLs."""
+    hashed = missing = 0
+    last_id = 0
+    while True:
+        batch = get_items_missing_image_hash(batch_size, after_id=last_id)
+        if not batch:
+            break
+        hashes = []
+        for item in batch:
+            image_path = os.path.join(UPLOAD_FOLDER, item['filename'])
+            if os.path.exists(image_path):
+                hashes.append((file_sha256(image_path), item['id']))
+            else:
+                missing += 1
+        set_image_hashes(hashes)
+        hashed += len(hashes)
+        last_id = batch[-1]['id']
+    print(f"Hashed {hashed} images ({missing} image files not found).")
+
+def reembed_cli(model_name, batch_size):
+    """Re-encode the catalogue with another CLIP model, then switch over atomically.
+
+    Progress is stored per item, so an interrupted run resumes where it stopped.
+    """
+    # clip_utils loads Config.CLIP_MODEL on import, so point it at the target model first
+    Config.CLIP_MODEL = model_name
+    from clip_utils import get_image_embedding, get_text_embedding
+
+    total = count_pending_reembed(model_name)
+    print(f"Re-embedding {total} items with {model_name}...")
+
+    done = 0
+    while True:
+        batch = get_items_pending_reembed(model_name, batch_size)
+        if not batch:
+            break
+
+        staged = []
+        for item in batch:
+            image_path = os.path.join(UPLOAD_FOLDER, item['filename'])
+            if not os.path.exists(image_path):
+                print(f"Skipping {item['filename']}: image file not found (keeps its old model)")
+                staged.append((item['id'], None, None))
+                continue
+            img_emb = get_image_embedding(image_path).detach().cpu().numpy().flatten().tolist()
+            desc_emb = None
+            if item['description']:
+                desc_emb = get_text_embedding(item['description']).detach().cpu().numpy().flatten().tolist()
+            staged.append((item['id'], img_emb, desc_emb))
+
+        stage_reembedded_items(model_name, staged)
+        done += len(batch)
+        print(f"Re-embedded {done}/{total} items")
+
+    switched = switch_embedding_model(model_name)
+    if switched is None:
+        print("New items arrived while switching; run reembed again to finish.")
+    else:
+        print(f"Switched {switched} items to {model_name}.")
+        print(f"Running servers load {model_name} on their next search or upload.")
+
 def main():
     parser = argparse.ArgumentParser(description="Lost & Found Database Management Tool")
     
@@ -95,6 +178,23 @@ def main():
     # Init command
     subparsers.add_parser('init', help='Initialize database')
     
+    # Re-embed command
+    reembed_parser = subparsers.add_parser('reembed', help='Re-encode all items with another CLIP model')
+    reembed_parser.add_argument('--model', required=True, help='CLIP model name, e.g. ViT-B/32')
+    reembed_parser.add_argument('--batch-size', type=int, default=32,
+                              help='Items committed per batch')
+    
+    # Hash images command
+    hash_parser = subparsers.add_parser('hash-images', help='Store content hashes of older uploads')
+    hash_parser.add_argument('--batch-size', type=int, default=500,
+                              help='Items committed per batch')
+    
+    # Compact embeddings command
+    subparsers.add_parser('compact-embeddings', help='Remove deleted items from the embedding store')
+    
+    # Recount user stats command
+    subparsers.add_parser('recount-user-stats', help='Rebuild the user statistics counters')
+    
     args = parser.parse_args()
     
     if not args.command:
@@ -114,6 +214,14 @@ def main():
     elif args.command == 'init':
         init_database()
         print("Database initialized.")
+    elif args.command == 'reembed':
+        reembed_cli(args.model, args.batch_size)
+    elif args.command == 'hash-images':
+        hash_images_cli(args.batch_size)
+    elif args.command == 'compact-embeddings':
+        compact_embeddings_cli()
+    elif args.command == 'recount-user-stats':
+        recount_user_stats_cli()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,307 @@
+"""
+Append-only, memory-mapped embedding store kept alongside the SQLite database.
+
+Every worker process maps the same files read-only, so the FOUND_ITEMS
+vectors live once in the OS page cache instead of once per worker, and a
+new worker can search without parsing any JSON out of SQLite.
+
+Layout for lost_and_found.db, generation N:
+
+    lost_and_found.emb.json     {"generation": N, "dim": D}
+    lost_and_found.emb.N.img    float32 (rows, D) normalized image embeddings
+    lost_and_found.emb.N.desc   float32 (rows, D) description embeddings (zeros if none)
+    lost_and_found.emb.N.ids    (item id, has_desc) int64 pairs, one per row
+    lost_and_found.emb.N.dead   int64 row numbers that have been tombstoned
+
+Rows are only ever appended; deletes append a tombstone.  compact() writes
+the live rows to generation N+1 and switches the meta file atomically, and
+readers pick up the new generation on their next refresh().
+"""
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from search_index import EmbeddingIndex, normalize, _present
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ID_DTYPE = np.dtype([('id', '<i8'), ('has_desc', '<i8')])
+ROW_DTYPE = np.dtype('<f4')
+
+
+class EmbeddingStore:
+    """Shared on-disk embedding matrix with the same search interface as EmbeddingIndex."""
+
+    mode = "mmap"
+
+    def __init__(self, base_path):
+        self.base_path = base_path
+        self.meta_path = base_path + '.emb.json'
+        self.lock_path = base_path + '.emb.lock'
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.dim = None
+        self._generation = None
+        self._meta_stat = None
+        self._img = None
+        self._desc = None
+        self._ids = np.empty(0, dtype=ID_DTYPE)
+        self._alive = np.zeros(0, dtype=bool)
+        self._pos = {}  # item_id -> row
+        self._dead_count = 0
+        self._dead_offset = 0
+
+    def _paths(self, generation):
+        prefix = f"{self.base_path}.emb.{generation}"
+        return {ext: f"{prefix}.{ext}" for ext in ('img', 'desc', 'ids', 'dead')}
+
+    def exists(self):
+        return os.path.exists(self.meta_path)
+
+    @contextmanager
+    def _writer_lock(self):
+        """Serialize writers within this process and across processes."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # Reading
+
+    def refresh(self):
+        """Remap the files if another process appended, tombstoned or compacted."""
+        with self._lock:
+            try:
+                meta_stat = os.stat(self.meta_path)
+            except FileNotFoundError:
+                self._reset()
+                return
+            stat_key = (meta_stat.st_ino, meta_stat.st_mtime_ns)
+            if stat_key != self._meta_stat:
+                with open(self.meta_path) as f:
+                    meta = json.load(f)
+                if meta['generation'] != self._generation:
+                    self._reset()
+                    self._generation = meta['generation']
+                    self.dim = meta['dim']
+                self._meta_stat = stat_key
+            self._map_rows()
+            self._read_tombstones()
+
+    def _map_rows(self):
+        paths = self._paths(self._generation)
+        row_bytes = self.dim * ROW_DTYPE.itemsize
+        rows = min(os.path.getsize(paths['img']) // row_bytes,
+                   os.path.getsize(paths['desc']) // row_bytes,
+                   os.path.getsize(paths['ids']) // ID_DTYPE.itemsize)
+        old_rows = len(self._ids)
+        if rows == old_rows:
+            return
+        if rows == 0:
+            self._img = self._desc = None
+        else:
+            self._img = np.memmap(paths['img'], dtype=ROW_DTYPE, mode='r', shape=(rows, self.dim))
+            self._desc = np.memmap(paths['desc'], dtype=ROW_DTYPE, mode='r', shape=(rows, self.dim))
+        self._ids = np.fromfile(paths['ids'], dtype=ID_DTYPE, count=rows)
+        self._alive = np.concatenate([self._alive, np.ones(rows - old_rows, dtype=bool)])
+        for row in range(old_rows, rows):
+            self._pos[int(self._ids[row]['id'])] = row
+
+    def _read_tombstones(self):
+        path = self._paths(self._generation)['dead']
+        size = os.path.getsize(path)
+        if size <= self._dead_offset:
+            return
+        with open(path, 'rb') as f:
+            f.seek(self._dead_offset)
+            rows = np.frombuffer(f.read((size - self._dead_offset) // 8 * 8), dtype='<i8')
+        for row in rows:
+            row = int(row)
+            if row >= len(self._alive):
+                break  # row appended after we mapped; pick it up on the next refresh
+            self._dead_offset += 8
+            if self._alive[row]:
+                self._alive[row] = False
+                self._dead_count += 1
+                item_id = int(self._ids[row]['id'])
+                if self._pos.get(item_id) == row:
+                    del self._pos[item_id]
+
+    def __len__(self):
+        return len(self._pos)
+
+    def __contains__(self, item_id):
+        return item_id in self._pos
+
+    def dead_ratio(self):
+        total = len(self._alive)
+        return self._dead_count / total if total else 0.0
+
+    def memory_bytes(self):
+        """Bytes mapped from the page cache (shared between workers)."""
+        if self._img is None:
+            return 0
+        return self._img.nbytes + self._desc.nbytes + self._ids.nbytes
+
+    def get(self, item_ids):
+        """Return {id: (image_embedding, description_embedding)} for ids present in the store."""
+        self.refresh()
+        with self._lock:
+            found = {}
+            for item_id in item_ids:
+                row = self._pos.get(item_id)
+                if row is None:
+                    continue
+                desc = np.array(self._desc[row]) if self._ids[row]['has_desc'] else None
+                found[item_id] = (np.array(self._img[row]), desc)
+            return found
+
+    def items(self):
+        """Yield (id, image_embedding, description_embedding) for every live row."""
+        self.refresh()
+        with self._lock:
+            rows = sorted(self._pos.values())
+            img, desc, ids = self._img, self._desc, self._ids
+        for row in rows:
+            desc_emb = desc[row] if ids[row]['has_desc'] else None
+            yield int(ids[row]['id']), img[row], desc_emb
+
+    def score(self, query_embedding, item_ids=None):
+        """Score live rows against a query, reading the mapped matrix in place."""
+        self.refresh()
+        query = normalize(query_embedding)
+        with self._lock:
+            img, desc, ids = self._img, self._desc, self._ids
+            if item_ids is None:
+                rows = np.array(sorted(self._pos.values()), dtype=np.int64)
+            else:
+                rows = np.array([self._pos[i] for i in item_ids if i in self._pos], dtype=np.int64)
+        if img is None or rows.size == 0:
+            empty = np.empty(0, dtype=np.float32)
+            return np.empty(0, dtype=np.int64), empty, empty
+        n = len(ids)
+        img_scores = (img[:n] @ query)[rows]
+        desc_scores = (desc[:n] @ query)[rows]
+        has_desc = ids['has_desc'][rows].astype(bool)
+        scores = np.where(has_desc, (img_scores + desc_scores) / 2, img_scores)
+        return ids['id'][rows].copy(), scores, np.zeros_like(scores)
+
+    # Reuse the threshold/ordering logic of the in-memory index
+    search = EmbeddingIndex.search
+
+    # Writing
+
+    def _create_files(self, generation):
+        paths = self._paths(generation)
+        for path in paths.values():
+            open(path, 'wb').close()
+        return paths
+
+    def _write_meta(self, generation, dim):
+        tmp_path = self.meta_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'generation': generation, 'dim': dim}, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def _append(self, paths, item_id, image_embedding, description_embedding):
+        img = normalize(image_embedding)
+        if len(img) != self.dim:
+            raise ValueError(f"Embedding dimension {len(img)} does not match store dimension {self.dim}")
+        has_desc = _present(description_embedding)
+        desc = normalize(description_embedding) if has_desc else np.zeros(self.dim, dtype=ROW_DTYPE)
+        # Vectors first, id last: readers only count rows whose id has landed
+        with open(paths['img'], 'ab') as f:
+            f.write(img.astype(ROW_DTYPE).tobytes())
+        with open(paths['desc'], 'ab') as f:
+            f.write(desc.astype(ROW_DTYPE).tobytes())
+        with open(paths['ids'], 'ab') as f:
+            f.write(np.array([(item_id, int(has_desc))], dtype=ID_DTYPE).tobytes())
+
+    def add(self, item_id, image_embedding, description_embedding=None):
+        """Append an item, tombstoning any previous row for the same id."""
+        with self._writer_lock():
+            self.refresh()
+            if self._generation is None:
+                self._create_files(1)
+                self._write_meta(1, len(image_embedding))
+                self.refresh()
+            if item_id in self._pos:
+                self._tombstone([self._pos[item_id]])
+            self._append(self._paths(self._generation), item_id, image_embedding, description_embedding)
+            self.refresh()
+
+    def _tombstone(self, rows):
+        with open(self._paths(self._generation)['dead'], 'ab') as f:
+            f.write(np.asarray(rows, dtype='<i8').tobytes())
+
+    def remove(self, item_id):
+        """Tombstone an item."""
+        with self._writer_lock():
+            self.refresh()
+            row = self._pos.get(item_id)
+            if row is None:
+                return False
+            self._tombstone([row])
+            self.refresh()
+            return True
+
+    def clear(self):
+        """Tombstone every item."""
+        with self._writer_lock():
+            self.refresh()
+            if self._pos:
+                self._tombstone(sorted(self._pos.values()))
+            self.refresh()
+
+    def rebuild(self, rows, dim):
+        """Replace the store contents with rows of (id, image_embedding, description_embedding)."""
+        with self._writer_lock():
+            return self._rebuild(rows, dim)
+
+    def _rebuild(self, rows, dim):
+        self.refresh()
+        old_generation = self._generation
+        generation = (old_generation or 0) + 1
+        new_paths = self._create_files(generation)
+        self.dim = dim
+        count = 0
+        for item_id, img_emb, desc_emb in rows:
+            self._append(new_paths, item_id, img_emb, desc_emb)
+            count += 1
+        # Readers switch generations only once the meta file points at it
+        self._write_meta(generation, dim)
+        self.refresh()
+        if old_generation is not None:
+            for path in self._paths(old_generation).values():
+                if os.path.exists(path):
+                    os.remove(path)
+        return count
+
+    def compact(self):
+        """Rewrite only the live rows into a new generation."""
+        with self._writer_lock():
+            self.refresh()
+            if self._generation is None:
+                return 0
+            live = [(item_id, np.array(img), None if desc is None else np.array(desc))
+                    for item_id, img, desc in self.items()]
+            count = self._rebuild(live, self.dim)
+            logger.info(f"Compacted embedding store to {count} rows")
+            return count
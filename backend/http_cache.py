@@ -0,0 +1,146 @@
+"""
+Response cache and conditional GETs for the polled read endpoints.
+
+A view decorated with @cached_response(*tables) is keyed on its endpoint,
+view arguments, query string and the DATA_VERSIONS counters of the tables it
+reads (bumped by triggers on every write, from any process), plus an
+optional in-process version such as the box state registry's.  Responses
+carry a weak ETag derived from that key, Last-Modified from the time of the
+tables' latest change and Cache-Control: no-cache, so clients revalidate on
+every poll.  Last-Modified is only sent once the change is over a second
+old, as the header cannot tell apart writes within one second.  A matching
+If-None-Match (or, without one, an If-Modified-Since no older than the last
+change) is answered with 304 before the view runs;
+otherwise a cached body is reused while the versions are unchanged.
+
+Bodies are kept in a per-process LRU bounded by HTTP_CACHE_MAX_ENTRIES and
+HTTP_CACHE_MAX_BYTES.  Entries are never invalidated explicitly: a write
+changes the key, and stale entries age out of the LRU.
+"""
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import make_response, request
+
+from config import Config
+from database import get_data_versions
+from metrics import HTTP_CACHE_REQUESTS
+
+CachedResponse = namedtuple('CachedResponse', ['body', 'status', 'mimetype', 'last_modified'])
+
+
+class ResponseCache:
+    """LRU of response bodies bounded by entry count and total body bytes."""
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> CachedResponse
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        size = len(entry.body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.body)
+            self._entries[key] = entry
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
+
+
+response_cache = ResponseCache(Config.HTTP_CACHE_MAX_ENTRIES, Config.HTTP_CACHE_MAX_BYTES)
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    # Both have one-second resolution: a change in the current second may
+    # follow the client's copy, so only the ETag can vouch for it
+    return (since is not None and last_modified is not None
+            and last_modified < int(time.time()) and last_modified <= since.timestamp())
+
+
+def _with_validators(response, etag, last_modified):
+    response.set_etag(etag, weak=True)
+    # Withheld while the change is in the current second: a later write in
+    # the same second would carry the same Last-Modified
+    if last_modified is not None and last_modified < int(time.time()):
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def cached_response(*tables, prepare=None, version=None):
+    """
+    Cache a GET view on the versions of the tables it reads.
+
+    prepare runs before the versions are read (e.g. to flush buffered writes
+    the response must include); version returns an extra (version, unix
+    time of last change) pair for state kept outside SQLite.
+    """
+    def decorate(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if prepare is not None:
+                prepare()
+            if not Config.HTTP_CACHE_ENABLED or request.method != 'GET':
+                return view(*args, **kwargs)
+
+            # Read the versions before the view runs: its body is then at least that new
+            versions, last_modified = get_data_versions(tables) if tables else ([], None)
+            if version is not None:
+                extra_version, extra_modified = version()
+                versions.append(extra_version)
+                last_modified = max(filter(None, (last_modified, extra_modified)), default=None)
+            key = (request.endpoint, tuple(sorted(kwargs.items())),
+                   tuple(sorted(request.args.items(multi=True))), tuple(versions))
+            etag = hashlib.blake2b(repr(key).encode('utf-8'), digest_size=12).hexdigest()
+
+            if _not_modified(etag, last_modified):
+                HTTP_CACHE_REQUESTS.inc(request.endpoint, 'not_modified')
+                return _with_validators(make_response('', 304), etag, last_modified)
+
+            entry = response_cache.get(key)
+            if entry is not None:
+                HTTP_CACHE_REQUESTS.inc(request.endpoint, 'hit')
+                response = make_response(entry.body, entry.status)
+                response.mimetype = entry.mimetype
+                return _with_validators(response, etag, entry.last_modified)
+
+            HTTP_CACHE_REQUESTS.inc(request.endpoint, 'miss')
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            if last_modified is None:
+                last_modified = int(time.time())
+            response_cache.put(key, CachedResponse(response.get_data(), response.status_code,
+                                                   response.mimetype, last_modified))
+            return _with_validators(response, etag, last_modified)
+        return wrapper
+    return decorate
@@ -0,0 +1,161 @@
+"""
+Identity resolution for RFID tags, emails, student ids and user ids.
+
+Every box drop resolves the finder's RFID tag and every claim resolves the
+collector's email or student id.  resolve() answers these with one indexed
+query (a UNION over FINDERS and COLLECTORS for emails) and keeps the
+result in a bounded per-process TTL cache, preloaded with the RFID tags of
+the most recently active finders at startup.
+
+Unknown RFID tags are cached too, for IDENTITY_NEGATIVE_TTL seconds and in
+a separate bounded LRU, so a box repeating a bad tap (or a flood of random
+tags) neither reaches the database each time nor evicts known finders.
+Unknown emails and student ids are not cached, and a cached entry that
+lacks the user type being asked for is looked up again, so users
+registered by another worker are found immediately.  Registration in this
+process invalidates the new user's credentials; IDENTITY_CACHE_TTL bounds
+how long any other change can go unseen.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from database import IDENTITY_QUERIES, find_identities, get_rfid_identities
+from metrics import IDENTITY_CACHE_LOOKUPS
+
+IDENTITY_KINDS = tuple(IDENTITY_QUERIES)
+
+# Credentials whose misses are cached (the hardware path that can be spammed)
+NEGATIVE_CACHE_KINDS = ('rfid',)
+
+
+class IdentityCache:
+    def __init__(self, max_size, ttl, negative_size=0, negative_ttl=0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_size = negative_size
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()   # (kind, value) -> (expires_at, identities)
+        self._negative = OrderedDict()  # (kind, value) -> expires_at, for credentials that matched no one
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Cached identities, [] for a cached miss, or None when the key must be looked up."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            expires_at = self._negative.get(key)
+            if expires_at is not None and expires_at >= now:
+                self.negative_hits += 1
+                return []
+            self.misses += 1
+            return None
+
+    def put(self, key, identities):
+        if identities:
+            self._store(self._entries, self.max_size, key, (time.monotonic() + self.ttl, identities))
+            with self._lock:
+                self._negative.pop(key, None)
+        else:
+            self._store(self._negative, self.negative_size, key, time.monotonic() + self.negative_ttl)
+
+    def _store(self, entries, max_size, key, value):
+        if max_size <= 0:
+            return
+        with self._lock:
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > max_size:
+                entries.popitem(last=False)
+
+    def hit_ratio(self):
+        lookups = self.hits + self.negative_hits + self.misses
+        return (self.hits + self.negative_hits) / lookups if lookups else None
+
+    def discard(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._negative.pop(key, None)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._negative.clear()
+
+
+identity_cache = IdentityCache(Config.IDENTITY_CACHE_SIZE, Config.IDENTITY_CACHE_TTL,
+                               Config.IDENTITY_NEGATIVE_CACHE_SIZE, Config.IDENTITY_NEGATIVE_TTL)
+
+
+def resolve(kind, value, user_type=None):
+    """
+    Users matching a credential as dicts with user_type, user_id, name, email,
+    rfid_tag and student_id (finders first), optionally only those of one
+    user_type.  Returns [] when there are none.
+    """
+    if value is None or value == '':
+        return []
+    key = (kind, str(value))
+    identities = identity_cache.get(key)
+    if identities is None:
+        result = 'miss'
+    elif identities:
+        result = 'hit'
+        if user_type and not any(i['user_type'] == user_type for i in identities):
+            identities, result = None, 'miss'
+    else:
+        result = 'negative_hit'
+    IDENTITY_CACHE_LOOKUPS.inc(kind, result)
+
+    if identities is None:
+        identities = [dict(row) for row in find_identities(kind, value)]
+        if identities or kind in NEGATIVE_CACHE_KINDS:
+            identity_cache.put(key, identities)
+    if user_type:
+        return [identity for identity in identities if identity['user_type'] == user_type]
+    return identities
+
+
+def resolve_finder_id(rfid_tag):
+    """finder_id for an RFID tag, or None if it is not registered."""
+    finders = resolve('rfid', rfid_tag, 'finder')
+    return finders[0]['user_id'] if finders else None
+
+
+def resolve_collector_id(email=None, student_id=None):
+    """collector_id for an email (or else a student id), or None if it is not registered."""
+    collectors = resolve('email', email, 'collector') if email else resolve('student_id', student_id, 'collector')
+    return collectors[0]['user_id'] if collectors else None
+
+
+def preload_rfid_tags():
+    """Fill the cache with the RFID tags of the most recently active finders; returns how many."""
+    limit = Config.IDENTITY_CACHE_SIZE // 2  # leave room for emails and student ids
+    count = 0
+    for row in get_rfid_identities(limit):
+        identity_cache.put(('rfid', row['rfid_tag']), [dict(row)])
+        count += 1
+    return count
+
+
+def invalidate_identities(**credentials):
+    """
+    Forget cached lookups after a user is registered or changed: only those
+    for the given credentials (e.g. rfid=..., email=...), or all of them.
+    """
+    if not credentials:
+        identity_cache.invalidate()
+        return
+    identity_cache.discard([(kind, str(value)) for kind, value in credentials.items() if value not in (None, '')])
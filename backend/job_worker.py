@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from config import Config
+from database import claim_next_job, complete_job, fail_job, get_running_jobs, requeue_jobs
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process in JOBS.locked_by so interrupted jobs can be recovered
+HOSTNAME = socket.gethostname()
+
+# kind -> handler(payload, job_id) returning a JSON-serializable result
+HANDLERS = {}
+
+def job_handler(kind):
+    """Register a function as the handler for jobs of this kind."""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+# kind -> cleanup(payload, job_id) run once when a job of that kind fails permanently
+FAILURE_HANDLERS = {}
+
+def job_failure_handler(kind):
+    """Register a function to clean up after a job of this kind fails its last attempt."""
+    def register(fn):
+        FAILURE_HANDLERS[kind] = fn
+        return fn
+    return register
+
+def retry_delay(attempt):
+    """Exponential backoff in seconds after the given (1-based) failed attempt."""
+    return min(Config.JOB_RETRY_MAX_SECONDS, Config.JOB_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def recover_interrupted_jobs():
+    """
+    Requeue running jobs whose worker is gone: the process on this host has
+    exited (e.g. crashed or was restarted), or the job has held its lock
+    longer than JOB_LEASE_SECONDS.
+    """
+    lease_cutoff = datetime.now() - timedelta(seconds=Config.JOB_LEASE_SECONDS)
+    stale = []
+    for job in get_running_jobs():
+        host, _, pid = (job['locked_by'] or '').rpartition(':')
+        if job['locked_at'] is None or datetime.fromisoformat(job['locked_at']) < lease_cutoff:
+            stale.append(job['id'])
+        elif host == HOSTNAME and pid.isdigit() and not _process_alive(int(pid)):
+            stale.append(job['id'])
+    requeued = requeue_jobs(stale)
+    if requeued:
+        logger.info(f"Requeued {requeued} interrupted jobs")
+    return requeued
+
+class JobWorkerPool:
+    def __init__(self, workers=None, poll_interval=None):
+        self.workers = workers or Config.JOB_WORKERS
+        self.poll_interval = poll_interval or Config.JOB_POLL_INTERVAL
+        self.worker_id = None
+        self.running = False
+        self.threads = []
+        self._wakeup = threading.Condition()
+
+    def start(self):
+        """Recover jobs interrupted by a previous run, then start the worker threads."""
+        if self.running:
+            return
+
+        recover_interrupted_jobs()
+        self.worker_id = f"{HOSTNAME}:{os.getpid()}"  # set here, not at import, in case of forking
+        self.running = True
+        self.threads = [threading.Thread(target=self._worker_loop, daemon=True, name=f"job-worker-{i}")
+                        for i in range(self.workers)]
+        for thread in self.threads:
+            thread.start()
+        logger.info(f"Started {self.workers} job workers")
+
+    def stop(self):
+        """Stop taking new jobs and wait for the ones in progress."""
+        self.running = False
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        logger.info("Stopped job workers")
+
+    def notify(self):
+        """Wake an idle worker because a job was just queued."""
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def _worker_loop(self):
+        while self.running:
+            try:
+                job = claim_next_job(self.worker_id, list(HANDLERS))
+            except Exception as e:
+                logger.error(f"Error claiming job: {e}")
+                job = None
+
+            if job is None:
+                with self._wakeup:
+                    if self.running:
+                        self._wakeup.wait(self.poll_interval)
+                continue
+
+            self.run_job(job)
+
+    def run_job(self, job):
+        """Run one claimed job and record its result or schedule a retry."""
+        try:
+            result = HANDLERS[job['kind']](json.loads(job['payload']), job['id'])
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if job['attempts'] >= job['max_attempts']:
+                logger.error(f"Job {job['id']} ({job['kind']}) failed permanently: {error}")
+                fail_job(job['id'], error)
+                self.run_failure_handler(job)
+            else:
+                delay = retry_delay(job['attempts'])
+                logger.warning(f"Job {job['id']} ({job['kind']}) attempt {job['attempts']} failed, "
+                               f"retrying in {delay:g}s: {error}")
+                fail_job(job['id'], error, retry_delay_seconds=delay)
+            return
+        complete_job(job['id'], result)
+
+    def run_failure_handler(self, job):
+        """Let the job's kind clean up after its last failed attempt (e.g. remove an orphaned upload)."""
+        cleanup = FAILURE_HANDLERS.get(job['kind'])
+        if cleanup is None:
+            return
+        try:
+            cleanup(json.loads(job['payload']), job['id'])
+        except Exception as e:
+            logger.error(f"Cleanup after job {job['id']} ({job['kind']}) failed: {type(e).__name__}: {e}")
+
+# Global worker pool
+pool = JobWorkerPool()
+
+def start_job_workers():
+    pool.start()
+
+def stop_job_workers():
+    pool.stop()
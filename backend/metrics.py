@@ -0,0 +1,204 @@
+"""
+Lightweight timing instrumentation exposed in Prometheus text format.
+
+Timers and decorators record into in-process histograms, and a few
+counters, that /metrics renders.  When Config.METRICS_ENABLED is false (the
+default) timer() returns a shared no-op context manager, timed() and
+instrument_functions() leave functions unwrapped and counters ignore inc(),
+so the instrumentation costs next to nothing.  Each worker process keeps
+its own metrics.
+"""
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+from config import Config
+
+ENABLED = Config.METRICS_ENABLED
+
+# Seconds; covers sub-millisecond DB calls up to multi-second CLIP passes
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NULL_TIMER = nullcontext()
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values."""
+
+    def __init__(self, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labelvalues, values in sorted(series.items()):
+            labels = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, labelvalues))
+            prefix = labels + ',' if labels else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {values[-1]}')
+            suffix = f'{{{labels}}}' if labels else ''
+            lines.append(f'{self.name}_sum{suffix} {values[-2]}')
+            lines.append(f'{self.name}_count{suffix} {values[-1]}')
+        return '\n'.join(lines)
+
+
+class Counter:
+    """Monotonic counter keyed by label values."""
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> count
+
+    def inc(self, *labelvalues, amount=1):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._series[labelvalues] = self._series.get(labelvalues, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = dict(self._series)
+        for labelvalues, value in sorted(series.items()):
+            labels = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, labelvalues))
+            lines.append(f'{self.name}{{{labels}}} {value}' if labels else f'{self.name} {value}')
+        return '\n'.join(lines)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_SECONDS = Histogram('lostfound_http_request_duration_seconds',
+                            'HTTP request latency by route.', ('method', 'route', 'status'))
+DB_SECONDS = Histogram('lostfound_db_function_duration_seconds',
+                       'Time spent in database.py functions.', ('function',))
+CLIP_SECONDS = Histogram('lostfound_clip_duration_seconds',
+                         'CLIP preprocessing and encoder time.', ('stage',))
+SEARCH_SECONDS = Histogram('lostfound_search_scoring_duration_seconds',
+                           'Python/numpy similarity scoring in search_items.', ())
+JSON_SECONDS = Histogram('lostfound_json_duration_seconds',
+                         'JSON serialization and parsing.', ('operation',))
+FILE_IO_SECONDS = Histogram('lostfound_file_io_duration_seconds',
+                            'Image file reads and writes.', ('operation',))
+
+HISTOGRAMS = [REQUEST_SECONDS, DB_SECONDS, CLIP_SECONDS, SEARCH_SECONDS, JSON_SECONDS, FILE_IO_SECONDS]
+
+# Hit ratio: sum(rate(..{result=~"hit|negative_hit"}[5m])) / sum(rate(..[5m]))
+IDENTITY_CACHE_LOOKUPS = Counter('lostfound_identity_cache_lookups_total',
+                                 'Identity cache lookups by credential kind and result (hit, negative_hit, miss).',
+                                 ('kind', 'result'))
+
+HTTP_CACHE_REQUESTS = Counter('lostfound_http_cache_requests_total',
+                              'Cached read endpoint requests by result (not_modified, hit, miss).',
+                              ('endpoint', 'result'))
+
+COUNTERS = [IDENTITY_CACHE_LOOKUPS, HTTP_CACHE_REQUESTS]
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labelvalues', 'started')
+
+    def __init__(self, histogram, labelvalues):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labelvalues)
+        return False
+
+
+def timer(histogram, *labelvalues):
+    """Context manager timing its block into histogram (no-op when disabled)."""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(histogram, labelvalues)
+
+
+def timed(histogram, *labelvalues):
+    """Decorator form of timer(); returns the function unchanged when disabled."""
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Timer(histogram, labelvalues):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument_functions(namespace, histogram, exclude=()):
+    """
+    Wrap every public plain function defined in a module namespace (e.g. a
+    module's globals()) with timed(histogram, <function name>).  Generators
+    and context managers are skipped since their work happens after return.
+    """
+    if not ENABLED:
+        return
+    module_name = namespace['__name__']
+    for name, fn in list(namespace.items()):
+        if (name.startswith('_') or name in exclude or not inspect.isfunction(fn)
+                or fn.__module__ != module_name or inspect.isgeneratorfunction(fn)
+                or hasattr(fn, '__wrapped__')):
+            continue
+        namespace[name] = timed(histogram, name)(fn)
+
+
+def init_app(app):
+    """Record per-route request latency and JSON encode/decode time for a Flask app."""
+    if not ENABLED:
+        return
+    from flask import g, request
+
+    app.json.dumps = timed(JSON_SECONDS, 'response_dumps')(app.json.dumps)
+    app.json.loads = timed(JSON_SECONDS, 'request_loads')(app.json.loads)
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            REQUEST_SECONDS.observe(time.perf_counter() - started, request.method, route,
+                                    str(response.status_code))
+        return response
+
+
+def render():
+    """All histograms and counters in Prometheus text exposition format."""
+    return '\n'.join(m.render() for m in HISTOGRAMS + COUNTERS) + '\n'
@@ -0,0 +1,186 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when it carries `X-Profile-Token: <ADMIN_TOKEN>` or is
+picked at random with probability PROFILE_SAMPLE_RATE.  A background thread
+samples the request thread's Python stack every PROFILE_INTERVAL_MS and the
+samples are written in collapsed-stack format (one `frame;frame;frame count`
+line per stack), which speedscope.app and flamegraph.pl open directly.
+
+PROFILE_DIR is bounded: it keeps the PROFILE_SLOWEST_N slowest profiles plus
+the most recent ones up to PROFILE_MAX_FILES.  The slowest requests seen by
+this process are also remembered, profiled or not.
+"""
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from config import Config
+
+PROFILE_DIR = Config.PROFILE_DIR
+ENABLED = bool(Config.ADMIN_TOKEN) or Config.PROFILE_SAMPLE_RATE > 0
+
+_FILENAME_RE = re.compile(r'^(?P<ts>\d+)_(?P<pid>\d+)_(?P<ms>\d+)ms_(?P<method>[A-Z]+)_(?P<path>.*)\.collapsed$')
+
+_slowest = []  # [(duration_ms, info)] of this process, slowest first
+_slowest_lock = threading.Lock()
+_rotate_lock = threading.Lock()
+
+
+class StackSampler:
+    """Periodically samples one thread's Python stack from a background thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Samples in collapsed-stack format."""
+        return ''.join(f"{';'.join(f.replace(';', ':') for f in stack)} {count}\n"
+                       for stack, count in self.samples.most_common())
+
+
+def admin_token_matches(token):
+    """Whether an X-Profile-Token header value is the configured ADMIN_TOKEN (constant-time)."""
+    if not (Config.ADMIN_TOKEN and token):
+        return False
+    # compare_digest rejects non-ASCII str, so compare bytes: WSGI header
+    # values are the raw bytes decoded as latin-1
+    try:
+        sent = token.encode('latin-1')
+    except UnicodeEncodeError:
+        return False
+    return hmac.compare_digest(sent, Config.ADMIN_TOKEN.encode('utf-8'))
+
+def should_profile(headers):
+    """Profile when the admin token header matches or the request is sampled."""
+    if admin_token_matches(headers.get('X-Profile-Token')):
+        return True
+    return Config.PROFILE_SAMPLE_RATE > 0 and random.random() < Config.PROFILE_SAMPLE_RATE
+
+
+def _record_slow_request(duration_ms, info):
+    """Keep the PROFILE_SLOWEST_N slowest requests seen by this process."""
+    with _slowest_lock:
+        if len(_slowest) >= Config.PROFILE_SLOWEST_N and duration_ms <= _slowest[-1][0]:
+            return
+        _slowest.append((duration_ms, info))
+        _slowest.sort(key=lambda entry: entry[0], reverse=True)
+        del _slowest[Config.PROFILE_SLOWEST_N:]
+
+
+def slowest_requests():
+    with _slowest_lock:
+        return [dict(info, duration_ms=round(duration_ms, 1)) for duration_ms, info in _slowest]
+
+
+def write_profile(sampler, duration_ms, method, path):
+    """Write a collapsed-stack profile and rotate the directory; returns the file name."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', path).strip('-')[:60] or 'root'
+    filename = f"{int(time.time() * 1000)}_{os.getpid()}_{int(duration_ms)}ms_{method}_{slug}.collapsed"
+    with open(os.path.join(PROFILE_DIR, filename), 'w') as f:
+        f.write(sampler.collapsed())
+    rotate_profiles()
+    return filename
+
+
+def list_profiles():
+    """Profiles on disk (from every worker), newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        match = _FILENAME_RE.match(name)
+        if not match:
+            continue
+        profiles.append({
+            "filename": name,
+            "created_at": datetime.fromtimestamp(int(match['ts']) / 1000).isoformat(),
+            "pid": int(match['pid']),
+            "duration_ms": int(match['ms']),
+            "method": match['method'],
+            "path": match['path'],
+        })
+    profiles.sort(key=lambda p: p['filename'], reverse=True)
+    return profiles
+
+
+def rotate_profiles():
+    """Keep the slowest PROFILE_SLOWEST_N profiles plus the newest up to PROFILE_MAX_FILES."""
+    with _rotate_lock:
+        profiles = list_profiles()
+        if len(profiles) <= Config.PROFILE_MAX_FILES:
+            return
+        slowest = sorted(profiles, key=lambda p: p['duration_ms'], reverse=True)[:Config.PROFILE_SLOWEST_N]
+        keep = {p['filename'] for p in slowest}
+        for profile in profiles:
+            if len(keep) >= Config.PROFILE_MAX_FILES:
+                break
+            keep.add(profile['filename'])
+        for profile in profiles:
+            if profile['filename'] not in keep:
+                try:
+                    os.remove(os.path.join(PROFILE_DIR, profile['filename']))
+                except FileNotFoundError:
+                    pass  # removed by another worker
+
+
+def init_app(app):
+    """Install the profiling hooks on a Flask app when profiling is configured."""
+    if not ENABLED:
+        return
+    from flask import g, request
+
+    @app.before_request
+    def _start_profile():
+        if request.path.startswith('/admin/'):
+            return  # keep profile listing/downloads out of the profiles themselves
+        g.profile_started = time.perf_counter()
+        if should_profile(request.headers):
+            g.profiler = StackSampler(threading.get_ident(), Config.PROFILE_INTERVAL_MS / 1000).start()
+
+    @app.teardown_request
+    def _finish_profile(exc):
+        started = g.pop('profile_started', None)
+        if started is None:
+            return
+        duration_ms = (time.perf_counter() - started) * 1000
+        sampler = g.pop('profiler', None)
+        info = {"method": request.method, "path": request.path,
+                "at": datetime.now().isoformat(), "profile": None}
+        if sampler is not None:
+            sampler.stop()
+            try:
+                info["profile"] = write_profile(sampler, duration_ms, request.method, request.path)
+            except OSError as e:
+                app.logger.error(f"Failed to write profile: {e}")
+        _record_slow_request(duration_ms, info)
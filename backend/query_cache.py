@@ -0,0 +1,68 @@
+"""
+LRU cache of text-query embeddings.
+
+Kiosk searches repeat a small vocabulary ("black wallet", "keys"), and each
+miss costs a CLIP text-encoder pass, so search reuses embeddings for
+queries it has seen.  The cache is saved in warm-start snapshots.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from config import Config
+
+
+def normalize_query(text):
+    """Cache key for a query; CLIP's tokenizer lowercases and collapses whitespace too."""
+    return ' '.join(text.lower().split())
+
+
+class QueryEmbeddingCache:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # normalized query -> float32 embedding
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, text):
+        key = normalize_query(text)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, text, embedding):
+        if self.max_size <= 0:
+            return
+        key = normalize_query(text)
+        with self._lock:
+            self._entries[key] = np.asarray(embedding, dtype=np.float32)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def items(self):
+        """(query, embedding) pairs, least recently used first."""
+        with self._lock:
+            return list(self._entries.items())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def load(self, items):
+        """Insert (query, embedding) pairs, e.g. from a snapshot."""
+        for text, embedding in items:
+            self.put(text, embedding)
+
+
+query_cache = QueryEmbeddingCache(Config.QUERY_CACHE_SIZE)
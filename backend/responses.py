@@ -0,0 +1,144 @@
+"""
+Fast JSON encoding, response compression and compact result formats.
+
+init_app() installs OrjsonProvider as the app's JSON provider when orjson
+is importable (JSON_PROVIDER=auto, the default) and compresses large JSON
+and text responses with brotli or gzip, whichever the client prefers.
+Brotli is used only when the brotli package is installed.
+
+List endpoints take `fields=a,b,c` to return only some keys and
+`format=columns` to return {"fields": [...], "rows": [[...], ...]}
+instead of one object per result, so keys are not repeated per row.
+"""
+import gzip
+
+from flask.json.provider import DefaultJSONProvider
+
+from config import Config
+from static_files import url_version
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Built once: per-result URLs are string concatenation
+UPLOADS_URL = Config.PUBLIC_BASE_URL.rstrip('/') + '/uploads/'
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain', 'text/csv', 'text/html')
+
+
+def upload_url(filename, content_hash=None):
+    """Absolute URL of an uploaded image, versioned by its content hash when known (see static_files)."""
+    if content_hash:
+        return UPLOADS_URL + filename + '?v=' + url_version(content_hash)
+    return UPLOADS_URL + filename
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson.  Keys are sorted and dates, UUIDs and
+    dataclasses encoded as by the default provider; output is compact UTF-8.
+    """
+
+    def dumps(self, obj, **kwargs):
+        # response() asks for compact separators, which is what orjson writes
+        if kwargs.get('separators') == (',', ':'):
+            del kwargs['separators']
+        if kwargs:
+            return super().dumps(obj, **kwargs)  # e.g. indent: leave it to the json module
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+class FieldError(ValueError):
+    """An invalid fields= or format= parameter."""
+
+
+def parse_fields(value, available):
+    """
+    Fields selected by a `fields=` value (comma-separated string or list),
+    in the order given; all available fields when value is empty.
+    """
+    if not value:
+        return list(available)
+    fields = value.split(',') if isinstance(value, str) else list(value)
+    fields = [field.strip() for field in fields if field.strip()]
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise FieldError(f"Unknown fields: {', '.join(unknown)}; available: {', '.join(available)}")
+    return fields
+
+
+def parse_format(value):
+    """Whether a `format=` value asks for columnar results ('objects', the default, or 'columns')."""
+    if value in (None, '', 'objects'):
+        return False
+    if value == 'columns':
+        return True
+    raise FieldError(f"Unknown format: {value}; use objects or columns")
+
+
+def encode_results(rows, fields, columns=False):
+    """rows (dicts) restricted to fields, as a list of objects or, with columns, in columnar form."""
+    if columns:
+        return {"fields": fields, "rows": [[row[field] for field in fields] for row in rows]}
+    return [{field: row[field] for field in fields} for row in rows]
+
+
+def _preferred_encoding(accept_encodings):
+    if brotli is not None and accept_encodings['br'] > 0:
+        return 'br'
+    if accept_encodings['gzip'] > 0:
+        return 'gzip'
+    return None
+
+
+def compress_response(response, accept_encodings):
+    """Compress a large JSON/text response in place with the client's preferred encoding."""
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+            or response.status_code in (204, 304) or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < Config.COMPRESS_MIN_BYTES:
+        return response
+    encoding = _preferred_encoding(accept_encodings)
+    if encoding == 'br':
+        data = brotli.compress(data, quality=Config.BROTLI_QUALITY)
+    elif encoding == 'gzip':
+        data = gzip.compress(data, compresslevel=Config.GZIP_LEVEL, mtime=0)
+    else:
+        return response
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app):
+    """Install the JSON provider and response compression on a Flask app."""
+    if Config.JSON_PROVIDER == 'orjson' or (Config.JSON_PROVIDER == 'auto' and orjson is not None):
+        if orjson is None:
+            raise RuntimeError("JSON_PROVIDER=orjson but orjson is not installed")
+        app.json = OrjsonProvider(app)
+
+    if Config.COMPRESS_MIN_BYTES > 0:
+        from flask import request
+
+        @app.after_request
+        def _compress(response):
+            return compress_response(response, request.accept_encodings)
@@ -0,0 +1,25 @@
+from flask import Blueprint, request, jsonify, send_from_directory
+from config import Config
+from profiling import PROFILE_DIR, admin_token_matches, list_profiles, slowest_requests
+
+admin_bp = Blueprint('admin', __name__)
+
+def _authorized():
+    return admin_token_matches(request.headers.get('X-Profile-Token', ''))
+
+@admin_bp.route('/admin/profiles', methods=['GET'])
+def get_profiles():
+    """List captured request profiles and the slowest requests seen by this worker."""
+    if not _authorized():
+        return jsonify({"error": "Admin token required"}), 403
+    return jsonify({
+        "profiles": list_profiles(),
+        "slowest_requests": slowest_requests()
+    }), 200
+
+@admin_bp.route('/admin/profiles/<filename>', methods=['GET'])
+def download_profile(filename):
+    """Download a collapsed-stack profile (open it in speedscope or flamegraph.pl)."""
+    if not _authorized():
+        return jsonify({"error": "Admin token required"}), 403
+    return send_from_directory(PROFILE_DIR, filename, mimetype='text/plain', as_attachment=True)
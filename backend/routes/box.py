@@ -1,9 +1,8 @@
 import os
 from flask import Blueprint, request, jsonify
-from database import (
-    add_box, update_box_status, get_box_status, 
-    get_all_boxes, get_collected_items
-)
+from database import get_collected_items
+from box_state import box_states
+from http_cache import cached_response
 
 box_bp = Blueprint('box', __name__)
 
@@ -19,7 +18,7 @@ def register_box():
     status = data.get('status', 'available')
     
     try:
-        add_box(box_id, capacity, status)
+        box_states.register(box_id, capacity, status)
         return jsonify({
             "message": "Box registered successfully",
             "box_id": box_id,
@@ -33,7 +32,7 @@ def register_box():
 def get_box_info(box_id):
     """Get the current status and information of a specific box."""
     try:
-        box_info = get_box_status(box_id)
+        box_info = box_states.get(box_id)
         if not box_info:
             return jsonify({"error": "Box not found"}), 404
         
@@ -66,12 +65,10 @@ def update_box_info(box_id):
         return jsonify({"error": "At least one of status, door_status, or current_load must be provided"}), 400
     
     try:
-        success = update_box_status(box_id, status, door_status, current_load)
-        if not success:
+        updated_box = box_states.update(box_id, status, door_status, current_load)
+        if not updated_box:
             return jsonify({"error": "Box not found"}), 404
         
-        # Get updated box info
-        updated_box = get_box_status(box_id)
         return jsonify({
             "message": "Box status updated successfully",
             "box_id": box_id,
@@ -87,15 +84,9 @@ def update_box_info(box_id):
 def open_door(box_id):
     """Open the box door for item collection."""
     try:
-        # Check if box exists
-        box_info = get_box_status(box_id)
-        if not box_info:
-            return jsonify({"error": "Box not found"}), 404
-        
         # Open the door
-        success = update_box_status(box_id, door_status='open')
-        if not success:
-            return jsonify({"error": "Failed to open door"}), 500
+        if not box_states.update(box_id, door_status='open'):
+            return jsonify({"error": "Box not found"}), 404
         
         return jsonify({
             "message": "Door opened successfully",
@@ -110,15 +101,9 @@ def open_door(box_id):
 def close_door(box_id):
     """Close the box door after collection."""
     try:
-        # Check if box exists
-        box_info = get_box_status(box_id)
-        if not box_info:
-            return jsonify({"error": "Box not found"}), 404
-        
         # Close the door
-        success = update_box_status(box_id, door_status='closed')
-        if not success:
-            return jsonify({"error": "Failed to close door"}), 500
+        if not box_states.update(box_id, door_status='closed'):
+            return jsonify({"error": "Box not found"}), 404
         
         return jsonify({
             "message": "Door closed successfully",
@@ -132,15 +117,9 @@ def close_door(box_id):
 def request_collection(box_id):
     """Request collection for a box (signal it to open for item retrieval)."""
     try:
-        # Check if box exists
-        box_info = get_box_status(box_id)
-        if not box_info:
-            return jsonify({"error": "Box not found"}), 404
-        
         # Update status to request collection and open door
-        success = update_box_status(box_id, status='collect_request', door_status='open')
-        if not success:
-            return jsonify({"error": "Failed to update box status"}), 500
+        if not box_states.update(box_id, status='collect_request', door_status='open'):
+            return jsonify({"error": "Box not found"}), 404
         
         return jsonify({
             "message": "Collection requested successfully",
@@ -156,15 +135,9 @@ def request_collection(box_id):
 def collection_complete(box_id):
     """Mark collection as complete and return box to available status."""
     try:
-        # Check if box exists
-        box_info = get_box_status(box_id)
-        if not box_info:
-            return jsonify({"error": "Box not found"}), 404
-        
         # Reset box status, load, and close door
-        success = update_box_status(box_id, status='available', door_status='closed', current_load=0)
-        if not success:
-            return jsonify({"error": "Failed to update box status"}), 500
+        if not box_states.update(box_id, status='available', door_status='closed', current_load=0):
+            return jsonify({"error": "Box not found"}), 404
         
         return jsonify({
             "message": "Collection completed successfully",
@@ -177,10 +150,11 @@ def collection_complete(box_id):
         return jsonify({"error": f"Failed to complete collection: {str(e)}"}), 500
 
 @box_bp.route('/boxes', methods=['GET'])
+@cached_response(version=box_states.version)
 def get_boxes():
     """Get information about all boxes in the system."""
     try:
-        boxes = get_all_boxes()
+        boxes = box_states.all()
         boxes_data = []
         
         for box in boxes:
@@ -204,12 +178,12 @@ def get_boxes():
         return jsonify({"error": f"Failed to get boxes: {str(e)}"}), 500
 
 @box_bp.route('/box/<box_id>/items', methods=['GET'])
+@cached_response('COLLECTED_ITEMS')
 def get_box_items(box_id):
     """Get all items currently associated with a specific box."""
     try:
         # Get all collected items for this box
-        all_collected = get_collected_items()
-        box_items = [item for item in all_collected if item['box_id'] == box_id]
+        box_items = get_collected_items(box_id)
         
         return jsonify({
             "box_id": box_id,
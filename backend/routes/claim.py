@@ -1,54 +1,68 @@
 from flask import Blueprint, request, jsonify
-from database import claim_item, get_all_items, release_expired_claims, get_collector_by_email, get_collector_by_student_id
+from database import (
+    claim_item, release_claim, get_all_items, release_expired_claims, release_overdue_claims,
+    get_claim_queue, get_claim_queue_position, leave_claim_queue
+)
+from identity import resolve_collector_id
+from http_cache import cached_response
+from responses import FieldError, encode_results, parse_fields, parse_format, upload_url
 
 claim_bp = Blueprint('claim', __name__)
 
-@claim_bp.route('/claim', methods=['POST'])
-def claim_found_item():
-    """Claim a found item for 1 hour."""
-    data = request.get_json()
-    
-    if 'item_id' not in data:
-        return jsonify({"error": "No item_id provided"}), 400
-    
+def _resolve_collector(data):
+    """Collector id from collector_id, email or student_id; returns (collector_id, error_response)."""
     # Accept either collector_id directly, email, or student_id to look up collector
     collector_id = data.get('collector_id')
     email = data.get('email')
     student_id = data.get('student_id')
     
     if not collector_id and not email and not student_id:
-        return jsonify({"error": "Either collector_id, email, or student_id must be provided"}), 400
+        return None, (jsonify({"error": "Either collector_id, email, or student_id must be provided"}), 400)
     
     # If email provided, look up collector
     if email and not collector_id:
-        collector = get_collector_by_email(email)
-        if not collector:
-            return jsonify({
+        collector_id = resolve_collector_id(email=email)
+        if not collector_id:
+            return None, (jsonify({
                 "error": "Email not registered in system",
                 "email": email,
                 "suggestion": "Please register this email first using /collector/register"
-            }), 400
-        collector_id = collector['collector_id']
+            }), 400)
     
     # If student_id provided, look up collector
     if student_id and not collector_id:
-        collector = get_collector_by_student_id(student_id)
-        if not collector:
-            return jsonify({
+        collector_id = resolve_collector_id(student_id=student_id)
+        if not collector_id:
+            return None, (jsonify({
                 "error": "Student ID not registered in system", 
                 "student_id": student_id,
                 "suggestion": "Please register this student ID first using /collector/register"
-            }), 400
-        collector_id = collector['collector_id']
+            }), 400)
     
-    item_id = data['item_id']
+    return collector_id, None
+
+@claim_bp.route('/claim', methods=['POST'])
+def claim_found_item():
+    """
+    Claim a found item for CLAIM_DURATION_HOURS.
+
+    With "wait": true a collector who finds the item claimed is queued for it
+    (202) and given the item when the current claim expires or is released.
+    """
+    data = request.get_json()
     
-    # Clean up expired claims first
-    released_count = release_expired_claims()
-    if released_count > 0:
-        print(f"Released {released_count} expired claims")
+    if 'item_id' not in data:
+        return jsonify({"error": "No item_id provided"}), 400
+    
+    collector_id, error = _resolve_collector(data)
+    if error:
+        return error
     
-    success, message = claim_item(item_id, collector_id)
+    item_id = data['item_id']
+    wait = bool(data.get('wait'))
+    
+    # claim_item ends an expired claim on this item itself
+    success, message = claim_item(item_id, collector_id, wait=wait)
     
     if success:
         return jsonify({
@@ -56,32 +70,80 @@ def claim_found_item():
             "collector_id": collector_id,
             "item_id": item_id
         }), 200
-    else:
-        return jsonify({"error": message}), 400
+    
+    position = get_claim_queue_position(item_id, collector_id) if wait else None
+    if position:
+        return jsonify({
+            "message": message,
+            "collector_id": collector_id,
+            "item_id": item_id,
+            "queued": True,
+            "position": position
+        }), 202
+    return jsonify({"error": message}), 400
+
+@claim_bp.route('/claim/release', methods=['POST'])
+def release_claimed_item():
+    """Give up a claim early; the item goes to the next queued collector, if any."""
+    data = request.get_json()
+    
+    if 'item_id' not in data:
+        return jsonify({"error": "No item_id provided"}), 400
+    
+    collector_id, error = _resolve_collector(data)
+    if error:
+        return error
+    
+    success, message = release_claim(data['item_id'], collector_id)
+    if success:
+        return jsonify({"message": message, "item_id": data['item_id']}), 200
+    return jsonify({"error": message}), 400
+
+@claim_bp.route('/claim/queue/<int:item_id>', methods=['GET'])
+def claim_queue_status(item_id):
+    """Length of an item's queue, and a collector's position in it with ?collector_id=."""
+    queue = get_claim_queue(item_id)
+    result = {"item_id": item_id, "queue_length": len(queue)}
+    
+    collector_id = request.args.get('collector_id', type=int)
+    if collector_id is not None:
+        result["collector_id"] = collector_id
+        result["position"] = get_claim_queue_position(item_id, collector_id)
+    return jsonify(result)
+
+@claim_bp.route('/claim/queue/<int:item_id>', methods=['DELETE'])
+def leave_queue(item_id):
+    """Stop waiting for an item."""
+    collector_id, error = _resolve_collector(request.get_json() or {})
+    if error:
+        return error
+    
+    if not leave_claim_queue(item_id, collector_id):
+        return jsonify({"error": "Collector is not queued for this item"}), 404
+    return jsonify({"message": "Left the queue", "item_id": item_id, "collector_id": collector_id})
+
+ITEM_FIELDS = ('id', 'filename', 'description', 'status', 'claimed_by', 'claimed_at',
+               'expires_at', 'uploaded_at', 'url')
 
 @claim_bp.route('/items', methods=['GET'])
+@cached_response('FOUND_ITEMS', prepare=release_overdue_claims)
 def list_all_items():
-    """List all items in the FOUND_ITEMS table with their status."""
-    # Clean up expired claims first
-    release_expired_claims()
-    
-    items = get_all_items()
-    
-    result = []
-    for item in items:
-        result.append({
-            'id': item['id'],
-            'filename': item['filename'],
-            'description': item['description'],
-            'status': item['status'],
-            'claimed_by': item['claimed_by'],
-            'claimed_at': item['claimed_at'],
-            'expires_at': item['expires_at'],
-            'uploaded_at': item['uploaded_at'],
-            'url': f"http://127.0.0.1:5000/uploads/{item['filename']}"
-        })
-    
-    return jsonify({"items": result})
+    """
+    List all items in the FOUND_ITEMS table with their status.
+
+    ?fields=id,status,... limits the keys returned; ?format=columns returns
+    {"fields": [...], "rows": [[...], ...]} instead of one object per item.
+    """
+    try:
+        fields = parse_fields(request.args.get('fields'), ITEM_FIELDS)
+        columns = parse_format(request.args.get('format'))
+    except FieldError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Expired claims were released by cached_response's prepare step
+    items = [dict(item, url=upload_url(item['filename'], item['image_sha256'])) for item in get_all_items()]
+    
+    return jsonify({"items": encode_results(items, fields, columns)})
 
 @claim_bp.route('/release-expired', methods=['POST'])
 def release_expired():
@@ -3,7 +3,11 @@ import time
 from flask import Blueprint, request, jsonify
 from werkzeug.utils import secure_filename
 from clip_utils import COLLECTOR_FOLDER
-from database import collect_found_item, get_box_status, update_box_status, get_finder_by_rfid
+from database import collect_found_item
+from identity import resolve_finder_id
+from box_state import box_states
+from metrics import timer, FILE_IO_SECONDS
+from upload_utils import save_upload, UploadError
 
 collect_bp = Blueprint('collect', __name__)
 
@@ -21,10 +25,8 @@ def collect_image():
     # Look up finder by RFID if provided
     finder_id = None
     if finder_rfid:
-        finder = get_finder_by_rfid(finder_rfid)
-        if finder:
-            finder_id = finder['finder_id']
-        else:
+        finder_id = resolve_finder_id(finder_rfid)
+        if not finder_id:
             return jsonify({
                 "error": "Finder RFID not registered in system",
                 "rfid_tag": finder_rfid,
@@ -37,7 +39,11 @@ def collect_image():
         filename = f"collected_{int(time.time())}.jpg"
     
     filepath = os.path.join(COLLECTOR_FOLDER, filename)
-    collector_img.save(filepath)
+    try:
+        with timer(FILE_IO_SECONDS, 'collect_save'):
+            save_upload(collector_img, COLLECTOR_FOLDER, filename)
+    except UploadError as e:
+        return jsonify({"error": str(e)}), e.status_code
     
     request_received_timestamp = time.time()
 
@@ -56,14 +62,11 @@ def collect_image():
         
         # Update box load if box_id is provided
         if box_id:
-            box_info = get_box_status(box_id)
-            if box_info:
-                new_load = box_info['current_load'] + 1
-                update_box_status(box_id, current_load=new_load)
-                
-                # If box is full, request collection
-                if new_load >= box_info['capacity']:
-                    update_box_status(box_id, status='collect_request')
+            box_info = box_states.add_load(box_id)
+            
+            # If box is full, request collection
+            if box_info and box_info['current_load'] >= box_info['capacity']:
+                box_states.update(box_id, status='collect_request')
         
         return jsonify({
             "message": "Image collected successfully",
@@ -1,7 +1,7 @@
 import os
 from flask import Blueprint, request, jsonify
 from clip_utils import UPLOAD_FOLDER
-from database import delete_item, get_item_by_filename
+from database import delete_item, item_exists
 
 delete_bp = Blueprint('delete', __name__)
 
@@ -15,8 +15,7 @@ def delete_image():
     filepath = os.path.join(UPLOAD_FOLDER, filename)
 
     # Check if item exists in database
-    item = get_item_by_filename(filename)
-    if not item:
+    if not item_exists(filename):
         return jsonify({"error": "Item not found in database"}), 404
 
     # Remove file from filesystem
@@ -0,0 +1,25 @@
+import json
+from flask import Blueprint, jsonify
+from database import get_job
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Status of a background job; the result (e.g. item_id) is included once it is done."""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+
+    return jsonify({
+        "job_id": job['id'],
+        "kind": job['kind'],
+        "status": job['status'],
+        "attempts": job['attempts'],
+        "max_attempts": job['max_attempts'],
+        "result": json.loads(job['result']) if job['result'] else None,
+        "error": job['error'],
+        "run_after": job['run_after'],
+        "created_at": job['created_at'],
+        "updated_at": job['updated_at']
+    }), 200
@@ -1,24 +1,50 @@
 import os
 import numpy as np
 from flask import Blueprint, request, jsonify, send_file
-from clip_utils import get_text_embedding, UPLOAD_FOLDER
-from database import search_items, release_expired_claims
+from clip_utils import get_text_embedding, follow_active_model, UPLOAD_FOLDER
+from database import search_items, release_overdue_claims
+from query_cache import query_cache
+from responses import FieldError, encode_results, parse_fields, parse_format, upload_url
 
 search_bp = Blueprint('search', __name__)
 
+SEARCH_FIELDS = ('id', 'filename', 'description', 'score', 'status', 'claimed_by', 'expires_at',
+                 'uploaded_at', 'url', 'can_claim', 'is_claimed')
+
 @search_bp.route('/search', methods=['POST'])
 def search_image():
+    """
+    Search items by text.
+
+    Optional "fields" (list or comma-separated) limits the keys returned;
+    "format": "columns" returns {"fields": [...], "rows": [[...], ...]}.
+    """
     data = request.get_json()
     if 'query' not in data:
         return jsonify({"error": "No query provided"}), 400
     
+    try:
+        fields = parse_fields(data.get('fields'), SEARCH_FIELDS)
+        columns = parse_format(data.get('format'))
+    except FieldError as e:
+        return jsonify({"error": str(e)}), 400
+    
     query = data['query']
     
-    # Clean up expired claims before searching
-    release_expired_claims()
+    # End claims the expiry scheduler has not reached yet; a read unless one is overdue
+    release_overdue_claims()
+
+    # Encode with the catalogue's model, even if `db_manager.py reembed` switched it since startup
+    model_name = follow_active_model()
 
-    # Move tensor to CPU and convert to NumPy
-    query_emb = get_text_embedding(query).detach().cpu().numpy().flatten().tolist()
+    # Repeated queries skip the text encoder
+    query_emb = query_cache.get(query)
+    if query_emb is None:
+        # Move tensor to CPU and convert to NumPy
+        query_emb = get_text_embedding(query).detach().cpu().numpy().flatten()
+        if follow_active_model() == model_name:  # not cached across a model switch
+            query_cache.put(query, query_emb)
+    query_emb = query_emb.tolist()
 
     # Search in database
     results = search_items(query_emb, threshold=0.2)
@@ -31,9 +57,9 @@ def search_image():
     
     # Add URLs to results
     for r in results:
-        r["url"] = f"http://127.0.0.1:5000/uploads/{r['filename']}"
+        r["url"] = upload_url(r['filename'], r['image_sha256'])
         # Add claim status information for frontend
         r["can_claim"] = r["status"] == "available"
         r["is_claimed"] = r["status"] == "claimed"
 
-    return jsonify({"results": results})
+    return jsonify({"results": encode_results(results, fields, columns)})
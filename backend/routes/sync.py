@@ -0,0 +1,51 @@
+from flask import Blueprint, request, jsonify
+from database import SYNCED_TABLES, changes_since, get_change_log_version, get_synced_rows
+
+sync_bp = Blueprint('sync', __name__)
+
+MAX_SYNC_LIMIT = 5000
+
+@sync_bp.route('/sync', methods=['GET'])
+def sync():
+    """
+    Rows of FOUND_ITEMS, COLLECTED_ITEMS and BOXES changed since a version.
+
+    Without `since` only the current version is returned, to start syncing
+    from.  Each change carries the row's current values, or null once it is
+    deleted.  Keep calling with the returned version while has_more is true;
+    reset means the client is too far behind and must reload in full.
+    """
+    since = request.args.get('since', type=int)
+    if since is None:
+        return jsonify({"version": get_change_log_version()}), 200
+
+    tables = request.args.get('tables')
+    if tables:
+        tables = [t.strip().upper() for t in tables.split(',')]
+        unknown = [t for t in tables if t not in SYNCED_TABLES]
+        if unknown:
+            return jsonify({"error": f"Unknown tables: {', '.join(unknown)}"}), 400
+
+    limit = min(max(request.args.get('limit', 1000, type=int), 1), MAX_SYNC_LIMIT)
+    delta = changes_since(since, tables=tables, limit=limit)
+
+    rows = {}
+    for table in SYNCED_TABLES:
+        row_ids = [c['row_id'] for c in delta['changes'] if c['table_name'] == table and c['operation'] != 'delete']
+        if row_ids:
+            rows[table] = get_synced_rows(table, row_ids)
+
+    changes = [{
+        "version": c['version'],
+        "table": c['table_name'],
+        "id": c['row_id'],
+        "operation": c['operation'],
+        "row": rows.get(c['table_name'], {}).get(c['row_id'])
+    } for c in delta['changes']]
+
+    return jsonify({
+        "version": delta['version'],
+        "changes": changes,
+        "has_more": delta['has_more'],
+        "reset": delta['reset']
+    }), 200
@@ -0,0 +1,120 @@
+import time
+from flask import Blueprint, request, jsonify
+from database import TELEMETRY_RESOLUTIONS, insert_telemetry, rollup_telemetry, get_telemetry_rollups
+from box_state import box_states
+from config import Config
+
+telemetry_bp = Blueprint('telemetry', __name__)
+
+# Positional layout of a compact reading: ["box_1", 1760000000.5, "closed", 0, 3600, -61]
+READING_FIELDS = ('box_id', 'ts', 'door_status', 'current_load', 'uptime', 'rssi')
+
+# Default window returned by GET /telemetry/<box_id> per resolution (seconds)
+DEFAULT_WINDOWS = {'minute': 3600, 'hour': 7 * 86400}
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def parse_reading(raw, received_at):
+    """Validate one reading (object or compact array); returns a row tuple or raises ValueError."""
+    if isinstance(raw, list):
+        if not 1 <= len(raw) <= len(READING_FIELDS):
+            raise ValueError(f"compact readings have 1 to {len(READING_FIELDS)} fields")
+        raw = dict(zip(READING_FIELDS, raw))
+    elif not isinstance(raw, dict):
+        raise ValueError("reading must be an object or an array")
+
+    box_id = raw.get('box_id')
+    if not isinstance(box_id, str) or box_states.get(box_id) is None:
+        raise ValueError("unknown box_id")
+    ts = raw.get('ts', received_at)
+    if not _is_number(ts):
+        raise ValueError("ts must be a unix timestamp")
+    door_status = raw.get('door_status')
+    if door_status not in (None, 'open', 'closed'):
+        raise ValueError("door_status must be 'open' or 'closed'")
+    values = [raw.get(field) for field in ('current_load', 'uptime', 'rssi')]
+    if any(value is not None and not _is_number(value) for value in values):
+        raise ValueError("current_load, uptime and rssi must be numbers")
+    return (box_id, float(ts), door_status, *(int(v) if v is not None else None for v in values))
+
+@telemetry_bp.route('/telemetry', methods=['POST'])
+def ingest_telemetry():
+    """
+    Store a batch of box heartbeats/readings.
+
+    Body: {"readings": [...]} where each reading is an object with box_id, ts
+    (unix time, defaults to now), door_status, current_load, uptime and rssi,
+    or the same values as a compact array in that order.  Each reading also
+    counts as a heartbeat for its box.  Invalid readings are skipped and
+    reported back.
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('readings'), list):
+        return jsonify({"error": "readings list is required"}), 400
+    if len(data['readings']) > Config.TELEMETRY_MAX_BATCH:
+        return jsonify({"error": f"At most {Config.TELEMETRY_MAX_BATCH} readings per request"}), 413
+
+    received_at = time.time()
+    rows, rejected = [], []
+    for index, raw in enumerate(data['readings']):
+        try:
+            rows.append(parse_reading(raw, received_at))
+        except ValueError as e:
+            rejected.append({"index": index, "error": str(e)})
+
+    try:
+        stored = insert_telemetry(rows) if rows else 0
+    except Exception as e:
+        return jsonify({"error": f"Failed to store telemetry: {str(e)}"}), 500
+
+    # Heartbeat: bump last_updated (and the load from the latest reading) per box
+    latest = {}
+    for row in rows:
+        if row[0] not in latest or row[1] >= latest[row[0]][1]:
+            latest[row[0]] = row
+    for box_id, row in latest.items():
+        box_states.update(box_id, current_load=row[3])
+
+    return jsonify({
+        "accepted": stored,
+        "rejected": rejected
+    }), 200
+
+@telemetry_bp.route('/telemetry/<box_id>', methods=['GET'])
+def get_box_telemetry(box_id):
+    """Per-minute or per-hour aggregates for a box (?resolution=minute|hour&since=&until=, unix time)."""
+    resolution = request.args.get('resolution', 'minute')
+    if resolution not in TELEMETRY_RESOLUTIONS:
+        return jsonify({"error": "resolution must be 'minute' or 'hour'"}), 400
+    until = request.args.get('until', time.time(), type=float)
+    since = request.args.get('since', until - DEFAULT_WINDOWS[resolution], type=float)
+
+    try:
+        rollup_telemetry()  # fold in readings since the last scheduler pass (no write lock when none)
+        buckets = get_telemetry_rollups(box_id, resolution, since, until)
+    except Exception as e:
+        return jsonify({"error": f"Failed to get telemetry: {str(e)}"}), 500
+
+    return jsonify({
+        "box_id": box_id,
+        "resolution": resolution,
+        "since": since,
+        "until": until,
+        "buckets": [
+            {
+                "start": bucket['bucket_start'],
+                "samples": bucket['samples'],
+                "door_open_ratio": bucket['door_open_samples'] / bucket['samples'],
+                "load_avg": bucket['load_sum'] / bucket['load_samples'] if bucket['load_samples'] else None,
+                "load_min": bucket['load_min'],
+                "load_max": bucket['load_max'],
+                "rssi_avg": bucket['rssi_sum'] / bucket['rssi_samples'] if bucket['rssi_samples'] else None,
+                "rssi_min": bucket['rssi_min'],
+                "rssi_max": bucket['rssi_max'],
+                "uptime_max": bucket['uptime_max'],
+                "last_reading_at": bucket['last_reading_at']
+            }
+            for bucket in buckets
+        ]
+    }), 200
@@ -1,41 +1,129 @@
+import io
 import os
+import threading
+from collections import OrderedDict
 from flask import Blueprint, request, jsonify
 from werkzeug.utils import secure_filename
-from clip_utils import get_image_embedding, get_text_embedding, UPLOAD_FOLDER
-from database import add_found_item
+from clip_utils import get_image_embedding, get_text_embedding, follow_active_model, UPLOAD_FOLDER
+from config import Config
+from database import add_found_item, get_item_by_job, item_exists, enqueue_job
+from job_worker import job_handler, job_failure_handler, pool
+from metrics import timer, FILE_IO_SECONDS
+from upload_utils import save_upload, UploadError
 
 upload_bp = Blueprint('upload', __name__)
 
+# (filename, sha256) -> image bytes of uploads whose embedding job has not run
+# yet, bounded by UPLOAD_HANDOFF_MAX_BYTES.  A job run by another process, or
+# after a restart, reads the file instead.
+_handoff = OrderedDict()
+_handoff_bytes = 0
+_handoff_lock = threading.Lock()
+
+def _hand_off(key, data):
+    global _handoff_bytes
+    if len(data) > Config.UPLOAD_HANDOFF_MAX_BYTES:
+        return
+    with _handoff_lock:
+        _handoff[key] = data
+        _handoff_bytes += len(data)
+        while _handoff_bytes > Config.UPLOAD_HANDOFF_MAX_BYTES:
+            _, evicted = _handoff.popitem(last=False)
+            _handoff_bytes -= len(evicted)
+
+def _take_handoff(key):
+    global _handoff_bytes
+    with _handoff_lock:
+        data = _handoff.pop(key, None)
+        if data is not None:
+            _handoff_bytes -= len(data)
+        return data
+
 @upload_bp.route('/upload', methods=['POST'])
 def upload_image():
+    """Store the image and queue embedding; poll the returned status_url for the item id."""
     if 'image' not in request.files:
         return jsonify({"error": "No image uploaded"}), 400
 
     file = request.files['image']
     filename = secure_filename(file.filename)
     filepath = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(filepath)
+    # Never replace another item's image (save_upload also refuses to overwrite)
+    if item_exists(filename) or os.path.exists(filepath):
+        return jsonify({"error": f"An item named {filename} already exists"}), 409
+    try:
+        with timer(FILE_IO_SECONDS, 'upload_save'):
+            stored = save_upload(file, UPLOAD_FOLDER, filename,
+                                 keep_in_memory=Config.UPLOAD_HANDOFF_MAX_BYTES > 0, overwrite=False)
+    except UploadError as e:
+        return jsonify({"error": str(e)}), e.status_code
 
     # Optional description
     description = request.form.get('description', "")
 
-    # Compute embeddings and move to CPU + NumPy
-    img_emb = get_image_embedding(filepath).detach().cpu().numpy().flatten().tolist()
-
-    desc_emb = None
-    if description:
-        desc_emb = get_text_embedding(description).detach().cpu().numpy().flatten().tolist()
-
+    handoff_key = (filename, stored.sha256)
+    if stored.data is not None:
+        _hand_off(handoff_key, stored.data)
     try:
-        # Save to database
-        item_id = add_found_item(filename, img_emb, description, desc_emb)
-        return jsonify({
-            "message": "Image uploaded successfully", 
+        # Embedding and indexing run on the job workers
+        job_id = enqueue_job('embed_upload', {
             "filename": filename,
-            "item_id": item_id
-        }), 200
+            "description": description,
+            "image_sha256": stored.sha256
+        })
     except Exception as e:
-        # Remove uploaded file if database save fails
+        # Remove the file stored above if the job cannot be queued
+        _take_handoff(handoff_key)
         if os.path.exists(filepath):
             os.remove(filepath)
-        return jsonify({"error": f"Failed to save item: {str(e)}"}), 500
+        return jsonify({"error": f"Failed to queue item: {str(e)}"}), 500
+    pool.notify()
+
+    return jsonify({
+        "message": "Image uploaded, processing queued",
+        "filename": filename,
+        "sha256": stored.sha256,
+        "job_id": job_id,
+        "status_url": f"/jobs/{job_id}"
+    }), 202
+
+@job_handler('embed_upload')
+def embed_upload(payload, job_id):
+    """Compute CLIP embeddings for an uploaded image and add it to FOUND_ITEMS."""
+    filename = payload['filename']
+
+    # A previous attempt of this job may have inserted the row before being interrupted
+    existing = get_item_by_job(job_id)
+    if existing:
+        return {"item_id": existing['id']}
+
+    # Embed with the catalogue's current model.  If it is switched before the
+    # insert, add_found_item raises EmbeddingModelChanged and the retry re-embeds.
+    embedding_model = follow_active_model(force=True)
+
+    # Decode the bytes kept by upload_image when this process stored the file
+    data = _take_handoff((filename, payload.get('image_sha256')))
+    image = io.BytesIO(data) if data is not None else os.path.join(UPLOAD_FOLDER, filename)
+
+    # Compute embeddings and move to CPU + NumPy
+    img_emb = get_image_embedding(image).detach().cpu().numpy().flatten().tolist()
+
+    desc_emb = None
+    if payload['description']:
+        desc_emb = get_text_embedding(payload['description']).detach().cpu().numpy().flatten().tolist()
+
+    item_id = add_found_item(filename, img_emb, payload['description'], desc_emb,
+                             embedding_model=embedding_model,
+                             image_sha256=payload.get('image_sha256'), job_id=job_id)
+    return {"item_id": item_id}
+
+@job_failure_handler('embed_upload')
+def discard_upload(payload, job_id):
+    """Remove the image of an upload that will never become an item, freeing its filename."""
+    filename = payload['filename']
+    _take_handoff((filename, payload.get('image_sha256')))
+    if get_item_by_job(job_id) or item_exists(filename):
+        return
+    filepath = os.path.join(UPLOAD_FOLDER, filename)
+    if os.path.exists(filepath):
+        os.remove(filepath)
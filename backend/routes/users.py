@@ -2,11 +2,19 @@ from flask import Blueprint, request, jsonify
 from database import (
     add_finder, get_finder_by_id, get_finder_by_email, get_finder_by_rfid, get_all_finders,
     add_collector, get_collector_by_id, get_collector_by_email, get_collector_by_student_id, get_all_collectors,
-    update_finder_stats, update_collector_stats
+    update_finder_stats, update_collector_stats, get_user_stat_counts, flush_user_stats
 )
+from identity import resolve, invalidate_identities
+from http_cache import cached_response
+from config import Config
 
 users_bp = Blueprint('users', __name__)
 
+def flush_stats_for_read():
+    """Write this process's buffered stat increments so the response shows exact counts."""
+    if Config.USER_STATS_FLUSH_ON_READ:
+        flush_user_stats()
+
 # FINDER routes
 @users_bp.route('/finder/register', methods=['POST'])
 def register_finder():
@@ -30,6 +38,7 @@ def register_finder():
             return jsonify({"error": "RFID tag already exists"}), 409
         
         finder_id = add_finder(name, email, phone, rfid_tag)
+        invalidate_identities(rfid=rfid_tag, email=email)
         
         return jsonify({
             "message": "Finder registered successfully",
@@ -47,6 +56,7 @@ def register_finder():
 def get_finder_info(finder_id):
     """Get finder information by finder ID."""
     try:
+        flush_stats_for_read()
         finder = get_finder_by_id(finder_id)
         if not finder:
             return jsonify({"error": "Finder not found"}), 404
@@ -70,6 +80,7 @@ def get_finder_info(finder_id):
 def get_finder_by_rfid_tag(rfid_tag):
     """Get finder information by RFID tag."""
     try:
+        flush_stats_for_read()
         finder = get_finder_by_rfid(rfid_tag)
         if not finder:
             return jsonify({"error": "Finder not found"}), 404
@@ -88,6 +99,7 @@ def get_finder_by_rfid_tag(rfid_tag):
         return jsonify({"error": f"Failed to get finder: {str(e)}"}), 500
 
 @users_bp.route('/finders', methods=['GET'])
+@cached_response('FINDERS', prepare=flush_stats_for_read)
 def get_all_finders_list():
     """Get all finders in the system."""
     try:
@@ -138,6 +150,7 @@ def register_collector():
             return jsonify({"error": "Student ID already exists"}), 409
         
         collector_id = add_collector(name, email, phone, student_id, id_number)
+        invalidate_identities(email=email, student_id=student_id)
         
         return jsonify({
             "message": "Collector registered successfully",
@@ -156,6 +169,7 @@ def register_collector():
 def get_collector_info(collector_id):
     """Get collector information by collector ID."""
     try:
+        flush_stats_for_read()
         collector = get_collector_by_id(collector_id)
         if not collector:
             return jsonify({"error": "Collector not found"}), 404
@@ -180,6 +194,7 @@ def get_collector_info(collector_id):
 def get_collector_by_student(student_id):
     """Get collector information by student ID."""
     try:
+        flush_stats_for_read()
         collector = get_collector_by_student_id(student_id)
         if not collector:
             return jsonify({"error": "Collector not found"}), 404
@@ -197,6 +212,7 @@ def get_collector_by_student(student_id):
         return jsonify({"error": f"Failed to get collector: {str(e)}"}), 500
 
 @users_bp.route('/collectors', methods=['GET'])
+@cached_response('COLLECTORS', prepare=flush_stats_for_read)
 def get_all_collectors_list():
     """Get all collectors in the system."""
     try:
@@ -232,26 +248,15 @@ def search_user():
         return jsonify({"error": "email parameter is required"}), 400
     
     try:
-        # Check finders first
-        finder = get_finder_by_email(email)
-        if finder:
+        # Finders and collectors in one lookup, finders first
+        users = resolve('email', email)
+        if users:
             return jsonify({
                 "found": True,
-                "user_type": "finder",
-                "user_id": finder['finder_id'],
-                "name": finder['name'],
-                "email": finder['email']
-            }), 200
-        
-        # Check collectors
-        collector = get_collector_by_email(email)
-        if collector:
-            return jsonify({
-                "found": True,
-                "user_type": "collector", 
-                "user_id": collector['collector_id'],
-                "name": collector['name'],
-                "email": collector['email']
+                "user_type": users[0]['user_type'],
+                "user_id": users[0]['user_id'],
+                "name": users[0]['name'],
+                "email": users[0]['email']
             }), 200
         
         return jsonify({
@@ -263,18 +268,18 @@ def search_user():
         return jsonify({"error": f"Failed to search user: {str(e)}"}), 500
 
 @users_bp.route('/users/stats', methods=['GET'])
+@cached_response('USER_STATS', prepare=flush_stats_for_read)
 def get_user_stats():
     """Get statistics about users in the system."""
     try:
-        finders = get_all_finders()
-        collectors = get_all_collectors()
+        stats = get_user_stat_counts()
         
         return jsonify({
-            "total_finders": len(finders),
-            "total_collectors": len(collectors),
-            "active_finders": len([f for f in finders if f['items_found'] > 0]),
-            "active_collectors": len([c for c in collectors if c['items_claimed'] > 0]),
-            "verified_collectors": len([c for c in collectors if c['verification_status'] == 'verified'])
+            "total_finders": stats['total_finders'],
+            "total_collectors": stats['total_collectors'],
+            "active_finders": stats['active_finders'],
+            "active_collectors": stats['active_collectors'],
+            "verified_collectors": stats['verified_collectors']
         }), 200
     except Exception as e:
         return jsonify({"error": f"Failed to get user stats: {str(e)}"}), 500
@@ -1,6 +1,12 @@
 import threading
-import time
-from database import release_expired_claims
+from datetime import datetime
+from database import (
+    release_expired_claims, next_claim_expiry, compact_embedding_store, prune_change_log,
+    rollup_telemetry, prune_telemetry, flush_user_stats
+)
+from config import Config
+from job_worker import recover_interrupted_jobs
+from snapshot import save_snapshot
 import logging
 
 # Configure logging
@@ -12,6 +18,7 @@ class ClaimCleanupScheduler:
         self.interval_seconds = interval_seconds
         self.running = False
         self.thread = None
+        self._stop_event = threading.Event()
     
     def start(self):
         """Start the background cleanup task."""
@@ -19,6 +26,7 @@ class ClaimCleanupScheduler:
             return
         
         self.running = True
+        self._stop_event.clear()
         self.thread = threading.Thread(target=self._cleanup_loop, daemon=True)
         self.thread.start()
         logger.info("Started claim cleanup scheduler")
@@ -26,6 +34,7 @@ class ClaimCleanupScheduler:
     def stop(self):
         """Stop the background cleanup task."""
         self.running = False
+        self._stop_event.set()
         if self.thread:
             self.thread.join()
         logger.info("Stopped claim cleanup scheduler")
@@ -34,17 +43,128 @@ class ClaimCleanupScheduler:
         """Main loop for cleaning up expired claims."""
         while self.running:
             try:
-                released_count = release_expired_claims()
-                if released_count > 0:
-                    logger.info(f"Released {released_count} expired claims")
+                recover_interrupted_jobs()
             except Exception as e:
-                logger.error(f"Error during claim cleanup: {e}")
+                logger.error(f"Error during job recovery: {e}")
+
+            try:
+                compact_embedding_store(Config.EMBEDDING_STORE_COMPACT_RATIO)
+            except Exception as e:
+                logger.error(f"Error during embedding store compaction: {e}")
+
+            try:
+                pruned = prune_change_log(Config.CHANGE_LOG_RETENTION_HOURS)
+                if pruned > 0:
+                    logger.info(f"Pruned {pruned} change log entries")
+            except Exception as e:
+                logger.error(f"Error pruning change log: {e}")
+
+            try:
+                rollup_telemetry()
+                dropped, deleted = prune_telemetry(Config.TELEMETRY_RAW_RETENTION_DAYS,
+                                                   Config.TELEMETRY_MINUTE_RETENTION_DAYS,
+                                                   Config.TELEMETRY_HOUR_RETENTION_DAYS)
+                if dropped or deleted:
+                    logger.info(f"Pruned {dropped} telemetry partitions and {deleted} rollup rows")
+            except Exception as e:
+                logger.error(f"Error rolling up telemetry: {e}")
+
+            if Config.SNAPSHOT_ENABLED:
+                try:
+                    save_snapshot()
+                except Exception as e:
+                    logger.error(f"Error writing search snapshot: {e}")
+            
+            # Sleep for the specified interval, waking early on stop()
+            self._stop_event.wait(self.interval_seconds)
+
+class ClaimExpiryScheduler:
+    """
+    Ends expired claims as they expire, handing each item to the next
+    collector in its queue.  Sleeps until the next known expiry, but never
+    longer than CLAIM_EXPIRY_POLL_SECONDS.
+    """
+    MIN_WAIT_SECONDS = 0.05
+
+    def __init__(self, poll_seconds=None):
+        self.poll_seconds = poll_seconds or Config.CLAIM_EXPIRY_POLL_SECONDS
+        self.running = False
+        self.thread = None
+        self._stop_event = threading.Event()
+    
+    def start(self):
+        """Start the background expiry task."""
+        if self.running:
+            return
+        
+        self.running = True
+        self._stop_event.clear()
+        self.thread = threading.Thread(target=self._expiry_loop, daemon=True)
+        self.thread.start()
+        logger.info("Started claim expiry scheduler")
+    
+    def stop(self):
+        """Stop the background expiry task."""
+        self.running = False
+        self._stop_event.set()
+        if self.thread:
+            self.thread.join()
+        logger.info("Stopped claim expiry scheduler")
+    
+    def _expiry_loop(self):
+        while self.running:
+            wait = self.poll_seconds
+            try:
+                ended = release_expired_claims()
+                if ended > 0:
+                    logger.info(f"Ended {ended} expired claims")
+                next_expiry = next_claim_expiry()
+                if next_expiry is not None:
+                    wait = min(wait, max(self.MIN_WAIT_SECONDS, (next_expiry - datetime.now()).total_seconds()))
+            except Exception as e:
+                logger.error(f"Error during claim expiry: {e}")
             
-            # Sleep for the specified interval
-            time.sleep(self.interval_seconds)
+            self._stop_event.wait(wait)
+
+class UserStatsFlusher:
+    """Writes buffered finder/collector stat increments every few seconds."""
+    def __init__(self, interval_seconds=None):
+        self.interval_seconds = interval_seconds or Config.USER_STATS_FLUSH_INTERVAL
+        self.running = False
+        self.thread = None
+        self._stop_event = threading.Event()
+    
+    def start(self):
+        """Start the background flush task (not needed when buffering is disabled)."""
+        if self.running or self.interval_seconds <= 0:
+            return
+        
+        self.running = True
+        self._stop_event.clear()
+        self.thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.thread.start()
+        logger.info("Started user stats flusher")
+    
+    def stop(self):
+        """Stop the background flush task and write whatever is still buffered."""
+        self.running = False
+        self._stop_event.set()
+        if self.thread:
+            self.thread.join()
+        flush_user_stats()
+        logger.info("Stopped user stats flusher")
+    
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            try:
+                flush_user_stats()
+            except Exception as e:
+                logger.error(f"Error flushing user stats: {e}")
 
-# Global scheduler instance
+# Global scheduler instances
 scheduler = ClaimCleanupScheduler()
+claim_expiry = ClaimExpiryScheduler()
+stats_flusher = UserStatsFlusher()
 
 def start_cleanup_scheduler():
     """Start the cleanup scheduler."""
@@ -53,3 +173,19 @@ def start_cleanup_scheduler():
 def stop_cleanup_scheduler():
     """Stop the cleanup scheduler."""
     scheduler.stop()
+
+def start_claim_expiry():
+    """Start the claim expiry scheduler."""
+    claim_expiry.start()
+
+def stop_claim_expiry():
+    """Stop the claim expiry scheduler."""
+    claim_expiry.stop()
+
+def start_stats_flusher():
+    """Start the user stats flusher."""
+    stats_flusher.start()
+
+def stop_stats_flusher():
+    """Stop the user stats flusher, flushing pending increments."""
+    stats_flusher.stop()
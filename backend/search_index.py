@@ -0,0 +1,250 @@
+"""
+In-memory embedding index used by search_items.
+
+Keeps the FOUND_ITEMS image/description embeddings as contiguous numpy
+arrays so a query is scored with a couple of matrix-vector products instead
+of parsing JSON for every row.  Two representations are supported:
+
+- "exact": normalized float32 vectors (3 KB per 768-dim vector)
+- "int8":  per-vector scalar-quantized codes (768 B per vector) scored with
+           asymmetric distance (float query x int8 codes), followed by a
+           full-precision re-rank of the candidates
+"""
+import threading
+import numpy as np
+
+INDEX_MODES = {"exact", "int8"}
+
+
+def _present(embedding):
+    return embedding is not None and len(embedding) > 0
+
+
+def normalize(vector):
+    """Return vector as a unit-length float32 array."""
+    vec = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+
+def quantize_int8(vector):
+    """Quantize a unit vector to int8 codes and a per-vector scale."""
+    vec = normalize(vector)
+    max_abs = float(np.max(np.abs(vec))) if vec.size else 0.0
+    scale = max_abs / 127.0 if max_abs > 0 else 1.0
+    codes = np.clip(np.rint(vec / scale), -127, 127).astype(np.int8)
+    return codes, scale
+
+
+def combine_scores(img_scores, desc_scores, has_desc):
+    """Combine image and description scores the same way search_items always has."""
+    return np.where(has_desc, (img_scores + desc_scores) / 2, img_scores)
+
+
+class EmbeddingIndex:
+    """Growable embedding matrix keyed by FOUND_ITEMS.id."""
+
+    def __init__(self, mode="exact", initial_capacity=64):
+        if mode not in INDEX_MODES:
+            raise ValueError(f"Unknown index mode: {mode}")
+        self.mode = mode
+        self.dim = None
+        self._lock = threading.RLock()
+        self._capacity = initial_capacity
+        self._size = 0
+        self._pos = {}  # item_id -> row
+        self._ids = np.empty(initial_capacity, dtype=np.int64)
+        self._has_desc = np.zeros(initial_capacity, dtype=bool)
+        self._img = None
+        self._desc = None
+        self._img_scale = np.ones(initial_capacity, dtype=np.float32)
+        self._desc_scale = np.ones(initial_capacity, dtype=np.float32)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, item_id):
+        return item_id in self._pos
+
+    def _allocate(self, dim):
+        dtype = np.int8 if self.mode == "int8" else np.float32
+        self.dim = dim
+        self._img = np.zeros((self._capacity, dim), dtype=dtype)
+        self._desc = np.zeros((self._capacity, dim), dtype=dtype)
+
+    def _grow(self):
+        new_capacity = self._capacity * 2
+        for name in ("_ids", "_has_desc", "_img_scale", "_desc_scale", "_img", "_desc"):
+            old = getattr(self, name)
+            new = np.zeros((new_capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+        self._capacity = new_capacity
+
+    def _encode(self, vector):
+        if self.mode == "int8":
+            return quantize_int8(vector)
+        return normalize(vector), 1.0
+
+    def add(self, item_id, image_embedding, description_embedding=None):
+        """Add or replace the embeddings for an item."""
+        with self._lock:
+            img_codes, img_scale = self._encode(image_embedding)
+            if self.dim is None:
+                self._allocate(img_codes.shape[0])
+            elif img_codes.shape[0] != self.dim:
+                raise ValueError(f"Embedding dimension {img_codes.shape[0]} does not match index dimension {self.dim}")
+
+            row = self._pos.get(item_id)
+            if row is None:
+                if self._size == self._capacity:
+                    self._grow()
+                row = self._size
+                self._size += 1
+                self._pos[item_id] = row
+
+            self._ids[row] = item_id
+            self._img[row] = img_codes
+            self._img_scale[row] = img_scale
+            if _present(description_embedding):
+                desc_codes, desc_scale = self._encode(description_embedding)
+                self._desc[row] = desc_codes
+                self._desc_scale[row] = desc_scale
+                self._has_desc[row] = True
+            else:
+                self._desc[row] = 0
+                self._desc_scale[row] = 1.0
+                self._has_desc[row] = False
+
+    def remove(self, item_id):
+        """Remove an item, moving the last row into its slot."""
+        with self._lock:
+            row = self._pos.pop(item_id, None)
+            if row is None:
+                return False
+            last = self._size - 1
+            if row != last:
+                for arr in (self._ids, self._has_desc, self._img_scale, self._desc_scale, self._img, self._desc):
+                    arr[row] = arr[last]
+                self._pos[int(self._ids[row])] = row
+            self._size -= 1
+            return True
+
+    def clear(self):
+        """Drop every item from the index."""
+        with self._lock:
+            self._pos.clear()
+            self._size = 0
+
+    ARRAY_NAMES = ("ids", "has_desc", "img", "desc", "img_scale", "desc_scale")
+
+    def to_arrays(self):
+        """Copies of the live rows, keyed by ARRAY_NAMES (used for snapshots)."""
+        with self._lock:
+            if self.dim is None:
+                return {}
+            return {name: getattr(self, "_" + name)[:self._size].copy() for name in self.ARRAY_NAMES}
+
+    @classmethod
+    def from_arrays(cls, mode, arrays):
+        """
+        Build an index around arrays produced by to_arrays.  The arrays are
+        used as-is, so copy-on-write memory maps load without reading every
+        page up front; they are copied only when the index grows.
+        """
+        index = cls(mode)
+        if not arrays or len(arrays["ids"]) == 0:
+            return index
+        size = len(arrays["ids"])
+        for name in cls.ARRAY_NAMES:
+            setattr(index, "_" + name, arrays[name])
+        index.dim = arrays["img"].shape[1]
+        index._size = index._capacity = size
+        index._pos = {int(item_id): row for row, item_id in enumerate(arrays["ids"])}
+        return index
+
+    def memory_bytes(self):
+        """Bytes held by the live part of the vector arrays."""
+        if self.dim is None:
+            return 0
+        per_row = (self._img.itemsize + self._desc.itemsize) * self.dim
+        per_row += self._ids.itemsize + self._has_desc.itemsize
+        per_row += self._img_scale.itemsize + self._desc_scale.itemsize
+        return per_row * self._size
+
+    def _rows_for(self, item_ids):
+        if item_ids is None:
+            return np.arange(self._size)
+        return np.array([self._pos[i] for i in item_ids if i in self._pos], dtype=np.int64)
+
+    def score(self, query_embedding, item_ids=None):
+        """
+        Score items against a query.
+
+        Returns (ids, scores, error_bound).  In exact mode error_bound is 0;
+        in int8 mode it is a per-row upper bound on |approx - exact|, so any
+        row with score + error_bound below a threshold can be discarded
+        without changing the result set.
+        """
+        query = normalize(query_embedding)
+        with self._lock:
+            rows = self._rows_for(item_ids)
+            if self.dim is None or rows.size == 0:
+                empty = np.empty(0, dtype=np.float32)
+                return np.empty(0, dtype=np.int64), empty, empty
+            ids = self._ids[rows].copy()
+            has_desc = self._has_desc[rows]
+            img = self._img[rows]
+            desc = self._desc[rows]
+            img_scale = self._img_scale[rows]
+            desc_scale = self._desc_scale[rows]
+
+        if self.mode == "exact":
+            scores = combine_scores(img @ query, desc @ query, has_desc)
+            return ids, scores, np.zeros_like(scores)
+
+        img_scores = (img.astype(np.float32) @ query) * img_scale
+        desc_scores = (desc.astype(np.float32) @ query) * desc_scale
+        scores = combine_scores(img_scores, desc_scores, has_desc)
+        # Rounding error per component is at most scale/2, so the dot product
+        # error is bounded by scale/2 * ||query||_1.
+        q_l1 = float(np.abs(query).sum())
+        bound = combine_scores(img_scale * 0.5 * q_l1, desc_scale * 0.5 * q_l1, has_desc)
+        return ids, scores, bound.astype(np.float32) + 1e-6
+
+    def search(self, query_embedding, threshold, item_ids=None, loader=None):
+        """
+        Return [(item_id, score)] for items scoring above threshold, best first.
+
+        In int8 mode the candidates surviving the error bound are re-scored
+        at full precision using loader(ids) -> {id: (image_emb, desc_emb)},
+        so the result set and ordering match an exact search.
+        """
+        ids, scores, bound = self.score(query_embedding, item_ids)
+        if self.mode == "int8":
+            candidates = ids[scores + bound > threshold]
+            if loader is None or candidates.size == 0:
+                keep = scores > threshold
+                ids, scores = ids[keep], scores[keep]
+            else:
+                ids, scores = self._rerank(query_embedding, candidates.tolist(), loader)
+        keep = scores > threshold
+        ids, scores = ids[keep], scores[keep]
+        order = np.argsort(-scores, kind="stable")
+        return [(int(ids[i]), float(scores[i])) for i in order]
+
+    @staticmethod
+    def _rerank(query_embedding, candidate_ids, loader):
+        query = normalize(query_embedding)
+        embeddings = loader(candidate_ids)
+        ids, scores = [], []
+        for item_id in candidate_ids:
+            if item_id not in embeddings:
+                continue
+            img_emb, desc_emb = embeddings[item_id]
+            score = float(normalize(img_emb) @ query)
+            if _present(desc_emb):
+                score = (score + float(normalize(desc_emb) @ query)) / 2
+            ids.append(item_id)
+            scores.append(score)
+        return np.array(ids, dtype=np.int64), np.array(scores, dtype=np.float32)
@@ -0,0 +1,195 @@
+"""
+Warm-start snapshots of the search index and the query-embedding cache.
+
+Rebuilding the in-memory index means normalizing (and, in int8 mode,
+quantizing) every stored vector, and a fresh query cache means a CLIP text
+pass for every repeated query.  save_snapshot() writes both as .npy files;
+restore_snapshot() memory-maps them copy-on-write at startup and replays
+only the FOUND_ITEMS rows the change log reports as changed since the
+snapshot (or, when the log has been pruned past it, every id above the
+snapshot's high-water mark plus a scan for deletions).
+
+Layout for lost_and_found.db and model M, generation G:
+
+    lost_and_found.M.snap.json    {"format": 1, "generation": G, "model": M, "mode": ..., "high_water_mark": N,
+                                   "change_version": V}
+    lost_and_found.M.snap.G/      ids.npy has_desc.npy img.npy desc.npy img_scale.npy desc_scale.npy
+                                  queries.json query_embeddings.npy
+
+A new generation directory is written under a lock and published by
+atomically replacing the json pointer; older generations are then removed.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+import database
+from config import Config
+from query_cache import query_cache
+from search_index import EmbeddingIndex
+
+FORMAT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot_path():
+    return database.embedding_store_path(Config.CLIP_MODEL) + '.snap'
+
+
+@contextmanager
+def _snapshot_lock(base):
+    if fcntl is None:
+        yield
+        return
+    with open(base + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_meta(base):
+    try:
+        with open(base + '.json') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _queries_fingerprint(queries):
+    """Digest of the cached query texts, so a full cache whose entries changed still counts as new."""
+    return hashlib.blake2b('\n'.join(sorted(text for text, _ in queries)).encode('utf-8'),
+                           digest_size=16).hexdigest()
+
+def save_snapshot():
+    """Write the current index and query cache; returns the snapshot metadata or None."""
+    if not os.path.exists(database.DATABASE_PATH):
+        return None
+    # Read the change version and high-water mark first: rows changed after
+    # them are replayed on restore even if they also made it into the arrays
+    # (add is idempotent)
+    change_version = database.get_change_log_version()
+    _, high_water_mark = database.get_found_item_ids(Config.CLIP_MODEL)
+    index = database.get_search_index(build=False)
+    arrays = index.to_arrays() if isinstance(index, EmbeddingIndex) else {}
+    queries = query_cache.items()
+    if not arrays and not queries:
+        return None
+
+    base = snapshot_path()
+    current = _read_meta(base)
+    queries_fingerprint = _queries_fingerprint(queries)
+    if current and (current.get("high_water_mark"), current.get("items"), current.get("queries_fingerprint")) == \
+            (high_water_mark, len(arrays["ids"]) if arrays else 0, queries_fingerprint):
+        return None  # nothing new since the last snapshot
+    generation = f"{int(time.time() * 1000)}-{os.getpid()}"
+    meta = {
+        "format": FORMAT_VERSION,
+        "generation": generation,
+        "model": Config.CLIP_MODEL,
+        "mode": index.mode if arrays else None,
+        "high_water_mark": high_water_mark,
+        "change_version": change_version,
+        "items": len(arrays["ids"]) if arrays else 0,
+        "queries": len(queries),
+        "queries_fingerprint": queries_fingerprint,
+        "created_at": datetime.now().isoformat(),
+    }
+    with _snapshot_lock(base):
+        directory = f"{base}.{generation}"
+        tmp_directory = directory + '.tmp'
+        os.makedirs(tmp_directory)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_directory, name + '.npy'), array)
+        if queries:
+            with open(os.path.join(tmp_directory, 'queries.json'), 'w') as f:
+                json.dump([text for text, _ in queries], f)
+            np.save(os.path.join(tmp_directory, 'query_embeddings.npy'),
+                    np.stack([embedding for _, embedding in queries]))
+        os.rename(tmp_directory, directory)
+
+        tmp_meta = base + '.json.tmp'
+        with open(tmp_meta, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, base + '.json')
+
+        # Drop older generations (processes that mapped them keep their pages)
+        parent, prefix = os.path.split(base)
+        for name in os.listdir(parent or '.'):
+            path = os.path.join(parent, name)
+            if name.startswith(prefix + '.') and os.path.isdir(path) and path != directory:
+                shutil.rmtree(path, ignore_errors=True)
+    return meta
+
+
+def _replay_changes(meta, index, snapshot_ids):
+    """Ids to drop from and (re)load into a restored index to match FOUND_ITEMS."""
+    if meta.get("change_version") is not None:
+        delta = database.changes_since(meta["change_version"], tables=['FOUND_ITEMS'], limit=None)
+        if not delta["reset"]:
+            changed = [change['row_id'] for change in delta["changes"]]
+            live, _ = database.get_found_item_ids(Config.CLIP_MODEL, item_ids=changed)
+            live = set(live)
+            return ([item_id for item_id in changed if item_id not in live and item_id in index],
+                    [item_id for item_id in changed if item_id in live])
+
+    # No usable change log: compare every live id against the snapshot
+    live_ids, _ = database.get_found_item_ids(Config.CLIP_MODEL)
+    live = set(live_ids)
+    removed = [int(item_id) for item_id in snapshot_ids if int(item_id) not in live]
+    new_ids = [item_id for item_id in live_ids
+               if item_id > meta["high_water_mark"] or item_id not in index]
+    return removed, new_ids
+
+
+def restore_snapshot():
+    """
+    Load the latest snapshot, bring it up to date with FOUND_ITEMS and install
+    it for search_items.  Returns a summary dict, or None when there is no
+    usable snapshot (search then builds its index from scratch as before).
+    """
+    base = snapshot_path()
+    meta = _read_meta(base)
+    if meta is None or meta.get("format") != FORMAT_VERSION or meta.get("model") != Config.CLIP_MODEL:
+        return None
+
+    directory = f"{base}.{meta['generation']}"
+    summary = {"generation": meta["generation"], "items": 0, "replayed": 0, "removed": 0, "queries": 0}
+    try:
+        if meta["mode"] == Config.SEARCH_INDEX_MODE and meta["items"]:
+            arrays = {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode='c')
+                      for name in EmbeddingIndex.ARRAY_NAMES}
+            index = EmbeddingIndex.from_arrays(meta["mode"], arrays)
+
+            removed, new_ids = _replay_changes(meta, index, arrays["ids"])
+            for item_id in removed:
+                index.remove(item_id)
+            for item_id, (img_emb, desc_emb) in database.load_item_embeddings(new_ids).items():
+                index.add(item_id, img_emb, desc_emb)
+            database.set_search_index(index)
+            summary.update(items=len(index), replayed=len(new_ids), removed=len(removed))
+
+        if meta["queries"]:
+            with open(os.path.join(directory, 'queries.json')) as f:
+                texts = json.load(f)
+            embeddings = np.load(os.path.join(directory, 'query_embeddings.npy'))
+            query_cache.load(zip(texts, embeddings))
+            summary["queries"] = len(texts)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable snapshot {directory}: {e}")
+        return None
+    return summary
@@ -0,0 +1,127 @@
+"""
+Serving of uploaded and collected images.
+
+Image URLs in /items and /search carry the first bytes of the image's
+SHA-256 (`/uploads/cat.jpg?v=3f2a...`).  When the version matches the file
+on disk the response is marked immutable and cached for STATIC_MAX_AGE;
+unversioned or stale URLs get Cache-Control: no-cache and are revalidated
+with ETag/Last-Modified.  Hashes are checked against a per-process cache
+keyed on (mtime, size), so a file is read at most once per version.
+
+The bytes themselves never pass through Python when it can be avoided:
+
+    STATIC_OFFLOAD=x-accel     nginx: the response is an empty body with
+                               X-Accel-Redirect: STATIC_ACCEL_PREFIX/<mount>/<filename>
+                               and nginx serves the file from an internal location
+    STATIC_OFFLOAD=x-sendfile  Apache mod_xsendfile / lighttpd: X-Sendfile: <path>
+    (unset)                    send_file with range and conditional requests; WSGI
+                               servers providing wsgi.file_wrapper (gunicorn, uWSGI)
+                               copy the file to the socket with sendfile(2)
+"""
+import hashlib
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import quote
+
+from flask import abort, make_response, request, send_file
+from werkzeug.security import safe_join
+
+from config import Config
+
+HASH_CHUNK_SIZE = 1024 * 1024
+# Hex digits of the SHA-256 used as the URL version
+VERSION_LENGTH = 16
+
+
+def url_version(content_hash):
+    """URL version string for a file's hex SHA-256."""
+    return content_hash[:VERSION_LENGTH]
+
+
+def file_sha256(path):
+    """Hex SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentHashCache:
+    """LRU of file SHA-256s, valid while the file's mtime and size are unchanged."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # path -> (mtime_ns, size, sha256)
+        self._lock = threading.Lock()
+
+    def get(self, path, stat):
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[:2] == key:
+                self._entries.move_to_end(path)
+                return entry[2]
+
+        content_hash = file_sha256(path)
+        with self._lock:
+            self._entries[path] = key + (content_hash,)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return content_hash
+
+
+content_hashes = ContentHashCache(Config.STATIC_HASH_CACHE_SIZE)
+
+
+def _mimetype(filename):
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def _is_current(path, stat, version):
+    """Whether a ?v= version names the file's current content."""
+    return len(version) == VERSION_LENGTH and url_version(content_hashes.get(path, stat)) == version
+
+
+def serve(folder, filename, mount):
+    """Response for folder/filename requested under /<mount>/<filename>."""
+    path = safe_join(os.path.abspath(folder), filename)
+    if path is None:
+        abort(404)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        abort(404)
+    if not os.path.isfile(path):
+        abort(404)
+
+    version = request.args.get('v')
+    immutable = bool(version) and _is_current(path, stat, version)
+
+    if Config.STATIC_OFFLOAD == 'x-accel':
+        response = make_response('')
+        response.headers['X-Accel-Redirect'] = f"{Config.STATIC_ACCEL_PREFIX}/{mount}/{quote(filename)}"
+        # nginx keeps the upstream Content-Type and fills in length, ranges and validators
+        response.headers['Content-Type'] = _mimetype(filename)
+    else:
+        # With USE_X_SENDFILE (STATIC_OFFLOAD=x-sendfile) send_file only sets the header
+        response = send_file(path, conditional=True, max_age=None)
+
+    if immutable:
+        response.cache_control.no_cache = None  # set by send_file when given no max_age
+        response.cache_control.public = True
+        response.cache_control.max_age = Config.STATIC_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+def init_app(app):
+    """Configure X-Sendfile hand-off for STATIC_OFFLOAD=x-sendfile."""
+    if Config.STATIC_OFFLOAD not in ('', 'x-accel', 'x-sendfile'):
+        raise RuntimeError(f"Unknown STATIC_OFFLOAD: {Config.STATIC_OFFLOAD}; use x-accel or x-sendfile")
+    app.config['USE_X_SENDFILE'] = Config.STATIC_OFFLOAD == 'x-sendfile'
@@ -0,0 +1,127 @@
+"""
+Chunked, size-limited saving of uploaded images.
+
+Request bodies larger than MAX_CONTENT_LENGTH are refused by Flask before
+they are parsed.  Accepted uploads are copied in fixed-size chunks into a
+temporary file next to their destination, hashed as they are written and
+renamed into place only once complete.  Files whose first bytes are not a
+known image signature, or that exceed MAX_FILE_SIZE, are rejected without
+copying the rest.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+
+from config import Config
+
+CHUNK_SIZE = 64 * 1024
+
+# Where the app stores and serves found-item uploads and collection box images
+UPLOAD_FOLDER = 'uploads'
+COLLECTOR_FOLDER = 'collectors'
+
+# Leading bytes of the image formats PIL (and so CLIP preprocessing) can decode
+IMAGE_SIGNATURES = [
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+]
+
+StoredUpload = namedtuple('StoredUpload', ['path', 'size', 'sha256', 'image_format', 'data'])
+
+
+class UploadError(ValueError):
+    """An upload rejected before it was stored; status_code is the HTTP status to return."""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def sniff_image_format(header):
+    """Image format from the first bytes of a file, or None if it is not a supported image."""
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    for signature, image_format in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    return None
+
+
+def _create_exclusive(temp_path, path, data=None):
+    """Give path the content of temp_path (or data, when kept in memory); UploadError(409) if path exists."""
+    exists = UploadError(f"A file named {os.path.basename(path)} already exists", 409)
+    try:
+        os.link(temp_path, path)  # unlike rename, fails if path exists
+        return
+    except FileExistsError:
+        raise exists
+    except OSError:
+        pass  # no hard links on this filesystem: copy into a file only this call can create
+
+    try:
+        out = open(path, 'xb')
+    except FileExistsError:
+        raise exists
+    try:
+        with out:
+            if data is not None:
+                out.write(data)
+            else:
+                with open(temp_path, 'rb') as src:
+                    shutil.copyfileobj(src, out, CHUNK_SIZE)
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+def save_upload(file_storage, folder, filename, max_size=None, keep_in_memory=False, chunk_size=CHUNK_SIZE,
+                overwrite=True):
+    """
+    Stream an uploaded file into folder/filename and return a StoredUpload.
+
+    With keep_in_memory the bytes are also returned in StoredUpload.data so
+    they can be decoded without reading the file back.  Without overwrite an
+    existing folder/filename is left alone and the upload rejected with 409.
+    Raises UploadError (409, 413 or 415) and leaves nothing on disk if the
+    upload is rejected.
+    """
+    max_size = Config.MAX_FILE_SIZE if max_size is None else max_size
+    stream = file_storage.stream
+    first = stream.read(chunk_size)
+    image_format = sniff_image_format(first)
+    if image_format is None:
+        raise UploadError("File is not a supported image (JPEG, PNG, GIF, BMP or WebP)", 415)
+
+    digest = hashlib.sha256()
+    buffer = bytearray() if keep_in_memory else None
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=folder, prefix='.upload-', suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            chunk = first
+            while chunk:
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadError(f"File exceeds the upload limit of {max_size} bytes", 413)
+                digest.update(chunk)
+                out.write(chunk)
+                if buffer is not None:
+                    buffer += chunk
+                chunk = stream.read(chunk_size)
+        path = os.path.join(folder, filename)
+        if overwrite:
+            os.replace(temp_path, path)
+        else:
+            _create_exclusive(temp_path, path, buffer)
+            os.remove(temp_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    return StoredUpload(path, size, digest.hexdigest(), image_format,
+                        bytes(buffer) if buffer is not None else None)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Column projection benchmark for the FOUND_ITEMS read paths.
+
+Times each item query the way it used to run (SELECT * FROM FOUND_ITEMS,
+which drags both JSON embedding columns out of SQLite) against the
+projected query database.py runs now, and reports the bytes materialized
+per call as well as the latency.  The same is done for the HTTP endpoints
+built on those queries (/items and the /delete existence check).
+
+Usage:
+    python benchmarks/bench_projection.py --items 10000
+    python benchmarks/bench_projection.py --items 20000 --dim 768 --output projection.json
+"""
+
+import argparse
+import os
+import platform
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+
+from common import install_clip_stub, stop_app_threads, time_call, write_results
+
+
+def row_bytes(rows):
+    """Bytes held by the values of sqlite3.Row results (text as UTF-8)."""
+    total = 0
+    for row in rows:
+        for value in row:
+            if isinstance(value, str):
+                total += len(value.encode('utf-8'))
+            elif isinstance(value, bytes):
+                total += len(value)
+            elif value is not None:
+                total += 8
+    return total
+
+
+def run(args, workdir):
+    install_clip_stub(args.dim, os.path.join(workdir, 'uploads'), os.path.join(workdir, 'collectors'))
+    import database
+    from datagen import populate
+
+    populate(os.path.join(workdir, 'projection.db'), args.items, dim=args.dim, seed=args.seed)
+    filename = f"item_{args.items // 2}.jpg"
+    now = datetime.now().isoformat()
+
+    def select_star(sql, params=()):
+        def query():
+            with database.get_db_connection() as conn:
+                return conn.execute(sql, params).fetchall()
+        return query
+
+    queries = {
+        "all_items": (select_star('SELECT * FROM FOUND_ITEMS'), database.get_all_items),
+        "available_items": (
+            select_star('''SELECT * FROM FOUND_ITEMS WHERE status = 'available'
+                           OR (status = 'claimed' AND datetime(expires_at) < datetime(?))''', (now,)),
+            database.get_available_items),
+        "item_by_filename": (select_star('SELECT * FROM FOUND_ITEMS WHERE filename = ?', (filename,)),
+                             lambda: [database.get_item_by_filename(filename)]),
+        "delete_exists": (select_star('SELECT * FROM FOUND_ITEMS WHERE filename = ?', (filename,)),
+                          lambda: database.item_exists(filename)),
+    }
+
+    results = {}
+    for name, (before, after) in queries.items():
+        before_bytes = row_bytes(before())
+        after_rows = after()
+        after_bytes = row_bytes(after_rows) if isinstance(after_rows, list) else 8
+        results[name] = {
+            "before": dict(time_call(before, args.repeat), bytes=before_bytes),
+            "after": dict(time_call(after, args.repeat), bytes=after_bytes),
+        }
+
+    from app import app
+    client = app.test_client()
+    results["GET /items"] = {"after": dict(time_call(lambda: client.get('/items'), args.repeat),
+                                           bytes=len(client.get('/items').get_data()))}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FOUND_ITEMS column projection benchmark")
+    parser.add_argument('--items', type=int, default=10000, help='FOUND_ITEMS rows to generate')
+    parser.add_argument('--dim', type=int, default=768, help='Embedding dimension')
+    parser.add_argument('--repeat', type=int, default=10, help='Timed iterations per query')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for data')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='lostfound_projection_')
+    try:
+        results = run(args, workdir)
+    finally:
+        stop_app_threads()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'query':<18} {'before ms':>10} {'after ms':>10} {'before bytes':>14} {'after bytes':>14}")
+    for name, result in results.items():
+        before = result.get("before")
+        after = result["after"]
+        print(f"{name:<18} {before['mean_ms'] if before else float('nan'):10.2f} {after['mean_ms']:10.2f} "
+              f"{before['bytes'] if before else '-':>14} {after['bytes']:>14}")
+
+    if args.output:
+        write_results(args.output, {
+            "meta": {"timestamp": datetime.now().isoformat(), "python": sys.version.split()[0],
+                     "platform": platform.platform(), "items": args.items, "dim": args.dim},
+            "results": results,
+        })
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
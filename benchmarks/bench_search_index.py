@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark the exact and int8-quantized search indexes.
+
+Reports index memory, per-query latency and recall@k of the quantized
+index against exact search, both from the raw int8 scores and after the
+full-precision re-rank used by search_items.
+
+Usage:
+    python benchmarks/bench_search_index.py --items 10000 --queries 50
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+import common  # noqa: F401  (puts backend/ on sys.path)
+from search_index import EmbeddingIndex, normalize
+
+
+def make_catalogue(n_items, dim, seed):
+    """Random unit vectors; every other item gets a description embedding."""
+    rng = np.random.default_rng(seed)
+    images = rng.standard_normal((n_items, dim)).astype(np.float32)
+    images /= np.linalg.norm(images, axis=1, keepdims=True)
+    descs = images + 0.5 * rng.standard_normal((n_items, dim)).astype(np.float32)
+    descs /= np.linalg.norm(descs, axis=1, keepdims=True)
+    return images, descs
+
+
+def make_queries(images, n_queries, seed):
+    """Noisy copies of catalogue items so each query has real matches."""
+    rng = np.random.default_rng(seed + 1)
+    picks = rng.integers(0, len(images), n_queries)
+    noise = 0.05 * rng.standard_normal((n_queries, images.shape[1])).astype(np.float32)
+    return [normalize(images[i] + noise[j]) for j, i in enumerate(picks)]
+
+
+def build_index(mode, images, descs):
+    index = EmbeddingIndex(mode)
+    for i in range(len(images)):
+        index.add(i, images[i], descs[i] if i % 2 else None)
+    return index
+
+
+def time_queries(index, queries, threshold, loader=None):
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(index.search(query, threshold, loader=loader))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, latencies
+
+
+def raw_topk(index, query, k):
+    ids, scores, _ = index.score(query)
+    order = np.argsort(-scores, kind="stable")[:k]
+    return [int(ids[i]) for i in order]
+
+
+def recall_at_k(exact, approx, k):
+    hits = [len(set(e[:k]) & set(a[:k])) / max(1, min(k, len(e))) for e, a in zip(exact, approx)]
+    return float(np.mean(hits))
+
+
+def summarize(latencies):
+    return {
+        "mean_ms": float(np.mean(latencies)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def run(n_items, n_queries, dim, k, threshold, seed):
+    images, descs = make_catalogue(n_items, dim, seed)
+    queries = make_queries(images, n_queries, seed)
+
+    def loader(ids):
+        return {i: (images[i], descs[i] if i % 2 else None) for i in ids}
+
+    exact = build_index("exact", images, descs)
+    quant = build_index("int8", images, descs)
+
+    exact_results, exact_lat = time_queries(exact, queries, threshold)
+    rerank_results, rerank_lat = time_queries(quant, queries, threshold, loader=loader)
+
+    exact_ids = [[i for i, _ in r] for r in exact_results]
+    rerank_ids = [[i for i, _ in r] for r in rerank_results]
+    raw_ids = [raw_topk(quant, q, k) for q in queries]
+    exact_topk = [raw_topk(exact, q, k) for q in queries]
+
+    return {
+        "items": n_items,
+        "dim": dim,
+        "queries": n_queries,
+        "k": k,
+        "threshold": threshold,
+        "exact": {"memory_bytes": exact.memory_bytes(), **summarize(exact_lat)},
+        "int8": {
+            "memory_bytes": quant.memory_bytes(),
+            **summarize(rerank_lat),
+            "recall_at_k_raw": recall_at_k(exact_topk, raw_ids, k),
+            "recall_at_k_reranked": recall_at_k(exact_ids, rerank_ids, k),
+            "identical_top_k": all(e[:k] == r[:k] for e, r in zip(exact_ids, rerank_ids)),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark exact vs int8 search index")
+    parser.add_argument('--items', type=int, default=10000, help='Catalogue size')
+    parser.add_argument('--queries', type=int, default=50, help='Number of queries')
+    parser.add_argument('--dim', type=int, default=768, help='Embedding dimension')
+    parser.add_argument('-k', type=int, default=10, help='k for recall@k')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Search threshold')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    report = run(args.items, args.queries, args.dim, args.k, args.threshold, args.seed)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Concurrent claim stress test.
+
+Builds a synthetic database (see datagen.py), then starts --threads claimers
+(in each of --processes worker processes) that race to claim the same
+--items available items through database.claim_item.  Every claimer walks
+the items in its own random order, so each item sees roughly
+threads * processes attempts.
+
+The run fails if any item ends up with more or fewer than one winner, or if
+the winner recorded in FOUND_ITEMS.claimed_by differs from the one
+claim_item reported.  The report lists claim attempts/sec, successful
+claims/sec, per-attempt latency and how many attempts gave up on a locked
+database after the configured retries.
+
+Usage:
+    python benchmarks/claim_stress.py --items 200 --threads 16
+    python benchmarks/claim_stress.py --items 500 --threads 8 --processes 4 --output claims.json
+"""
+
+import argparse
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from common import summarize_latencies, write_results
+
+import database
+from datagen import populate
+
+
+def claim_worker(db_path, item_ids, threads, collector_base, seed):
+    """Race `threads` claimers over item_ids; returns (wins, latencies_ms, outcomes)."""
+    database.DATABASE_PATH = db_path
+    wins = []
+    latencies = []
+    outcomes = Counter()
+    lock = threading.Lock()
+    start = threading.Barrier(threads)
+
+    def claimer(collector_id):
+        order = list(item_ids)
+        random.Random(seed * 7919 + collector_id).shuffle(order)
+        local_wins, local_latencies, local_outcomes = [], [], Counter()
+        start.wait()
+        for item_id in order:
+            t0 = time.perf_counter()
+            try:
+                success, message = database.claim_item(item_id, collector_id)
+            except sqlite3.OperationalError as e:
+                success, message = False, f"error: {e}"
+            local_latencies.append((time.perf_counter() - t0) * 1000)
+            local_outcomes[message] += 1
+            if success:
+                local_wins.append((item_id, collector_id))
+        with lock:
+            wins.extend(local_wins)
+            latencies.extend(local_latencies)
+            outcomes.update(local_outcomes)
+
+    workers = [threading.Thread(target=claimer, args=(collector_base + i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    database.flush_user_stats()
+    return wins, latencies, outcomes
+
+
+def _process_entry(args, queue):
+    queue.put(claim_worker(*args))
+
+
+def run(args, workdir):
+    db_path = os.path.join(workdir, 'claims.db')
+    info = populate(db_path, args.scale, dim=args.dim, seed=args.seed)
+    if info['collectors'] < args.threads * args.processes:
+        sys.exit(f"--scale {args.scale} only creates {info['collectors']} collectors; "
+                 f"need at least {args.threads * args.processes}")
+
+    with database.get_db_connection() as conn:
+        item_ids = [row['id'] for row in conn.execute(
+            "SELECT id FROM FOUND_ITEMS WHERE status = 'available' ORDER BY id LIMIT ?", (args.items,))]
+
+    started = time.perf_counter()
+    if args.processes == 1:
+        results = [claim_worker(db_path, item_ids, args.threads, 1, args.seed)]
+    else:
+        context = multiprocessing.get_context('spawn')
+        queue = context.Queue()
+        processes = [context.Process(target=_process_entry,
+                                     args=((db_path, item_ids, args.threads, 1 + p * args.threads, args.seed + p),
+                                           queue))
+                     for p in range(args.processes)]
+        for process in processes:
+            process.start()
+        results = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+    elapsed = time.perf_counter() - started
+
+    wins, latencies, outcomes = [], [], Counter()
+    for process_wins, process_latencies, process_outcomes in results:
+        wins.extend(process_wins)
+        latencies.extend(process_latencies)
+        outcomes.update(process_outcomes)
+
+    winners = Counter(item_id for item_id, _ in wins)
+    placeholders = ','.join('?' * len(item_ids))
+    with database.get_db_connection() as conn:
+        recorded = {row['id']: row['claimed_by'] for row in conn.execute(
+            f"SELECT id, claimed_by FROM FOUND_ITEMS WHERE id IN ({placeholders}) AND status = 'claimed'",
+            item_ids)}
+    problems = [f"item {item_id}: {winners[item_id]} winners" for item_id in item_ids if winners[item_id] != 1]
+    problems += [f"item {item_id}: claim_item reported collector {collector_id}, "
+                 f"FOUND_ITEMS has {recorded.get(item_id)}"
+                 for item_id, collector_id in wins if recorded.get(item_id) != collector_id]
+
+    return {
+        "items": len(item_ids),
+        "threads": args.threads,
+        "processes": args.processes,
+        "attempts": len(latencies),
+        "claims": len(wins),
+        "elapsed_s": elapsed,
+        "attempts_per_sec": len(latencies) / elapsed,
+        "claims_per_sec": len(wins) / elapsed,
+        "latency": summarize_latencies(latencies),
+        "outcomes": dict(outcomes),
+        "problems": problems,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent claim stress test")
+    parser.add_argument('--items', type=int, default=200, help='Items the claimers race for')
+    parser.add_argument('--threads', type=int, default=16, help='Claimer threads per process')
+    parser.add_argument('--processes', type=int, default=1, help='Worker processes')
+    parser.add_argument('--scale', type=int, default=1000, help='FOUND_ITEMS rows to generate')
+    parser.add_argument('--dim', type=int, default=64, help='Embedding dimension')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for data and claim order')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='lostfound_claims_')
+    try:
+        result = run(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    latency = result["latency"]
+    print(f"{result['attempts']} attempts by {args.threads} threads x {args.processes} processes "
+          f"on {result['items']} items in {result['elapsed_s']:.2f}s")
+    print(f"  {result['attempts_per_sec']:.0f} attempts/s, {result['claims_per_sec']:.0f} claims/s, "
+          f"p50 {latency['p50_ms']:.2f} ms, p99 {latency['p99_ms']:.2f} ms")
+    for message, count in sorted(result["outcomes"].items(), key=lambda entry: -entry[1]):
+        print(f"  {count:7d}  {message}")
+
+    if args.output:
+        result["meta"] = {"timestamp": datetime.now().isoformat(), "python": sys.version.split()[0],
+                          "platform": platform.platform()}
+        write_results(args.output, result)
+        print(f"Results written to {args.output}")
+
+    if result["problems"]:
+        for problem in result["problems"][:20]:
+            print(f"FAIL {problem}")
+        sys.exit(1)
+    print("OK: exactly one winner per item")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Importing this module puts backend/ on sys.path.  install_clip_stub()
+replaces clip_utils with a deterministic stand-in so benchmarks never load
+CLIP weights and every run embeds the same inputs to the same vectors.
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+import types
+import zlib
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, os.path.abspath(BACKEND_DIR))
+
+
+def stub_embedding(key, dim):
+    """Deterministic unit vector for a string key."""
+    rng = np.random.default_rng(zlib.crc32(key.encode('utf-8')))
+    vec = rng.standard_normal(dim).astype(np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+class _StubTensor:
+    """Just enough of a torch tensor for `.detach().cpu().numpy()` call chains."""
+
+    def __init__(self, array):
+        self._array = array.reshape(1, -1)
+
+    def detach(self):
+        return self
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self._array
+
+
+def install_clip_stub(dim, upload_folder, collector_folder):
+    """Register a fake clip_utils module; must run before importing routes or app."""
+    from config import Config
+
+    module = types.ModuleType('clip_utils')
+    module.MODEL_NAME = Config.CLIP_MODEL
+    module.RUNTIME = 'stub'
+    module.EMBEDDING_DIM = dim
+    module.UPLOAD_FOLDER = upload_folder
+    module.COLLECTOR_FOLDER = collector_folder
+    os.makedirs(upload_folder, exist_ok=True)
+    os.makedirs(collector_folder, exist_ok=True)
+
+    def get_image_embedding(image):
+        if hasattr(image, 'read'):
+            key = zlib.crc32(image.read()).to_bytes(4, 'little').hex()
+        else:
+            key = os.path.basename(str(image))
+        return _StubTensor(stub_embedding(key, dim))
+
+    def get_text_embedding(text):
+        return _StubTensor(stub_embedding(text, dim))
+
+    module.get_image_embedding = get_image_embedding
+    module.get_text_embedding = get_text_embedding
+    module.follow_active_model = lambda force=False: module.MODEL_NAME
+    module.get_inference_stats = lambda: {"model": module.MODEL_NAME, "runtime": "stub"}
+    sys.modules['clip_utils'] = module
+    return module
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize_latencies(latencies):
+    """Mean, p50/p95/p99, min and max of a list of latencies in ms."""
+    if not latencies:
+        return {"count": 0}
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.mean(ordered),
+        "p50_ms": percentile(ordered, 0.50),
+        "p95_ms": percentile(ordered, 0.95),
+        "p99_ms": percentile(ordered, 0.99),
+        "min_ms": ordered[0],
+        "max_ms": ordered[-1],
+    }
+
+
+def time_call(fn, repeat, setup=None):
+    """Run fn repeat times (after one untimed warm-up) and summarize latencies in ms."""
+    if setup:
+        setup()
+    fn()
+    latencies = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    stats = summarize_latencies(latencies)
+    stats["ops_per_sec"] = 1000.0 / stats["mean_ms"] if stats["mean_ms"] else None
+    return stats
+
+
+def stop_app_threads():
+    """Stop the app's background threads (if it was imported) before its database is removed."""
+    if 'app' not in sys.modules:
+        return
+    import box_state
+    import job_worker
+    import scheduler
+    scheduler.stop_cleanup_scheduler()
+    scheduler.stop_claim_expiry()
+    job_worker.stop_job_workers()
+    box_state.stop_box_state_flusher()
+    scheduler.stop_stats_flusher()
+
+
+def write_results(path, results):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,107 @@
+"""
+Synthetic data generator for benchmarks.
+
+Fills FOUND_ITEMS, COLLECTED_ITEMS, BOXES, FINDERS and COLLECTORS of a
+fresh database with random unit-vector embeddings at a given scale.
+"""
+
+import json
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import common  # noqa: F401  (puts backend/ on sys.path)
+import database
+from config import Config
+
+DESCRIPTIONS = [
+    "black leather wallet", "blue water bottle", "keys on a red lanyard",
+    "laptop charger", "grey hoodie", "student ID card", "wireless earbuds case",
+    "umbrella", "calculator", "notebook with stickers",
+]
+
+
+def random_unit_vectors(rng, count, dim):
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def populate(db_path, scale, dim=768, seed=0, batch_size=1000):
+    """
+    Create db_path and fill it with `scale` found items plus proportional
+    users, boxes and collected items.  Returns the generated ids.
+    """
+    database.DATABASE_PATH = db_path
+    database.init_database()
+    rng = np.random.default_rng(seed)
+    rand = random.Random(seed)
+    now = datetime.now()
+
+    n_finders = max(10, scale // 10)
+    n_collectors = max(10, scale // 10)
+    n_boxes = max(5, scale // 100)
+
+    with database.get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT INTO FINDERS (name, email, rfid_tag, items_found, reputation_score, created_at, last_active)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(f"Finder {i}", f"finder{i}@example.edu", f"RFID{i:08d}", rand.randint(0, 20),
+               rand.randint(0, 50), now.isoformat(), now.isoformat()) for i in range(n_finders)])
+        cursor.executemany('''
+            INSERT INTO COLLECTORS (name, email, student_id, items_claimed, verification_status, created_at, last_active)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(f"Collector {i}", f"collector{i}@example.edu", f"S{i:08d}", rand.randint(0, 5),
+               rand.choice(['verified', 'unverified', 'pending']), now.isoformat(), now.isoformat())
+              for i in range(n_collectors)])
+        cursor.executemany('''
+            INSERT INTO BOXES (id, status, door_status, capacity, current_load, last_updated)
+            VALUES (?, ?, ?, 1, ?, ?)
+        ''', [(f"box_{i}", 'available', 'closed', 0, now.isoformat()) for i in range(n_boxes)])
+
+        for start in range(0, scale, batch_size):
+            count = min(batch_size, scale - start)
+            images = random_unit_vectors(rng, count, dim)
+            descs = random_unit_vectors(rng, count, dim)
+            rows = []
+            for j in range(count):
+                i = start + j
+                has_desc = i % 2 == 0
+                # A tenth of the catalogue is claimed, half of those with an expired hold
+                claimed = i % 10 == 0
+                expires_at = now + (timedelta(minutes=-5) if i % 20 == 0 else timedelta(hours=1))
+                rows.append((
+                    f"item_{i}.jpg",
+                    rand.choice(DESCRIPTIONS) if has_desc else "",
+                    json.dumps(images[j].tolist()),
+                    json.dumps(descs[j].tolist()) if has_desc else None,
+                    'claimed' if claimed else 'available',
+                    now.isoformat() if claimed else None,
+                    rand.randint(1, n_collectors) if claimed else None,
+                    expires_at.isoformat() if claimed else None,
+                    rand.randint(1, n_finders),
+                    Config.CLIP_MODEL,
+                    dim,
+                ))
+            cursor.executemany('''
+                INSERT INTO FOUND_ITEMS (filename, description, image_embedding, description_embedding,
+                                         status, claimed_at, claimed_by, expires_at, finder_id,
+                                         embedding_model, embedding_dim)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+        cursor.executemany('''
+            INSERT INTO COLLECTED_ITEMS (filename, box_id, finder_id, imgtaken_timestamp)
+            VALUES (?, ?, ?, ?)
+        ''', [(f"collected_{i}.jpg", f"box_{i % n_boxes}", rand.randint(1, n_finders),
+               now.timestamp()) for i in range(scale)])
+        conn.commit()
+
+    return {
+        "items": scale,
+        "finders": n_finders,
+        "collectors": n_collectors,
+        "boxes": [f"box_{i}" for i in range(n_boxes)],
+        "dim": dim,
+    }
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+HTTP load test modelling a deployment of ESP32 boxes, kiosks and admin dashboards.
+
+Each virtual user is a thread that loops over its role's traffic with think
+time in between:
+
+    box    polls GET /box/<id>/status and now and then POSTs /collect
+    kiosk  sends bursts of POST /search and sometimes POST /claim on one of a
+           small set of popular items, so claims contend with each other
+    admin  refreshes GET /items, GET /boxes and GET /users/stats
+
+Requests go through the Flask test client by default, or through real
+sockets with --serve (a threaded Werkzeug server started in this process).
+CLIP is replaced by the deterministic stub from common.py unless --clip real
+is given.  The report lists throughput, p50/p95/p99 latency, errors and
+SQLite "database is locked" errors per endpoint.
+
+Usage:
+    python benchmarks/load_test.py --boxes 50 --kiosks 5 --admins 1 --duration 30
+    python benchmarks/load_test.py --boxes 200 --serve --speed 10 --output load.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import datetime
+
+from common import install_clip_stub, stop_app_threads, summarize_latencies, write_results
+
+LOCK_ERROR = "database is locked"
+
+QUERIES = ["black wallet", "water bottle", "keys", "charger", "hoodie", "id card",
+           "umbrella", "calculator", "earbuds", "notebook"]
+
+
+class Recorder:
+    """Thread-safe per-endpoint latency and outcome counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(list)
+        self._counts = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, elapsed_ms, outcome):
+        with self._lock:
+            self._latencies[endpoint].append(elapsed_ms)
+            self._counts[endpoint][outcome] += 1
+
+    def report(self, duration):
+        with self._lock:
+            endpoints = {}
+            for endpoint, latencies in sorted(self._latencies.items()):
+                counts = self._counts[endpoint]
+                endpoints[endpoint] = {
+                    "requests": len(latencies),
+                    "throughput_rps": len(latencies) / duration,
+                    "ok": counts["ok"],
+                    "rejected": counts["rejected"],
+                    "errors": counts["error"] + counts["lock_error"],
+                    "lock_errors": counts["lock_error"],
+                    **summarize_latencies(latencies),
+                }
+        total = sum(e["requests"] for e in endpoints.values())
+        return {
+            "duration_s": duration,
+            "requests": total,
+            "throughput_rps": total / duration,
+            "errors": sum(e["errors"] for e in endpoints.values()),
+            "lock_errors": sum(e["lock_errors"] for e in endpoints.values()),
+            "endpoints": endpoints,
+        }
+
+
+class TestClientTransport:
+    """In-process requests through the Flask test client (one client per thread)."""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, json_body=None, form=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        if form is not None:
+            response = client.open(path, method=method, data=form, content_type='multipart/form-data')
+        else:
+            response = client.open(path, method=method, json=json_body)
+        return response.status_code, response.get_data(as_text=True)
+
+
+class HTTPTransport:
+    """Real HTTP requests against a server listening on base_url."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, json_body=None, form=None):
+        from werkzeug.datastructures import FileStorage
+        from werkzeug.test import encode_multipart
+
+        headers = {}
+        data = None
+        if form is not None:
+            # Test-client style (stream, filename) tuples become file parts
+            fields = {k: FileStorage(v[0], filename=v[1]) if isinstance(v, tuple) else v
+                      for k, v in form.items()}
+            boundary, data = encode_multipart(fields)
+            headers['Content-Type'] = f'multipart/form-data; boundary={boundary}'
+        elif json_body is not None:
+            data = json.dumps(json_body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=60) as response:
+                return response.status, response.read().decode('utf-8', 'replace')
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode('utf-8', 'replace')
+
+
+class LoadTest:
+    def __init__(self, transport, recorder, info, hot_items, speed, image_bytes, seed):
+        self.transport = transport
+        self.recorder = recorder
+        self.info = info
+        self.hot_items = hot_items
+        self.speed = speed
+        self.image_bytes = image_bytes
+        self.seed = seed
+        self.stop = threading.Event()
+        self._sequence = iter(range(sys.maxsize))
+        self._sequence_lock = threading.Lock()
+
+    def call(self, endpoint, method, path, expected=(200,), json_body=None, form=None):
+        """Issue one request and classify it as ok, rejected (an expected 4xx), error or lock_error."""
+        start = time.perf_counter()
+        try:
+            status, body = self.transport.request(method, path, json_body=json_body, form=form)
+        except Exception as e:
+            status, body = 0, str(e)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if LOCK_ERROR in body:
+            outcome = "lock_error"
+        elif status == 200:
+            outcome = "ok"
+        elif status in expected:
+            outcome = "rejected"
+        else:
+            outcome = "error"
+        self.recorder.record(endpoint, elapsed_ms, outcome)
+        return status, body
+
+    def think(self, seconds):
+        """Sleep for a scaled think time; returns False once the test is over."""
+        return not self.stop.wait(seconds / self.speed)
+
+    def next_name(self, prefix):
+        with self._sequence_lock:
+            return f"{prefix}_{next(self._sequence)}.jpg"
+
+    def box_user(self, box_id, rand):
+        """ESP32 box: poll status every second, post a photo every ~30 polls."""
+        while self.think(rand.uniform(0.8, 1.2)):
+            self.call("GET /box/<id>/status", "GET", f"/box/{box_id}/status")
+            if rand.random() < 1 / 30:
+                form = {
+                    'image': (io.BytesIO(self.image_bytes), self.next_name(box_id)),
+                    'timestamp': str(time.time()),
+                    'box_id': box_id,
+                }
+                if rand.random() < 0.5:
+                    form['finder_rfid'] = f"RFID{rand.randrange(self.info['finders']):08d}"
+                self.call("POST /collect", "POST", "/collect", form=form)
+
+    def kiosk_user(self, rand):
+        """Kiosk: a burst of searches while someone types, then maybe a claim."""
+        while self.think(rand.uniform(3, 8)):
+            for _ in range(rand.randint(1, 3)):
+                self.call("POST /search", "POST", "/search", expected=(404,),
+                          json_body={'query': rand.choice(QUERIES)})
+                if not self.think(rand.uniform(0.2, 0.6)):
+                    return
+            if rand.random() < 0.5:
+                self.call("POST /claim", "POST", "/claim", expected=(400,), json_body={
+                    'item_id': rand.choice(self.hot_items),
+                    'collector_id': rand.randint(1, self.info['collectors']),
+                })
+
+    def admin_user(self, rand):
+        """Admin dashboard: periodic refresh of items, boxes and user stats."""
+        while self.think(rand.uniform(4, 6)):
+            self.call("GET /items", "GET", "/items")
+            self.call("GET /boxes", "GET", "/boxes")
+            self.call("GET /users/stats", "GET", "/users/stats")
+
+    def relist_hot_items(self, database, interval):
+        """Make the popular items claimable again so /claim keeps contending for them."""
+        placeholders = ','.join('?' * len(self.hot_items))
+        while self.think(interval):
+            try:
+                with database.get_db_connection() as conn:
+                    conn.execute(f'''UPDATE FOUND_ITEMS SET status = 'available', claimed_at = NULL,
+                                     claimed_by = NULL, expires_at = NULL WHERE id IN ({placeholders})''',
+                                 self.hot_items)
+                    conn.commit()
+            except Exception as e:
+                print(f"relist failed: {e}")
+
+    def run(self, boxes, kiosks, admins, duration, database, relist_interval):
+        threads = []
+
+        def spawn(target, *args):
+            thread = threading.Thread(target=target, args=args, daemon=True)
+            threads.append(thread)
+
+        box_ids = self.info['boxes']
+        for i in range(boxes):
+            spawn(self.box_user, box_ids[i % len(box_ids)], random.Random(f"{self.seed}-box-{i}"))
+        for i in range(kiosks):
+            spawn(self.kiosk_user, random.Random(f"{self.seed}-kiosk-{i}"))
+        for i in range(admins):
+            spawn(self.admin_user, random.Random(f"{self.seed}-admin-{i}"))
+        if kiosks:
+            spawn(self.relist_hot_items, database, relist_interval)
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        self.stop.wait(duration)
+        self.stop.set()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+
+def start_server(app):
+    """Serve app on a free local port from a background thread; returns (server, base_url)."""
+    from werkzeug.serving import make_server
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def surface_unhandled_errors(app):
+    """Return unhandled exception messages in 500 bodies so lock errors can be counted."""
+    from flask import jsonify
+    from werkzeug.exceptions import InternalServerError
+
+    @app.errorhandler(InternalServerError)
+    def internal_error(e):
+        return jsonify({"error": str(e.original_exception or e)}), 500
+
+
+def print_report(report):
+    print(f"\n{'endpoint':<24}{'reqs':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err':>7}{'locked':>8}")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:<24}{stats['requests']:>8}{stats['throughput_rps']:>9.1f}"
+              f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+              f"{stats['errors']:>7}{stats['lock_errors']:>8}")
+    print(f"{'total':<24}{report['requests']:>8}{report['throughput_rps']:>9.1f}"
+          f"{'':>27}{report['errors']:>7}{report['lock_errors']:>8}")
+    print("(latencies in ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lost & Found HTTP load test")
+    parser.add_argument('--boxes', type=int, default=50, help='Number of ESP32 boxes polling and posting photos')
+    parser.add_argument('--kiosks', type=int, default=5, help='Number of kiosks searching and claiming')
+    parser.add_argument('--admins', type=int, default=1, help='Number of admin dashboards refreshing')
+    parser.add_argument('--duration', type=float, default=30, help='Test length in seconds')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Divide all think times by this factor to compress traffic')
+    parser.add_argument('--items', type=int, default=5000, help='FOUND_ITEMS rows in the generated database')
+    parser.add_argument('--hot-items', type=int, default=10, help='Popular items that kiosks contend to claim')
+    parser.add_argument('--relist-interval', type=float, default=2.0,
+                        help='Seconds between making the popular items claimable again')
+    parser.add_argument('--serve', action='store_true',
+                        help='Send real HTTP requests to a threaded local server instead of the test client')
+    parser.add_argument('--clip', choices=['stub', 'real'], default='stub',
+                        help='Use the fast deterministic CLIP stub or load the configured model')
+    parser.add_argument('--dim', type=int, default=768, help='Embedding dimension for the stub')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for data and traffic')
+    parser.add_argument('--output', help='Write the report as JSON to this file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='lostfound_load_')
+    try:
+        if args.clip == 'stub':
+            install_clip_stub(args.dim, os.path.join(workdir, 'uploads'), os.path.join(workdir, 'collectors'))
+        import clip_utils
+        dim = clip_utils.EMBEDDING_DIM
+
+        import database
+        from datagen import populate
+        from run_benchmarks import make_image_bytes
+
+        info = populate(os.path.join(workdir, 'load.db'), args.items, dim=dim, seed=args.seed)
+        with database.get_db_connection() as conn:
+            hot_items = [row['id'] for row in conn.execute(
+                "SELECT id FROM FOUND_ITEMS WHERE status = 'available' ORDER BY id LIMIT ?", (args.hot_items,))]
+
+        from app import app
+        surface_unhandled_errors(app)
+        server = None
+        if args.serve:
+            server, base_url = start_server(app)
+            transport = HTTPTransport(base_url)
+        else:
+            transport = TestClientTransport(app)
+
+        print(f"{args.boxes} boxes, {args.kiosks} kiosks, {args.admins} admins for {args.duration:g}s "
+              f"({'HTTP server' if args.serve else 'test client'}, {args.clip} CLIP, {args.items} items)")
+        recorder = Recorder()
+        load = LoadTest(transport, recorder, info, hot_items, args.speed, make_image_bytes(), args.seed)
+        duration = load.run(args.boxes, args.kiosks, args.admins, args.duration, database, args.relist_interval)
+        if server:
+            server.shutdown()
+    finally:
+        stop_app_threads()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = recorder.report(duration)
+    print_report(report)
+    if args.output:
+        write_results(args.output, {
+            "meta": {
+                "timestamp": datetime.now().isoformat(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                **{k: v for k, v in vars(args).items() if k != 'output'},
+            },
+            "report": report,
+        })
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
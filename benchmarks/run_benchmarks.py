@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Hot-path benchmark runner for the Lost & Found backend.
+
+Builds a synthetic database per scale (see datagen.py), stubs CLIP so runs
+are deterministic, and times search, claim, expiry sweep, listing, box
+polling and collect ingestion.  Results are written as JSON so successive
+runs can be compared.
+
+Usage:
+    python benchmarks/run_benchmarks.py --scales 1000 10000 --output bench.json
+    python benchmarks/run_benchmarks.py --scales 1000 --compare bench.json
+    python benchmarks/run_benchmarks.py --scales 100000 --dim 512 --only search
+"""
+
+import argparse
+import io
+import itertools
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from common import install_clip_stub, stop_app_threads, stub_embedding, time_call, write_results, load_results
+
+QUERIES = ["black wallet", "water bottle", "keys", "charger", "hoodie", "id card"]
+
+
+def make_image_bytes():
+    """A small real JPEG so upload paths that sniff or decode images accept it."""
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), (200, 30, 30)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def reset_process_state(database):
+    """Drop per-process caches that belong to the previous scale's database."""
+    database._search_index = None
+    database._embedding_store = None
+
+
+def run_scale(scale, dim, repeat, only, workdir, seed):
+    import database
+    from datagen import populate
+
+    db_path = os.path.join(workdir, f"bench_{scale}.db")
+    started = time.perf_counter()
+    info = populate(db_path, scale, dim=dim, seed=seed)
+    reset_process_state(database)
+    print(f"[{scale}] generated data in {time.perf_counter() - started:.1f}s")
+
+    # Imported after the stub is installed and the database exists
+    from app import app
+    client = app.test_client()
+    rand = random.Random(seed)
+    queries = itertools.cycle(QUERIES)
+    boxes = itertools.cycle(info['boxes'])
+    counter = itertools.count()
+    image_bytes = make_image_bytes()
+
+    with database.get_db_connection() as conn:
+        available_ids = [row['id'] for row in conn.execute(
+            "SELECT id FROM FOUND_ITEMS WHERE status = 'available'")]
+    claim_ids = itertools.cycle(available_ids)
+    next_claim = {}
+
+    def claim_setup():
+        item_id = next(claim_ids)
+        with database.get_db_connection() as conn:
+            conn.execute('''UPDATE FOUND_ITEMS SET status = 'available', claimed_at = NULL,
+                            claimed_by = NULL, expires_at = NULL WHERE id = ?''', (item_id,))
+            conn.commit()
+        next_claim['id'] = item_id
+
+    def expire_setup():
+        past = (datetime.now() - timedelta(minutes=5)).isoformat()
+        with database.get_db_connection() as conn:
+            conn.execute('''UPDATE FOUND_ITEMS SET status = 'claimed', claimed_by = 1, expires_at = ?
+                            WHERE id % 20 = 0''', (past,))
+            conn.commit()
+
+    def collect():
+        response = client.post('/collect', data={
+            'image': (io.BytesIO(image_bytes), f"bench_{scale}_{next(counter)}.jpg"),
+            'timestamp': str(time.time()),
+            'box_id': next(boxes),
+        }, content_type='multipart/form-data')
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    benchmarks = {
+        "search": (lambda: database.search_items(stub_embedding(next(queries), dim).tolist(), threshold=0.2), None),
+        "search_route": (lambda: client.post('/search', json={'query': next(queries)}), None),
+        "claim": (lambda: database.claim_item(next_claim['id'], rand.randint(1, info['collectors'])), claim_setup),
+        "expiry_sweep": (database.release_expired_claims, expire_setup),
+        "listing": (database.get_all_items, None),
+        "listing_route": (lambda: client.get('/items'), None),
+        "box_poll": (lambda: client.get(f"/box/{next(boxes)}/status"), None),
+        "collect": (collect, None),
+    }
+
+    results = {"data": {k: v for k, v in info.items() if k != 'boxes'}, "benchmarks": {}}
+    for name, (fn, setup) in benchmarks.items():
+        if only and name not in only:
+            continue
+        results["benchmarks"][name] = stats = time_call(fn, repeat, setup)
+        print(f"[{scale}] {name:<14} mean {stats['mean_ms']:9.2f} ms  p95 {stats['p95_ms']:9.2f} ms")
+    return results
+
+
+def compare(previous, current):
+    """Print mean latency changes against an earlier results file."""
+    print("\nComparison with previous run (mean_ms):")
+    for scale, result in current["scales"].items():
+        old_scale = previous.get("scales", {}).get(scale)
+        if not old_scale:
+            continue
+        for name, stats in result["benchmarks"].items():
+            old = old_scale["benchmarks"].get(name)
+            if not old:
+                continue
+            change = (stats["mean_ms"] - old["mean_ms"]) / old["mean_ms"] * 100 if old["mean_ms"] else 0.0
+            print(f"[{scale}] {name:<14} {old['mean_ms']:9.2f} -> {stats['mean_ms']:9.2f} ms ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lost & Found hot-path benchmarks")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1000, 10000],
+                        help='Number of FOUND_ITEMS rows to generate per run (e.g. 1000 10000 100000)')
+    parser.add_argument('--dim', type=int, default=768, help='Embedding dimension')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed iterations per benchmark')
+    parser.add_argument('--only', nargs='+', help='Run only these benchmarks')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for data and queries')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', help='Compare against a previous results JSON file')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated databases')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='lostfound_bench_')
+    install_clip_stub(args.dim, os.path.join(workdir, 'uploads'), os.path.join(workdir, 'collectors'))
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "dim": args.dim,
+            "repeat": args.repeat,
+        },
+        "scales": {},
+    }
+    try:
+        for scale in args.scales:
+            results["scales"][str(scale)] = run_scale(scale, args.dim, args.repeat, args.only, workdir, args.seed)
+    finally:
+        stop_app_threads()
+        if args.keep:
+            print(f"Databases kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        write_results(args.output, results)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        compare(load_results(args.compare), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Parity of the exported CLIP encoders (backend/clip_export.py) with the eager model.
+
+Each exported variant is checked when its image and text encoders exist for
+the configured CLIP_MODEL in CLIP_EXPORT_DIR; ONNX variants also need
+onnxruntime.  Export them first, from backend/:
+    python clip_export.py export --format onnx --quantize
+
+Usage:
+    python tests/test_clip_parity.py
+"""
+
+import importlib.util
+import os
+import sys
+import unittest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+HAVE_CLIP = all(importlib.util.find_spec(name) for name in ('torch', 'clip'))
+HAVE_ONNXRUNTIME = importlib.util.find_spec('onnxruntime') is not None
+
+
+class ClipParityTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        if not HAVE_CLIP:
+            raise unittest.SkipTest("torch and clip are not installed")
+        # CLIP_EXPORT_DIR and the sample image folders are relative to backend/
+        os.chdir(BACKEND_DIR)
+        import clip_export
+        cls.clip_export = clip_export
+
+    def check_parity(self, fmt, quantize):
+        for kind in ('image', 'text'):
+            path = self.clip_export.exported_model_path(kind, fmt, quantized=quantize)
+            if not os.path.exists(path):
+                self.skipTest(f"{path} not exported")
+
+        tolerance = self.clip_export.PARITY_TOLERANCE
+        for kind, (worst, count) in self.clip_export.parity(fmt, quantize).items():
+            with self.subTest(kind=kind):
+                self.assertGreaterEqual(worst, tolerance,
+                                        f"{kind}: min cosine {worst:.5f} over {count} inputs")
+
+    @unittest.skipUnless(HAVE_ONNXRUNTIME, "onnxruntime is not installed")
+    def test_onnx(self):
+        self.check_parity('onnx', quantize=False)
+
+    @unittest.skipUnless(HAVE_ONNXRUNTIME, "onnxruntime is not installed")
+    def test_onnx_int8(self):
+        self.check_parity('onnx', quantize=True)
+
+    def test_torchscript(self):
+        self.check_parity('torchscript', quantize=False)
+
+    def test_torchscript_int8(self):
+        self.check_parity('torchscript', quantize=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
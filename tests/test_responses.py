@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Tests for the orjson JSON provider in backend/responses.py.
+
+Usage:
+    python tests/test_responses.py
+"""
+
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from flask import Flask, jsonify
+
+import responses
+
+
+@unittest.skipIf(responses.orjson is None, "orjson is not installed")
+class OrjsonProviderTest(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.json = responses.OrjsonProvider(self.app)
+
+    def test_jsonify_uses_orjson(self):
+        with mock.patch.object(responses.orjson, 'dumps', wraps=responses.orjson.dumps) as spy:
+            with self.app.app_context():
+                response = jsonify({"b": [1, 2, 3], "a": "é"})
+        self.assertEqual(spy.call_count, 1)
+        self.assertEqual(response.get_data(as_text=True), '{"a":"é","b":[1,2,3]}\n')
+        self.assertEqual(response.mimetype, 'application/json')
+
+    def test_indent_falls_back_to_json_module(self):
+        self.app.debug = True  # response() pretty-prints in debug mode
+        with mock.patch.object(responses.orjson, 'dumps', wraps=responses.orjson.dumps) as spy:
+            with self.app.app_context():
+                response = jsonify({"a": 1})
+        self.assertEqual(spy.call_count, 0)
+        self.assertEqual(json.loads(response.get_data()), {"a": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()